@@ -1,23 +1,17 @@
 import sys
 import numpy as np
-import pandas as pd
 
 sys.path.insert(0, "../")
 
 from strategy_tester.account import Account
 from strategy_tester.asset import Stock
+from strategy_tester.indicators import sma
 from strategy_tester.strategy import Strategy
 from strategy_tester.risk_management import ConstantRate
 from strategy_tester.simulate import BackTest
 from strategy_tester.utils import generate_data, ROI, sharpe_ratio
 
 
-def moving_average(a, n=3):
-    ret = np.cumsum(a, dtype=float)
-    ret[n:] = ret[n:] - ret[:-n]
-    return ret[n - 1 :] / n
-
-
 class MACross(Strategy):
     def decide_long_open(self, tickers, Account, exog):
         "Exog[0]: Slow MA, Exog[1]: Fast MA"
@@ -83,24 +77,14 @@ strategy = aapl.register(strategy)
 slow_period = 55
 fast_period = 35
 
-
-def convert_ticker_data(tickers, fields=None):
-    output = []
-    for ticker in tickers:
-        output.append(ticker.to_dict(fields))
-    return pd.DataFrame(output)
-
-
-d = convert_ticker_data(aapl.data(), ["price"])
-
-
-sma = np.zeros((d.shape[0], 2))
-sma[(slow_period - 1) :, 0] = moving_average(d.values, slow_period)
-sma[(fast_period - 1) :, 1] = moving_average(d.values, fast_period)
+# NaN until enough data, no order is opened before
+exog = np.column_stack(
+    [sma(aapl.price, slow_period), sma(aapl.price, fast_period)]
+)
 
 sim = BackTest(
     Account=account, Strategy=strategy, track=(ROI, sharpe_ratio)
-).run(aapl, exog=sma)
+).run(aapl, exog=exog)
 
 print(sim.Account.balances)
 sim.Account.plot_results()
\ No newline at end of file
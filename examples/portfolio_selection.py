@@ -6,6 +6,7 @@ sys.path.insert(0, "../")
 
 from strategy_tester.account import Account
 from strategy_tester.asset import Stock
+from strategy_tester.data import MemoryLoader
 from strategy_tester.strategy import Strategy
 from strategy_tester.risk_management import RiskManagement
 from strategy_tester.simulate import BackTest
@@ -43,7 +44,7 @@ class CustomAllocation(Strategy):
 
     def decide_long_open(self, tickers, Account, exog):
         output = {}
-        t = tickers[0].timestamp
+        t = pd.Timestamp(tickers[0].timestamp)
 
         ticker_dict = {ticker.aid: ticker.price for ticker in tickers}
         self.past_data.append(ticker_dict)
@@ -87,7 +88,7 @@ class CustomAllocation(Strategy):
         return None
 
     def decide_long_close(self, order, tickers, Account, exog):
-        t = tickers[0].timestamp
+        t = pd.Timestamp(tickers[0].timestamp)
 
         # if a new month is started, close all positions
         if t.month != self.last_rebalanced_t:
@@ -113,15 +114,19 @@ if __name__ == "__main__":
 
     stocks = []
     for symbol in os.listdir(path):
+        if not symbol.endswith(".csv"):
+            continue
         print(symbol)
-        tmp = pd.read_csv(os.path.join(path, symbol), parse_dates=True)[
-            ["Adj Close", "Date"]
-        ]
-        tmp.columns = ["close", "timestamp"]
-        tmp["timestamp"] = pd.to_datetime(tmp["timestamp"])
-        tmp = tmp.dropna(how="any", axis=0)
-        if tmp.shape[0] > 252 * 9:
-            stocks.append(Stock(price=tmp.values, base=symbol.strip(".csv")))
+        # parsed once, memory-mapped from a binary cache afterwards
+        loader = MemoryLoader(os.path.join(path, symbol))
+        if loader.n > 252 * 9:
+            stocks.append(
+                Stock(
+                    price=loader["adj_close"],
+                    timestamp=loader["timestamp"],
+                    base=symbol[: -len(".csv")],
+                )
+            )
 
     # initialize an account with 1M USD balance
     account = Account()
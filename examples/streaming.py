@@ -0,0 +1,28 @@
+import sys
+
+sys.path.insert(0, "../")
+
+from strategy_tester.account import Account
+from strategy_tester.asset import Currency
+from strategy_tester.data import Streamer
+from strategy_tester.strategy import Strategy
+from strategy_tester.risk_management import ConstantLots
+from strategy_tester.simulate import BackTest
+
+# read one month of EURUSD M1 bars, 10k rows at a time
+eurusd = Currency(
+    price=Streamer(
+        "../data/currency_pairs/DAT_ASCII_EURUSD_M1_201904.csv",
+        chunksize=10000,
+    ),
+    base="EUR",
+    quote="USD",
+)
+account = Account()
+risk_man = ConstantLots(0.1)
+
+strategy = Strategy(RiskManagement=risk_man, name="noise_trader")
+strategy = eurusd.register(strategy)
+
+sim = BackTest(Account=account, Strategy=strategy).run(eurusd)
+print(sim.Account.balances)
@@ -0,0 +1,15 @@
+from setuptools import find_packages, setup
+
+with open("requirements.txt") as f:
+    install_requires = f.read().splitlines()
+
+setup(
+    name="pybacktester",
+    version="0.1.0",
+    description="Object oriented backtesting of trading strategies",
+    url="https://github.com/mcandar/pybacktester",
+    packages=find_packages(include=["strategy_tester", "strategy_tester.*"]),
+    # multiprocessing.shared_memory
+    python_requires=">=3.8",
+    install_requires=install_requires,
+)
@@ -3,7 +3,12 @@ from datetime import datetime as dt
 import matplotlib.pyplot as plt
 import numpy as np
 import pandas as pd
-from strategy_tester.utils import error_logger, transaction_logger
+from strategy_tester.kernels import OrderBook
+from strategy_tester.utils import (
+    error_logger,
+    transaction_logger,
+    to_timestamp,
+)
 
 # TODO: add balance currency (or change other classes assuming that this will always be USD)
 # TODO: convert each data frame or series to timestamp-indexed ones.
@@ -12,6 +17,66 @@ error_log = error_logger()
 transaction_log = transaction_logger()
 
 
+class HistoryBuffer:
+    """
+    Time series of an account value, kept in NumPy arrays that grow by
+    doubling. The data frame view is cached until the next append, do not
+    modify it in place.
+
+    Parameters
+    ----------
+    name : str
+        Name of the value column of the data frame.
+    capacity : int
+        Initial number of rows to allocate.
+    """
+
+    def __init__(self, name, capacity=64):
+        self.name = name
+        self.n = 0
+        self.__timestamp = np.empty(capacity, dtype=np.int64)
+        self.__values = np.empty(capacity)
+        self.__frame = None
+
+    def __len__(self):
+        return self.n
+
+    def append(self, timestamp, value):
+        if self.n == self.__timestamp.shape[0]:
+            self.__timestamp = np.resize(self.__timestamp, 2 * self.n)
+            self.__values = np.resize(self.__values, 2 * self.n)
+        self.__timestamp[self.n] = timestamp
+        self.__values[self.n] = value
+        self.n += 1
+        self.__frame = None
+        return self
+
+    @property
+    def timestamp(self):
+        "Timestamps in nanoseconds since epoch, read-only view."
+        output = self.__timestamp[: self.n]
+        output.flags.writeable = False
+        return output
+
+    @property
+    def values(self):
+        "Read-only view of the values."
+        output = self.__values[: self.n]
+        output.flags.writeable = False
+        return output
+
+    def frame(self):
+        "Data frame with boxed timestamps, cached until the next append."
+        if self.__frame is None:
+            self.__frame = pd.DataFrame(
+                {
+                    "timestamp": to_timestamp(self.__timestamp[: self.n]),
+                    self.name: self.__values[: self.n],
+                }
+            )
+        return self.__frame
+
+
 class Account:
     """
     A generic class to manage the operations of a trading account, store data
@@ -35,6 +100,15 @@ class Account:
         Maximum allowed total ratio of the balance to risk, at any time.
     max_n_orders : int
         Maximum allowed number of open orders, at any time.
+    equity_freq : int
+        If given, the mark-to-market equity (balance plus the profit of the
+        open orders) is recorded every `equity_freq` ticks, see
+        `equity_curve`.
+    compiled : bool
+        If True, open market orders are mirrored in an `OrderBook` and
+        updated all at once by a compiled kernel (numba if available, NumPy
+        otherwise). Their `Order()` objects are synced only on close, or on
+        `sync_orders()`, and their per-tick history is not recorded.
 
     Attributes
     ----------
@@ -52,6 +126,14 @@ class Account:
         Dict of currently opened orders.
     inactive_orders : dict of `Order()`
         Dict of past (closed, expired, deleted) orders.
+    trade_listeners : list of callable
+        Called as `callback(order, Account)` after each order close, see
+        `subscribe`.
+    orders_by_asset : dict of dict of `Order()`
+        Active orders grouped by asset id, to update only the orders of the
+        assets that ticked.
+    orders_by_strategy : dict of dict of `Order()`
+        Active orders grouped by strategy id.
     n_active_orders : int
         Number of open orders at the moment, i.e. positions.
     n_inactive_orders : int
@@ -64,14 +146,16 @@ class Account:
         True if the Account has never seen a backtest.
     n_processed_tickers : int
         The total number of tickers that the Account has ever processed.
-    balances : list of float
+    balances : DataFrame
         History of balance values, recorded at each order close.
-    free_margins : list of float
+    free_margins : DataFrame
         History of free margin values, recorded at each order update or close.
-    equities : list of float
+    equities : DataFrame
         History of equity values, recorded at each order update or close.
-    navs : list of float
+    navs : DataFrame
         History of net asset values, recorded at each order update or close.
+    equity_curve : DataFrame
+        Mark-to-market equity, recorded every `equity_freq` ticks.
 
     See also
     --------
@@ -92,6 +176,8 @@ class Account:
         max_allowed_risk=None,
         max_n_orders=None,
         currency="USD",
+        equity_freq=None,
+        compiled=False,
     ):
         if initial_balance < 0:
             error_log.error(
@@ -116,6 +202,8 @@ class Account:
         self.__i = 0
         self.active_orders = {}
         self.inactive_orders = {}
+        self.orders_by_asset = {}
+        self.orders_by_strategy = {}
         self.n_active_orders = 0
         self.n_inactive_orders = 0
         self.time = []
@@ -123,15 +211,19 @@ class Account:
         self.fresh_start = True
         self.n_processed_tickers = 0
         self.max_n_active_orders = 0
+        self.equity_freq = equity_freq
+        self.trade_listeners = []
+        self.order_book = OrderBook() if compiled else None
 
         self.__balance = initial_balance
-        self.__balances = []
+        self.__balances = HistoryBuffer("balance")
         self.__free_margin = initial_balance
-        self.__free_margins = []
+        self.__free_margins = HistoryBuffer("free_margin")
         self.__equity = initial_balance
-        self.__equities = []
+        self.__equities = HistoryBuffer("equity")
         self.__nav = 0
-        self.__navs = []
+        self.__navs = HistoryBuffer("nav")
+        self.__equity_curve = HistoryBuffer("equity")
         transaction_log.info("Account is initialized.")
 
     @property
@@ -149,17 +241,51 @@ class Account:
     def reset(self):
         self.__init__()
 
+    def history(self, name):
+        """
+        `HistoryBuffer` of `balance`, `free_margin`, `equity`, `nav` or
+        `equity_curve`, to read the raw arrays without a data frame.
+        """
+        buffers = {
+            "balance": self.__balances,
+            "free_margin": self.__free_margins,
+            "equity": self.__equities,
+            "nav": self.__navs,
+            "equity_curve": self.__equity_curve,
+        }
+        if name not in buffers:
+            message = f"Unknown history `{name}`."
+            error_log.error(message)
+            raise ValueError(message)
+        return buffers[name]
+
+    @property
+    def equity_curve(self):
+        return self.__equity_curve.frame()
+
+    def mark_to_market(self):
+        "Balance plus the profit of the open orders."
+        output = self.balance
+        book = self.order_book
+        if book is not None:
+            output += book.profit[: len(book)].sum()
+        if book is None or len(book) < self.n_active_orders:
+            for oid, order in self.active_orders.items():
+                if book is None or oid not in book:
+                    output += order.profit
+        return output
+
     @property
     def balances(self):
-        return pd.DataFrame(self.__balances, columns=["timestamp", "balance"])
+        return self.__balances.frame()
 
     @balances.setter
     def balances(self, value):
-        self.__balances.append(value)
+        self.__balances.append(*value)
 
     @balances.getter
     def balances(self):
-        return pd.DataFrame(self.__balances, columns=["timestamp", "balance"])
+        return self.__balances.frame()
 
     @property
     def balance(self):
@@ -175,19 +301,15 @@ class Account:
 
     @property
     def free_margins(self):
-        return pd.DataFrame(
-            self.__free_margins, columns=["timestamp", "free_margin"]
-        )
+        return self.__free_margins.frame()
 
     @free_margins.setter
     def free_margins(self, value):
-        self.__free_margins.append(value)
+        self.__free_margins.append(*value)
 
     @free_margins.getter
     def free_margins(self):
-        return pd.DataFrame(
-            self.__free_margins, columns=["timestamp", "free_margin"]
-        )
+        return self.__free_margins.frame()
 
     @property
     def free_margin(self):
@@ -203,15 +325,15 @@ class Account:
 
     @property
     def equities(self):
-        return pd.DataFrame(self.__equities, columns=["timestamp", "equity"])
+        return self.__equities.frame()
 
     @equities.setter
     def equities(self, value):
-        self.__equities.append(value)
+        self.__equities.append(*value)
 
     @equities.getter
     def equities(self):
-        return pd.DataFrame(self.__equities, columns=["timestamp", "equity"])
+        return self.__equities.frame()
 
     @property
     def equity(self):
@@ -227,15 +349,15 @@ class Account:
 
     @property
     def navs(self):
-        return pd.DataFrame(self.__navs, columns=["timestamp", "nav"])
+        return self.__navs.frame()
 
     @navs.setter
     def navs(self, value):
-        self.__navs.append(value)
+        self.__navs.append(*value)
 
     @navs.getter
     def navs(self):
-        return pd.DataFrame(self.__navs, columns=["timestamp", "nav"])
+        return self.__navs.frame()
 
     @property
     def nav(self):
@@ -295,7 +417,12 @@ class Account:
                 "Cannot place order as the number of open orders limit reached."
             )
             return False
-        self.active_orders[f"order_{self.__i}"] = order
+        key = f"order_{self.__i}"
+        self.active_orders[key] = order
+        self.orders_by_asset.setdefault(order.asset_id, {})[key] = order
+        self.orders_by_strategy.setdefault(order.strategy_id, {})[key] = order
+        if self.order_book is not None and order.is_open:
+            self.order_book.add(key, order)
         self.__i += 1
         self.equity += order.profit
         self.nav += order.margin
@@ -315,9 +442,35 @@ class Account:
             nav=self.nav,
         )
 
+    def subscribe(self, callback):
+        """
+        Publish the closed trades to `callback(order, Account)`, e.g. to
+        keep rolling statistics instead of scanning `inactive_orders`.
+        """
+        self.trade_listeners.append(callback)
+        return self
+
+    def sync_orders(self):
+        "Write the state kept in the order book back to the open orders."
+        if self.order_book is not None:
+            for key in self.order_book.keys:
+                self.order_book.sync(key, self.active_orders[key])
+        return self
+
     def __close_order(self, id, timestamp):
+        if self.order_book is not None and id in self.order_book:
+            self.order_book.sync(id, self.active_orders[id])
+            self.order_book.remove(id)
         tmp_order = self.active_orders[id].close(timestamp)
         del self.active_orders[id]
+        orders = self.orders_by_asset[tmp_order.asset_id]
+        del orders[id]
+        if len(orders) == 0:
+            del self.orders_by_asset[tmp_order.asset_id]
+        orders = self.orders_by_strategy[tmp_order.strategy_id]
+        del orders[id]
+        if len(orders) == 0:
+            del self.orders_by_strategy[tmp_order.strategy_id]
         self.inactive_orders[id] = tmp_order
         self.equity += tmp_order.profit
         self.balance += tmp_order.profit
@@ -325,6 +478,8 @@ class Account:
         self.free_margin += tmp_order.margin
         self.n_active_orders -= 1
         self.n_inactive_orders += 1
+        for callback in self.trade_listeners:
+            callback(tmp_order, self)
         transaction_log.transaction(f"Order {id} is closed.")
         return self
 
@@ -356,16 +511,27 @@ class Account:
     def __update_or_close(self, tickers):
         order_close_ids = []
         timestamp = tickers[0].timestamp
-        for oid, order in self.active_orders.items():
-            # TODO: this is inefficient, fix it
+        book = self.order_book
+        if book is not None:
+            order_close_ids.extend(book.update(tickers))
+        if book is None or len(book) < self.n_active_orders:
             for ticker in tickers:
-                if ticker.aid == order.asset_id:
-                    order.update(ticker)  # JUST ONE TICKER
-            if (
-                not order.is_active and not order.is_open
-            ):  # closed due to TP, SL ### <----------- COULD THIS DELETE PENDING ORDERS???????
-                order_close_ids.append(oid)
-
+                orders = self.orders_by_asset.get(ticker.aid)
+                if orders is None:
+                    continue
+                for oid, order in orders.items():
+                    if book is not None and oid in book:
+                        continue
+                    order.update(ticker)
+                    if (
+                        not order.is_active and not order.is_open
+                    ):  # closed due to TP, SL ### <----------- COULD THIS DELETE PENDING ORDERS???????
+                        order_close_ids.append(oid)
+
+        if len(order_close_ids) > 1:
+            # close in placement order, as seen by the trade listeners, keys
+            # being `order_<placement counter>`
+            order_close_ids.sort(key=lambda oid: int(oid[6:]))
         if len(order_close_ids) > 0:
             self.close_all_orders(timestamp=timestamp, ids=order_close_ids)
 
@@ -383,6 +549,13 @@ class Account:
 
         if self.n_active_orders > self.max_n_active_orders:
             self.max_n_active_orders = self.n_active_orders
+        if (
+            self.equity_freq is not None
+            and self.n_processed_tickers % self.equity_freq == 0
+        ):
+            self.__equity_curve.append(
+                tickers[0].timestamp, self.mark_to_market()
+            )
         self.n_processed_tickers += 1
         transaction_log.debug("Account is updated.")
         return self
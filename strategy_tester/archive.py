@@ -0,0 +1,309 @@
+import json
+import mmap
+import os
+import struct
+import zlib
+import numpy as np
+from strategy_tester.data import Streamer
+from strategy_tester.utils import PRICE_DTYPE, as_columns, to_ns
+
+MAGIC = b"PBTARCH1"
+FOOTER = struct.Struct("<qq8s")
+INDEX_DTYPE = np.dtype(
+    [
+        ("start", "<i8"),
+        ("end", "<i8"),
+        ("first_price", "<i8"),
+        ("offset", "<i8"),
+        ("timestamp_bytes", "<i8"),
+        ("price_bytes", "<i8"),
+        ("n", "<i8"),
+        ("timestamp_itemsize", "u1"),
+        ("price_itemsize", "u1"),
+    ]
+)
+
+
+def smallest_int(x):
+    "Smallest signed integer dtype that holds all values of `x`."
+    if x.size == 0:
+        return np.dtype(np.int8)
+    lo, hi = x.min(), x.max()
+    for dtype in (np.int8, np.int16, np.int32):
+        info = np.iinfo(dtype)
+        if info.min <= lo and hi <= info.max:
+            return np.dtype(dtype)
+    return np.dtype(np.int64)
+
+
+def encode(values, level):
+    "Delta encode, narrow and compress an int64 array, first value excluded."
+    deltas = np.diff(values)
+    dtype = smallest_int(deltas)
+    return zlib.compress(deltas.astype(dtype).tobytes(), level), dtype.itemsize
+
+
+def decode(buffer, first, itemsize, n):
+    "Inverse of `encode`."
+    deltas = np.frombuffer(zlib.decompress(buffer), dtype=f"<i{itemsize}")
+    output = np.empty(n, dtype=np.int64)
+    output[0] = first
+    np.cumsum(deltas, out=output[1:])
+    output[1:] += first
+    return output
+
+
+class ArchiveWriter:
+    """
+    Write prices to a block-compressed archive.
+
+    Prices are stored as integers scaled by 10**digits, timestamps as int64
+    nanoseconds since epoch. Both are delta encoded, narrowed to the
+    smallest integer type of each block and compressed with zlib, in
+    blocks of `block_size` rows. An index of the time range and location of
+    each block is written at the end of the file. The archive is written to
+    a temporary file that replaces `path` only once it is closed, so an
+    interrupted write leaves any previous archive intact.
+
+    Parameters
+    ----------
+    path : str
+        Path of the archive.
+    digits : int
+        Number of decimal digits of the prices, e.g. 5 for most currency
+        pairs. Prices that cannot be represented are rejected.
+    block_size : int
+        Number of rows per block.
+    level : int
+        zlib compression level.
+    """
+
+    version = 1
+
+    def __init__(self, path, digits=5, block_size=65536, level=6):
+        self.digits = digits
+        self.block_size = block_size
+        self.level = level
+        self.path = path
+        self.n = 0
+        self.index = []
+        self.__buffer = []
+        self.__n_buffered = 0
+        self.__tmp = f"{path}.{os.getpid()}.tmp"
+        self.__f = open(self.__tmp, "wb")
+        header = json.dumps(
+            {
+                "version": self.version,
+                "digits": digits,
+                "block_size": block_size,
+            }
+        ).encode("utf-8")
+        self.__f.write(MAGIC + struct.pack("<I", len(header)) + header)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *args):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+    def write(self, price, timestamp=None):
+        "Append rows, in any format accepted by `Asset`."
+        timestamp, price = as_columns(price, timestamp)
+        scaled = np.round(price * 10**self.digits)
+        if np.any(np.abs(scaled / 10**self.digits - price) > 1e-9 * price):
+            raise ValueError(
+                f"Prices cannot be represented with {self.digits} digits."
+            )
+        self.__buffer.append((timestamp, scaled.astype(np.int64)))
+        self.__n_buffered += timestamp.shape[0]
+        while self.__n_buffered >= self.block_size:
+            self.__flush(self.block_size)
+        return self
+
+    def __flush(self, n):
+        timestamp, price = (np.concatenate(c) for c in zip(*self.__buffer))
+        rest = (timestamp[n:], price[n:])
+        self.__buffer = [rest] if rest[0].shape[0] > 0 else []
+        self.__n_buffered = rest[0].shape[0]
+        timestamp, price = timestamp[:n], price[:n]
+
+        timestamp_buffer, timestamp_itemsize = encode(timestamp, self.level)
+        price_buffer, price_itemsize = encode(price, self.level)
+        self.index.append(
+            (
+                timestamp[0],
+                timestamp[-1],
+                price[0],
+                self.__f.tell(),
+                len(timestamp_buffer),
+                len(price_buffer),
+                n,
+                timestamp_itemsize,
+                price_itemsize,
+            )
+        )
+        self.__f.write(timestamp_buffer)
+        self.__f.write(price_buffer)
+        self.n += n
+
+    def close(self):
+        if self.__f.closed:
+            return
+        if self.__n_buffered > 0:
+            self.__flush(self.__n_buffered)
+        offset = self.__f.tell()
+        self.__f.write(np.array(self.index, dtype=INDEX_DTYPE).tobytes())
+        self.__f.write(FOOTER.pack(offset, len(self.index), MAGIC))
+        self.__f.close()
+        os.replace(self.__tmp, self.path)
+
+    def abort(self):
+        "Discard the rows written so far, `path` is left as it was."
+        if not self.__f.closed:
+            self.__f.close()
+            os.remove(self.__tmp)
+
+
+def write_archive(path, data, digits=5, block_size=65536, level=6):
+    """
+    Write a price array, or an iterable of them such as a `Streamer`, to a
+    block-compressed archive, see `ArchiveWriter`.
+    """
+    chunks = [data] if isinstance(data, np.ndarray) else data
+    with ArchiveWriter(path, digits, block_size, level) as writer:
+        for chunk in chunks:
+            writer.write(chunk)
+    return path
+
+
+class Archive:
+    """
+    Read a block-compressed price archive written by `ArchiveWriter`.
+
+    The file is memory-mapped and blocks are decoded on demand, only the
+    ones overlapping the requested time range are read.
+
+    Parameters
+    ----------
+    path : str
+        Path of the archive.
+
+    Attributes
+    ----------
+    index : structured ndarray
+        Time range, location and size of each block, see `INDEX_DTYPE`.
+    n : int
+        Total number of rows.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            self.__mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        buffer = self.__mmap
+        if buffer[: len(MAGIC)] != MAGIC or buffer[-len(MAGIC) :] != MAGIC:
+            raise ValueError(f"{path} is not a price archive.")
+        (length,) = struct.unpack_from("<I", buffer, len(MAGIC))
+        start = len(MAGIC) + 4
+        self.header = json.loads(bytes(buffer[start : start + length]))
+        self.digits = self.header["digits"]
+        offset, n_blocks, _ = FOOTER.unpack_from(
+            buffer, len(buffer) - FOOTER.size
+        )
+        # copied, so that the map can be closed
+        self.index = np.frombuffer(
+            buffer, dtype=INDEX_DTYPE, count=n_blocks, offset=offset
+        ).copy()
+        self.n = int(self.index["n"].sum())
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __len__(self):
+        return self.n
+
+    def close(self):
+        "Unmap the file, the archive cannot be read anymore."
+        self.__mmap.close()
+        return self
+
+    def blocks(self, start=None, end=None):
+        "Indices of the blocks overlapping [start, end]."
+        a = 0
+        b = self.index.shape[0]
+        if start is not None:
+            a = np.searchsorted(self.index["end"], to_ns(start))
+        if end is not None:
+            b = np.searchsorted(self.index["start"], to_ns(end), side="right")
+        return range(a, max(a, b))
+
+    def decode(self, k):
+        "Decode the `k`th block to a `PRICE_DTYPE` record array."
+        entry = self.index[k]
+        a = int(entry["offset"])
+        b = a + int(entry["timestamp_bytes"])
+        c = b + int(entry["price_bytes"])
+        n = int(entry["n"])
+        output = np.empty(n, dtype=PRICE_DTYPE)
+        output["timestamp"] = decode(
+            self.__mmap[a:b], entry["start"], entry["timestamp_itemsize"], n
+        ).view("datetime64[ns]")
+        output["price"] = decode(
+            self.__mmap[b:c], entry["first_price"], entry["price_itemsize"], n
+        ) / (10**self.digits)
+        return output
+
+    def iter_blocks(self, start=None, end=None):
+        "Yield the decoded blocks within [start, end], trimmed to it."
+        for k in self.blocks(start, end):
+            block = self.decode(k)
+            timestamp = block["timestamp"].view(np.int64)
+            a = (
+                0
+                if start is None
+                else np.searchsorted(timestamp, to_ns(start))
+            )
+            b = (
+                block.shape[0]
+                if end is None
+                else np.searchsorted(timestamp, to_ns(end), side="right")
+            )
+            if b > a:
+                yield block[a:b]
+
+    def read(self, start=None, end=None):
+        "Decode the rows within [start, end] into one record array."
+        blocks = list(self.iter_blocks(start, end))
+        if len(blocks) == 0:
+            return np.empty(0, dtype=PRICE_DTYPE)
+        return np.concatenate(blocks)
+
+    def stream(self, start=None, end=None, prefetch=True):
+        "Streaming source for an `Asset`, one chunk per block."
+        return ArchiveStreamer(self, start, end, prefetch)
+
+
+class ArchiveStreamer(Streamer):
+    "Stream the blocks of an `Archive`, decoding ahead in a thread."
+
+    def __init__(self, archive, start=None, end=None, prefetch=True):
+        # one chunk per block, of the decoded prices
+        super().__init__(
+            archive.path,
+            chunksize=None,
+            column="price",
+            format="archive",
+            prefetch=prefetch,
+        )
+        self.archive = archive
+        self.start = start
+        self.end = end
+
+    def read_chunks(self):
+        return self.archive.iter_blocks(self.start, self.end)
@@ -1,5 +1,9 @@
+import copy
 import hashlib
 from uuid import uuid4
+import numpy as np
+from strategy_tester.data import Streamer
+from strategy_tester.utils import as_columns
 
 # from strategy_tester.utils import generate_id
 
@@ -9,6 +13,17 @@ from uuid import uuid4
 
 
 class Ticker:
+    __slots__ = (
+        "aid",
+        "timestamp",
+        "price",
+        "spread",
+        "commissions",
+        "slippage",
+        "usd_equivalent",
+    )
+    attributes = __slots__
+
     def __init__(
         self,
         aid,
@@ -27,16 +42,6 @@ class Ticker:
         self.slippage = slippage
         self.usd_equivalent = usd_equivalent
 
-        self.attributes = (
-            "aid",
-            "timestamp",
-            "price",
-            "spread",
-            "commissions",
-            "slippage",
-            "usd_equivalent",
-        )
-
     def to_dict(self, attributes=None):
         if attributes is None:
             attributes = self.attributes
@@ -50,9 +55,243 @@ class Ticker:
         return (getattr(self, attr) for attr in attributes)
 
 
+def _stack_columns(values, n):
+    """
+    Stack per-asset columns into an array of shape (n, len(values)). When
+    every value is a scalar, the row is broadcast instead of allocated.
+    """
+    if all(np.ndim(value) == 0 for value in values):
+        return np.broadcast_to(np.array(values, dtype=float), (n, len(values)))
+    if len(values) == 1:
+        return np.asarray(values[0], dtype=float).reshape(n, 1)
+    output = np.empty((n, len(values)), dtype=float)
+    for j, value in enumerate(values):
+        output[:, j] = value
+    return output
+
+
 class TickerSet:
-    def __init__(self, tickers):
-        pass
+    """
+    Time-aligned, columnar panel of one or more assets.
+
+    Every dynamic field is kept as a NumPy array of shape (n_tickers,
+    n_assets), scalar costs are broadcast rather than expanded. Iterating
+    over the panel yields the same tuple of `Ticker` objects at every step,
+    updated in place (flyweight), so no object is created per tick. Copy the
+    values, not the tickers, if they must outlive the current step.
+
+    Parameters
+    ----------
+    assets : Asset or list of Asset
+        Assets to align. Their time series lengths must match.
+
+    Attributes
+    ----------
+    aids : tuple of str
+        Asset ids, in column order.
+    timestamp : ndarray of int64, of shape (n_tickers,)
+        Common time axis of the panel, in nanoseconds since epoch.
+    price, spread, commissions, slippage, usd_equivalent : ndarray
+        Dynamic fields, of shape (n_tickers, n_assets).
+    tickers : tuple of Ticker
+        Flyweight tickers pointing to the current row.
+    """
+
+    columns = ("price", "spread", "commissions", "slippage", "usd_equivalent")
+
+    def __init__(self, assets):
+        assets = assets if isinstance(assets, (list, tuple)) else [assets]
+        lengths = np.array([asset.price.shape[0] for asset in assets])
+        if np.any(lengths[0] != lengths):
+            raise ValueError("Time series data lengths must match.")
+
+        n = lengths[0]
+        self.aids = tuple(asset.id for asset in assets)
+        self.timestamp = assets[0].timestamp
+        for column in self.columns:
+            setattr(
+                self,
+                column,
+                _stack_columns([getattr(a, column) for a in assets], n),
+            )
+        self.tickers = tuple(
+            Ticker(aid, None, None, None, None, None, None)
+            for aid in self.aids
+        )
+        self.i = -1
+
+    def __len__(self):
+        return self.timestamp.shape[0]
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self.seek(i)
+
+    def seek(self, i):
+        "Point the flyweight tickers to the `i`th row and return them."
+        self.i = i
+        timestamp = int(self.timestamp[i])
+        rows = [getattr(self, column)[i].tolist() for column in self.columns]
+        for ticker, values in zip(self.tickers, zip(*rows)):
+            ticker.timestamp = timestamp
+            (
+                ticker.price,
+                ticker.spread,
+                ticker.commissions,
+                ticker.slippage,
+                ticker.usd_equivalent,
+            ) = values
+        return self.tickers
+
+
+class SparseTickerSet:
+    """
+    Panel of assets with different calendars, merged on the union of their
+    timestamps.
+
+    At each distinct timestamp, only the tickers of the assets that updated
+    are yielded, nothing is padded. Rows of all assets are laid out in time
+    order, `ptr[i]:ptr[i + 1]` being the rows of the `i`th timestamp.
+    Tickers are flyweights, as in `TickerSet`.
+
+    Parameters
+    ----------
+    assets : list of Asset
+        Assets to merge, each with strictly increasing timestamps.
+
+    Attributes
+    ----------
+    aids : tuple of str
+        Asset ids.
+    timestamp : ndarray of int64
+        Union of the timestamps of the assets.
+    ptr : ndarray of int64
+        Offsets of the rows of each timestamp, of shape (n_tickers + 1,).
+    asset : ndarray of int64
+        Asset index of each row.
+    price, spread, commissions, slippage, usd_equivalent : ndarray
+        Dynamic fields of each row.
+    tickers : tuple of Ticker
+        Flyweight ticker of each asset.
+    """
+
+    columns = TickerSet.columns
+
+    def __init__(self, assets):
+        for asset in assets:
+            if np.any(np.diff(asset.timestamp) <= 0):
+                raise ValueError(
+                    f"Timestamps of asset {asset.id} must be strictly "
+                    "increasing."
+                )
+        self.aids = tuple(asset.id for asset in assets)
+        self.timestamp = np.unique(
+            np.concatenate([asset.timestamp for asset in assets])
+        )
+        # k-way merge: sort the rows of all assets by their time step, the
+        # stable sort keeps the asset order within a step
+        step = np.concatenate(
+            [np.searchsorted(self.timestamp, a.timestamp) for a in assets]
+        )
+        lengths = [asset.timestamp.shape[0] for asset in assets]
+        order = np.argsort(step, kind="stable")
+        self.ptr = np.zeros(self.timestamp.shape[0] + 1, dtype=np.int64)
+        np.cumsum(
+            np.bincount(step, minlength=self.timestamp.shape[0]),
+            out=self.ptr[1:],
+        )
+        self.asset = np.repeat(np.arange(len(assets)), lengths)[order]
+        for column in self.columns:
+            values = np.concatenate(
+                [
+                    np.broadcast_to(
+                        np.asarray(getattr(a, column), dtype=float), (n,)
+                    )
+                    for a, n in zip(assets, lengths)
+                ]
+            )
+            setattr(self, column, values[order])
+        self.tickers = tuple(
+            Ticker(aid, None, None, None, None, None, None)
+            for aid in self.aids
+        )
+        self.i = -1
+
+    def __len__(self):
+        return self.timestamp.shape[0]
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self.seek(i)
+
+    def seek(self, i):
+        "Point the tickers updated at the `i`th timestamp and return them."
+        self.i = i
+        timestamp = int(self.timestamp[i])
+        a, b = self.ptr[i], self.ptr[i + 1]
+        ks = self.asset[a:b].tolist()
+        rows = [getattr(self, column)[a:b].tolist() for column in self.columns]
+        for k, values in zip(ks, zip(*rows)):
+            ticker = self.tickers[k]
+            ticker.timestamp = timestamp
+            (
+                ticker.price,
+                ticker.spread,
+                ticker.commissions,
+                ticker.slippage,
+                ticker.usd_equivalent,
+            ) = values
+        if len(ks) == len(self.tickers):
+            return self.tickers
+        return tuple(self.tickers[k] for k in ks)
+
+
+def ticker_set(assets):
+    "`TickerSet` if the assets share their timestamps, else `SparseTickerSet`."
+    timestamp = assets[0].timestamp
+    if all(
+        asset.timestamp is timestamp
+        or np.array_equal(asset.timestamp, timestamp)
+        for asset in assets[1:]
+    ):
+        return TickerSet(assets)
+    return SparseTickerSet(assets)
+
+
+def panels(assets):
+    """
+    Yield time-ordered panels of the assets, merged on their timestamps (see
+    `ticker_set`). Streamed assets are read chunk by chunk: each panel covers
+    the rows up to the earliest last timestamp of the current chunks, the
+    rest is carried over to the next panel.
+    """
+    assets = assets if isinstance(assets, (list, tuple)) else [assets]
+    sources = [
+        iter([asset]) if asset.source is None else asset.chunks()
+        for asset in assets
+    ]
+    buffers = [None] * len(assets)
+    while True:
+        for k, source in enumerate(sources):
+            while buffers[k] is None or buffers[k].timestamp.shape[0] == 0:
+                buffers[k] = next(source, None)
+                if buffers[k] is None:
+                    sources[k] = iter(())
+                    break
+        live = [buffer for buffer in buffers if buffer is not None]
+        if len(live) == 0:
+            return
+        watermark = min(buffer.timestamp[-1] for buffer in live)
+        parts = []
+        for k, buffer in enumerate(buffers):
+            if buffer is None:
+                continue
+            n = buffer.timestamp.shape[0]
+            j = np.searchsorted(buffer.timestamp, watermark, side="right")
+            if j > 0:
+                parts.append(buffer.window(0, j))
+            buffers[k] = buffer.window(j, n) if j < n else None
+        yield ticker_set(parts)
 
 
 class Asset:
@@ -61,6 +300,7 @@ class Asset:
     def __init__(
         self,
         price,
+        timestamp=None,
         spread=0,
         commissions=0,
         slippage=0,
@@ -71,32 +311,22 @@ class Asset:
         quote="NA",
         usd_converter=None,
     ):
+        if quote.upper() != "USD" and usd_converter is None:
+            raise ValueError(
+                "Argument `usd_converter` cannot be None if quote is not USD."
+            )
+
         # dynamic
-        self.price = price
-        self.spread = (
-            [spread for _ in range(price.shape[0])]
-            if isinstance(spread, (float, int))
-            else spread
-        )
-        self.commissions = (
-            [commissions for _ in range(price.shape[0])]
-            if isinstance(commissions, (float, int))
-            else commissions
-        )
-        self.slippage = (
-            [slippage for _ in range(price.shape[0])]
-            if isinstance(slippage, (float, int))
-            else slippage
-        )
-        if quote.upper() != "USD":
-            if usd_converter is not None:
-                self.usd_equivalent = self.price * usd_converter
-            else:
-                raise ValueError(
-                    "Argument `usd_converter` cannot be None if quote is not USD."
-                )
+        if isinstance(price, Streamer):
+            self.source = price
+            self.timestamp, self.price = None, None
         else:
-            self.usd_equivalent = self.price
+            self.source = None
+            self.timestamp, self.price = as_columns(price, timestamp)
+        self.spread = spread
+        self.commissions = commissions
+        self.slippage = slippage
+        self.usd_converter = usd_converter
 
         # static
         self.base = base
@@ -110,18 +340,54 @@ class Asset:
         self.registered = []
         self.n_registered = 0
 
+        self.usd_equivalent = self.__usd_equivalent()
+
+    def __usd_equivalent(self):
+        if self.price is None or self.quote.upper() == "USD":
+            return self.price
+        return self.price * self.usd_converter
+
+    def __view(self, timestamp, price, start, stop):
+        view = copy.copy(self)
+        view.source = None
+        view.timestamp, view.price = timestamp, price
+        for attr in ("spread", "commissions", "slippage", "usd_converter"):
+            value = getattr(self, attr)
+            if np.ndim(value) > 0:
+                setattr(view, attr, value[start:stop])
+        view.usd_equivalent = view.__usd_equivalent()
+        return view
+
+    def window(self, start, stop):
+        "View of the in-memory asset over rows [start, stop), without copy."
+        return self.__view(
+            self.timestamp[start:stop], self.price[start:stop], start, stop
+        )
+
+    def chunks(self):
+        "Yield in-memory views of a streamed asset, one per chunk."
+        start = 0
+        for chunk in self.source:
+            stop = start + chunk.shape[0]
+            yield self.__view(*as_columns(chunk), start, stop)
+            start = stop
+
     def reset(self):
         self.__init__()
 
     def features(self):
         output = vars(self).copy()
-        del (
-            output["price"],
-            output["spread"],
-            output["commissions"],
-            output["slippage"],
-            output["usd_equivalent"],
-        )
+        for attr in (
+            "timestamp",
+            "price",
+            "spread",
+            "commissions",
+            "slippage",
+            "usd_converter",
+            "usd_equivalent",
+            "source",
+        ):
+            del output[attr]
         return output
 
     def register(self, *strategies):
@@ -133,25 +399,8 @@ class Asset:
         return strategies if n > 1 else strategies[0]
 
     def data(self):
-        return [
-            Ticker(
-                aid=self.id,
-                timestamp=t[0],
-                price=t[1],
-                spread=t[2],
-                commissions=t[3],
-                slippage=t[4],
-                usd_equivalent=t[5],
-            )
-            for t in zip(
-                self.price[:, 1],
-                self.price[:, 0],
-                self.spread,
-                self.commissions,
-                self.slippage,
-                self.usd_equivalent,
-            )
-        ]
+        "Materialize one `Ticker` per row, prefer `TickerSet` in loops."
+        return [Ticker(*ticker.to_tuple()) for (ticker,) in TickerSet(self)]
 
 
 class Currency(Asset):
@@ -205,6 +454,7 @@ class Stock(Asset):
             commissions=commissions,
             lot_units=lot_units,
             type=type,
+            base=base,
             quote=quote,
             *args,
             **kwargs,
@@ -220,4 +470,4 @@ class ETF:
 
 class Option:
     def __init__(self):
-        pass
\ No newline at end of file
+        pass
@@ -0,0 +1,260 @@
+import glob
+import json
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from strategy_tester.asset import Stock
+from strategy_tester.data import read_frames, write_atomic
+from strategy_tester.utils import to_ns
+
+HISTDATA_NAME = re.compile(r"DAT_ASCII_([A-Z]+)_.*")
+
+
+def default_symbol(path):
+    "Symbol of a file, the pair for HistData files, the file name otherwise."
+    name = os.path.splitext(os.path.basename(path))[0]
+    match = HISTDATA_NAME.match(name)
+    return match.group(1) if match else name
+
+
+def parse(path, format=None):
+    "Parse a price file into int64 timestamps and float64 columns."
+    frame = next(read_frames(path, format)).dropna()
+    output = {
+        column: frame[column].values.astype(float)
+        for column in frame.columns
+        if column != "timestamp"
+    }
+    output["timestamp"] = to_ns(frame["timestamp"].values)
+    return output
+
+
+class Catalog:
+    """
+    Columnar on-disk store of the market data of many symbols.
+
+    Each symbol has its own directory of column files (`timestamp.npy`,
+    `close.npy`, ...), its rows being sorted by time. An index
+    (`index.json`) records the length, time range and columns of each
+    symbol. Ingesting files only rewrites the symbols they contain and the
+    index. Columns are memory-mapped, so a query only reads the pages of
+    the symbols and dates it asks for.
+
+    Parameters
+    ----------
+    root : str
+        Directory of the store, created on first ingest.
+
+    Attributes
+    ----------
+    symbols : dict
+        Index entry of each symbol, with `n`, `start`, `end`, `columns` and
+        `sources`.
+    columns : list of str
+        Columns stored for at least one symbol, missing values of a symbol
+        are NaN.
+
+    Examples
+    --------
+    >>> catalog = Catalog("data/catalog").ingest("data/market", n_jobs=8)
+    >>> stocks = catalog.load(
+    ...     ["AAPL", "MSFT"], start="2015-01-01", end="2016-01-01",
+    ...     column="adj_close",
+    ... )
+    """
+
+    version = 2
+
+    def __init__(self, root):
+        self.root = root
+        self.symbols = {}
+        self.columns = []
+        self.__columns = {}
+        try:
+            with open(self.__index_path()) as f:
+                index = json.load(f)
+        except FileNotFoundError:
+            return
+        if index["version"] != self.version:
+            raise ValueError(
+                f"Unsupported catalog version {index['version']}."
+            )
+        self.symbols = index["symbols"]
+        self.columns = index["columns"]
+
+    def __index_path(self):
+        return os.path.join(self.root, "index.json")
+
+    def __column_path(self, symbol, column):
+        return os.path.join(self.root, symbol, f"{column}.npy")
+
+    def column(self, symbol, name):
+        """
+        Read-only memory map of a column of a symbol, NaN if the symbol does
+        not have it.
+        """
+        entry = self.symbols[symbol]
+        if name not in entry["columns"]:
+            if name not in self.columns:
+                raise KeyError(f"Unknown column `{name}`.")
+            return np.full(entry["n"], np.nan)
+        key = (symbol, name)
+        if key not in self.__columns:
+            self.__columns[key] = np.load(
+                self.__column_path(symbol, name), mmap_mode="r"
+            )
+        return self.__columns[key]
+
+    def ingest(
+        self, paths, pattern="*.csv", symbol=None, format=None, n_jobs=None
+    ):
+        """
+        Parse files in parallel processes and add them to the store. Files of
+        the same symbol (e.g. monthly HistData files) are merged. Symbols
+        already in the store are replaced, the others are left untouched.
+
+        Parameters
+        ----------
+        paths : str or list of str
+            Files, or a directory to search with `pattern`.
+        symbol : callable
+            Maps a path to its symbol, `default_symbol` if None.
+        n_jobs : int
+            Number of worker processes, the number of CPUs if None.
+        """
+        if isinstance(paths, str):
+            paths = sorted(glob.glob(os.path.join(paths, pattern)))
+        symbol = default_symbol if symbol is None else symbol
+
+        with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+            parsed = list(
+                executor.map(parse, paths, [format] * len(paths), chunksize=8)
+            )
+
+        groups = {}
+        for path, data in zip(paths, parsed):
+            groups.setdefault(symbol(path), []).append((path, data))
+
+        symbols = dict(self.symbols)
+        for s, items in groups.items():
+            data = self.__merge([d for _, d in items])
+            n = data["timestamp"].shape[0]
+            old = symbols.pop(s, {"columns": []})
+            self.__columns = {
+                key: value
+                for key, value in self.__columns.items()
+                if key[0] != s
+            }
+            if n == 0:
+                self.__remove(s, old["columns"])
+                continue
+            os.makedirs(os.path.join(self.root, s), exist_ok=True)
+            columns = list(data)
+            for c in columns:
+                write_atomic(self.__column_path(s, c), data[c])
+            self.__remove(s, [c for c in old["columns"] if c not in data])
+            symbols[s] = {
+                "n": n,
+                "start": int(data["timestamp"][0]),
+                "end": int(data["timestamp"][-1]),
+                "columns": columns,
+                "sources": [p for p, _ in items],
+            }
+
+        columns = []
+        for entry in symbols.values():
+            columns.extend(c for c in entry["columns"] if c not in columns)
+        os.makedirs(self.root, exist_ok=True)
+        index = {
+            "version": self.version,
+            "columns": columns,
+            "symbols": symbols,
+        }
+        tmp = f"{self.__index_path()}.{os.getpid()}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(index, f)
+        os.replace(tmp, self.__index_path())
+        self.symbols, self.columns = symbols, columns
+        return self
+
+    def __remove(self, symbol, columns):
+        "Delete column files of a symbol."
+        for c in columns:
+            path = self.__column_path(symbol, c)
+            if os.path.exists(path):
+                os.remove(path)
+
+    @staticmethod
+    def __merge(items):
+        "Merge parsed files of a symbol, sorted by time without duplicates."
+        if len(items) == 1 and np.all(np.diff(items[0]["timestamp"]) > 0):
+            return items[0]
+        columns = set.intersection(*(set(d) for d in items))
+        data = {c: np.concatenate([d[c] for d in items]) for c in columns}
+        _, idx = np.unique(data["timestamp"], return_index=True)
+        return {c: values[idx] for c, values in data.items()}
+
+    def rows(self, symbol, start=None, end=None):
+        "Slice of the rows of a symbol within [start, end]."
+        entry = self.symbols[symbol]
+        n = entry["n"]
+        start = None if start is None else to_ns(start)
+        end = None if end is None else to_ns(end)
+        # resolved from the index alone when possible
+        if (start is not None and start > entry["end"]) or (
+            end is not None and end < entry["start"]
+        ):
+            return slice(0, 0)
+        if (start is None or start <= entry["start"]) and (
+            end is None or end >= entry["end"]
+        ):
+            return slice(0, n)
+        timestamp = self.column(symbol, "timestamp")
+        i = 0 if start is None else np.searchsorted(timestamp, start)
+        j = n if end is None else np.searchsorted(timestamp, end, side="right")
+        return slice(i, j)
+
+    def load(
+        self,
+        symbols=None,
+        start=None,
+        end=None,
+        column="close",
+        asset=Stock,
+        **kwargs,
+    ):
+        """
+        Build assets from the rows of the given symbols within [start, end].
+        Only the requested slices are read. Symbols without any row in the
+        range are skipped.
+
+        Parameters
+        ----------
+        symbols : str or list of str
+            Symbols to load, all of them if None.
+        column : str
+            Price column, e.g. `close` or `adj_close`.
+        asset : callable
+            Asset class or factory, called with `price`, `timestamp`, `base`
+            (the symbol) and `kwargs`, e.g. for currency pairs
+            `lambda base, **kw: Currency(base=base[:3], quote=base[3:], **kw)`.
+        """
+        if symbols is None:
+            symbols = list(self.symbols)
+        elif isinstance(symbols, str):
+            symbols = [symbols]
+
+        output = []
+        for s in symbols:
+            rows = self.rows(s, start, end)
+            if rows.stop > rows.start:
+                output.append(
+                    asset(
+                        price=self.column(s, column)[rows],
+                        timestamp=self.column(s, "timestamp")[rows],
+                        base=s,
+                        **kwargs,
+                    )
+                )
+        return output
@@ -1,15 +1,290 @@
+import hashlib
+import json
+import os
+import queue
+import threading
+import numpy as np
 import pandas as pd
+from strategy_tester.utils import PRICE_DTYPE, to_ns
+
+HISTDATA_COLUMNS = ["timestamp", "open", "high", "low", "close", "volume"]
+
+
+def detect_format(path):
+    "Guess the format of a price file, either `histdata` or `yahoo`."
+    with open(path) as f:
+        line = f.readline()
+    return "histdata" if ";" in line else "yahoo"
+
+
+def normalize(frame, format):
+    """
+    Parse the timestamps of a raw data frame and give it lower case column
+    names, e.g. `timestamp`, `close` and `adj_close`.
+    """
+    if format == "histdata":
+        frame["timestamp"] = pd.to_datetime(
+            frame["timestamp"], format="%Y%m%d %H%M%S"
+        )
+        return frame
+    frame = frame.drop(
+        columns=[c for c in frame.columns if c.startswith("Unnamed")]
+    )
+    frame.columns = [c.lower().replace(" ", "_") for c in frame.columns]
+    frame = frame.rename(columns={"date": "timestamp"})
+    frame["timestamp"] = pd.to_datetime(frame["timestamp"], format="%Y-%m-%d")
+    return frame
+
+
+def read_frames(path, format=None, chunksize=None):
+    """
+    Read a HistData (`;` separated, `YYYYMMDD HHMMSS` timestamps) or a Yahoo
+    CSV file into normalized data frames, see `normalize`. Yields the whole
+    file at once if `chunksize` is None.
+    """
+    format = detect_format(path) if format is None else format
+    if format == "histdata":
+        kwargs = {
+            "sep": ";",
+            "header": None,
+            "names": HISTDATA_COLUMNS,
+            "dtype": {"timestamp": str},
+        }
+    elif format == "yahoo":
+        kwargs = {}
+    else:
+        raise ValueError("Argument `format` must be `histdata` or `yahoo`.")
+
+    if chunksize is None:
+        yield normalize(pd.read_csv(path, **kwargs), format)
+    else:
+        with pd.read_csv(path, chunksize=chunksize, **kwargs) as reader:
+            for frame in reader:
+                yield normalize(frame, format)
+
+
+def to_records(frame, column="close"):
+    "Convert a normalized data frame to a `PRICE_DTYPE` record array."
+    frame = frame.dropna(subset=[column])
+    output = np.empty(frame.shape[0], dtype=PRICE_DTYPE)
+    output["timestamp"] = frame["timestamp"].values
+    output["price"] = frame[column].values
+    return output
+
+
+def prefetch(iterable, size=1):
+    """
+    Iterate in a background thread, keeping up to `size` items ready ahead
+    of the consumer. Exceptions are raised in the consumer.
+    """
+    items = queue.Queue(maxsize=size)
+    stop = threading.Event()
+    end = object()
+
+    def put(item):
+        while not stop.is_set():
+            try:
+                items.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def worker():
+        try:
+            for item in iterable:
+                if not put(item):
+                    return
+        except Exception as e:
+            put(e)
+        put(end)
+
+    thread = threading.Thread(target=worker, daemon=True)
+    thread.start()
+    try:
+        while True:
+            item = items.get()
+            if item is end:
+                break
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        stop.set()
+        thread.join()
 
 
 class MemoryLoader:
-    "Read a file composed of close prices."
+    """
+    Read a file composed of close prices.
+
+    On first load, the file is parsed once and converted to a binary cache:
+    one `.npy` file per column (timestamps as int64 nanoseconds since epoch,
+    the rest as float64) and a small JSON header describing the source.
+    Later loads memory-map the cached columns, so they are read lazily from
+    the page cache and shared by every process using the same file. The
+    cache is rebuilt whenever the size or modification time of the source
+    changes, or its content hash if `checksum` is True.
+
+    Parameters
+    ----------
+    path : str
+        Path of a HistData or Yahoo CSV file.
+    cache_dir : str
+        Directory of the cache, `<path>.cache` if None.
+    format : str
+        Either `histdata` or `yahoo`, guessed from the file if None.
+    checksum : bool
+        If True, also compare the SHA-1 hash of the source to validate the
+        cache. This reads the whole source on each load.
 
-    def __init__(self, path):
-        pass
+    Attributes
+    ----------
+    columns : tuple of str
+        Names of the cached columns, e.g. `timestamp`, `close`.
+    n : int
+        Number of rows, rows with missing values are dropped.
+
+    Examples
+    --------
+    >>> loader = MemoryLoader("data/market/AAPL.csv")
+    >>> aapl = Stock(
+    ...     price=loader["adj_close"], timestamp=loader["timestamp"], base="AAPL"
+    ... )
+    """
+
+    version = 1
+
+    def __init__(self, path, cache_dir=None, format=None, checksum=False):
+        self.path = path
+        self.cache_dir = f"{path}.cache" if cache_dir is None else cache_dir
+        self.format = format
+        self.checksum = checksum
+        self.__columns = {}
+
+        header = self.__read_header()
+        if header is None or header["source"] != self.__describe_source():
+            header = self.__build()
+        self.columns = tuple(header["columns"])
+        self.n = header["n"]
+
+    def __header_path(self):
+        return os.path.join(self.cache_dir, "header.json")
+
+    def __column_path(self, column):
+        return os.path.join(self.cache_dir, f"{column}.npy")
+
+    def __describe_source(self):
+        stat = os.stat(self.path)
+        output = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+        if self.checksum:
+            sha1 = hashlib.sha1()
+            with open(self.path, "rb") as f:
+                for block in iter(lambda: f.read(1 << 20), b""):
+                    sha1.update(block)
+            output["sha1"] = sha1.hexdigest()
+        return output
+
+    def __read_header(self):
+        try:
+            with open(self.__header_path()) as f:
+                header = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return header if header.get("version") == self.version else None
+
+    def __build(self):
+        "Parse the source and write the cache, header last."
+        source = self.__describe_source()
+        frame = next(read_frames(self.path, self.format)).dropna()
+        os.makedirs(self.cache_dir, exist_ok=True)
+        for column in frame.columns:
+            if column == "timestamp":
+                values = to_ns(frame[column].values)
+            else:
+                values = frame[column].values.astype(float)
+            write_atomic(self.__column_path(column), values)
+        header = {
+            "version": self.version,
+            "source": source,
+            "columns": list(frame.columns),
+            "n": frame.shape[0],
+        }
+        tmp = f"{self.__header_path()}.{os.getpid()}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(header, f)
+        os.replace(tmp, self.__header_path())
+        return header
+
+    def __getitem__(self, column):
+        "Read-only memory map of a column."
+        if column not in self.columns:
+            raise KeyError(f"Unknown column `{column}`.")
+        if column not in self.__columns:
+            self.__columns[column] = np.load(
+                self.__column_path(column), mmap_mode="r"
+            )
+        return self.__columns[column]
+
+    def to_records(self, column="close"):
+        "Copy a price column to a `PRICE_DTYPE` record array."
+        output = np.empty(self.n, dtype=PRICE_DTYPE)
+        output["timestamp"] = self["timestamp"]
+        output["price"] = self[column]
+        return output
+
+
+def write_atomic(path, array):
+    "Save an array as `.npy`, replacing `path` only once it is complete."
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        np.save(f, array)
+    os.replace(tmp, path)
 
 
 class Streamer:
-    "Stream a file composed of close prices."
+    """
+    Stream a file composed of close prices.
+
+    The file is read in chunks of fixed size, each one is returned as a
+    record array of `timestamp` and `price` (see `utils.PRICE_DTYPE`), so
+    it can be given to an `Asset` in place of its price array. While a chunk
+    is simulated, the next one is read in a background thread.
+
+    Parameters
+    ----------
+    path : str
+        Path of a HistData or Yahoo CSV file.
+    chunksize : int
+        Number of rows per chunk.
+    column : str
+        Name of the price column, e.g. `close` or `adj_close`.
+    format : str
+        Either `histdata` or `yahoo`, guessed from the file if None.
+    prefetch : bool
+        If True, read the next chunk in a background thread.
+    """
+
+    def __init__(
+        self,
+        path,
+        chunksize=100000,
+        column="close",
+        format=None,
+        prefetch=True,
+    ):
+        self.path = path
+        self.chunksize = chunksize
+        self.column = column
+        self.format = detect_format(path) if format is None else format
+        self.prefetch = prefetch
+
+    def read_chunks(self):
+        "Read the chunks in the calling thread."
+        for frame in read_frames(self.path, self.format, self.chunksize):
+            yield to_records(frame, self.column)
 
-    def __init__(self, path):
-        pass
+    def __iter__(self):
+        if self.prefetch:
+            return prefetch(self.read_chunks())
+        return self.read_chunks()
@@ -0,0 +1,240 @@
+import hashlib
+import json
+import os
+import weakref
+from collections import OrderedDict
+import numpy as np
+from strategy_tester.asset import Asset
+from strategy_tester.data import write_atomic
+from strategy_tester.kernels import ewm
+from strategy_tester.utils import error_logger
+
+error_log = error_logger()
+
+
+def _as_float(x):
+    return np.ascontiguousarray(x, dtype=float)
+
+
+def sma(x, n):
+    "Simple moving average over `n` rows, NaN for the first `n - 1`."
+    x = _as_float(x)
+    output = np.full(x.shape[0], np.nan)
+    if n <= x.shape[0]:
+        total = np.cumsum(x)
+        total[n:] = total[n:] - total[:-n]
+        output[n - 1 :] = total[n - 1 :] / n
+    return output
+
+
+def rolling_std(x, n, ddof=0):
+    "Moving standard deviation over `n` rows, NaN for the first `n - 1`."
+    x = _as_float(x)
+    output = np.full(x.shape[0], np.nan)
+    if n <= x.shape[0] and n > ddof:
+        # strided windows rather than running sums of squares, which lose
+        # the precision of small variances, in blocks to bound the memory
+        m = x.shape[0] - n + 1
+        windows = np.lib.stride_tricks.as_strided(
+            x, shape=(m, n), strides=(x.strides[0],) * 2, writeable=False
+        )
+        step = max(2**20 // n, 1)
+        for a in range(0, m, step):
+            output[n - 1 + a : n - 1 + a + step] = windows[a : a + step].std(
+                axis=1, ddof=ddof
+            )
+    return output
+
+
+def _wilder(x, n, alpha, start=0):
+    """
+    Exponential average of `x[start:]` with smoothing `alpha`, seeded with
+    the mean of its first `n` rows.
+    """
+    output = np.full(x.shape[0], np.nan)
+    seed = start + n - 1
+    if seed < x.shape[0]:
+        output[seed] = x[start : seed + 1].mean()
+        ewm(x, alpha, seed, output)
+    return output
+
+
+def ema(x, n):
+    "Exponential moving average, `alpha = 2 / (n + 1)`, seeded with the SMA."
+    return _wilder(_as_float(x), n, 2 / (n + 1))
+
+
+def rsi(x, n=14):
+    "Relative strength index with Wilder's smoothing, from 0 to 100."
+    x = _as_float(x)
+    delta = np.diff(x, prepend=np.nan)
+    gain = _wilder(np.maximum(delta, 0), n, 1 / n, start=1)
+    loss = _wilder(np.maximum(-delta, 0), n, 1 / n, start=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        output = 100 - 100 / (1 + gain / loss)
+    output[loss == 0] = 100
+    output[np.isnan(gain)] = np.nan
+    return output
+
+
+def atr(x, n=14, high=None, low=None):
+    """
+    Average true range with Wilder's smoothing. With close prices only, the
+    true range is the absolute change of the price.
+    """
+    x = _as_float(x)
+    high = x if high is None else _as_float(high)
+    low = x if low is None else _as_float(low)
+    previous = np.roll(x, 1)
+    true_range = np.maximum(high, previous) - np.minimum(low, previous)
+    return _wilder(true_range, n, 1 / n, start=1)
+
+
+INDICATORS = {
+    "sma": sma,
+    "ema": ema,
+    "rolling_std": rolling_std,
+    "rsi": rsi,
+    "atr": atr,
+}
+
+
+class IndicatorCache:
+    """
+    Memoize indicators, so that each series is computed once per data set,
+    indicator and parameters, e.g. across the configurations of a `Grid`
+    sweep.
+
+    Entries are keyed by a SHA-1 fingerprint of the data (timestamps and
+    prices of an asset), the name of the indicator and its parameters.
+    The fingerprint of an array is computed once while it is alive, arrays
+    must not be modified in place. The least recently used entries are
+    evicted beyond `max_bytes`. If `path` is given, entries are also saved
+    there as `.npy` files and reloaded by later runs or other processes.
+    Returned arrays are read-only.
+
+    Parameters
+    ----------
+    max_bytes : int
+        Memory budget of the cached series.
+    path : str
+        Directory of the on-disk cache, None to keep it in memory only.
+
+    Attributes
+    ----------
+    nbytes : int
+        Size of the series in memory.
+    hits, misses : int
+        Number of lookups found or computed.
+
+    Examples
+    --------
+    >>> cache = IndicatorCache(path="data/indicators")
+    >>> exog = lambda p: np.column_stack(
+    ...     [cache.get("sma", eur, n=p[k]) for k in ("slow", "fast")]
+    ... )
+    >>> WalkForward(account, MACross, paramset, train=n, test=m).run(eur, exog)
+    """
+
+    def __init__(self, max_bytes=256 * 2**20, path=None):
+        self.max_bytes = max_bytes
+        self.path = path
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.__entries = OrderedDict()
+        self.__fingerprints = {}
+        if path is not None:
+            os.makedirs(path, exist_ok=True)
+
+    def __len__(self):
+        return len(self.__entries)
+
+    def __digest(self, array):
+        "Fingerprint of an array, remembered while it is alive."
+        key = id(array)
+        if key in self.__fingerprints:
+            ref, digest = self.__fingerprints[key]
+            if ref() is array:
+                return digest
+        digest = hashlib.sha1(np.ascontiguousarray(array).data).hexdigest()
+        fingerprints = self.__fingerprints
+        ref = weakref.ref(array, lambda _: fingerprints.pop(key, None))
+        fingerprints[key] = (ref, digest)
+        return digest
+
+    def fingerprint(self, x):
+        "Fingerprint of the data of an in-memory asset, or of an array."
+        if isinstance(x, Asset):
+            if x.price is None:
+                message = "Indicators of streamed assets cannot be cached."
+                error_log.error(message)
+                raise ValueError(message)
+            return self.__digest(x.timestamp) + self.__digest(x.price)
+        return self.__digest(x)
+
+    def key(self, indicator, x, params):
+        if callable(indicator):
+            indicator = f"{indicator.__module__}.{indicator.__qualname__}"
+        description = json.dumps(
+            [self.fingerprint(x), indicator, params],
+            sort_keys=True,
+            default=repr,
+        )
+        return hashlib.sha1(description.encode("utf-8")).hexdigest()
+
+    def get(self, indicator, x, **params):
+        """
+        Series of an indicator of an asset or array. `indicator` is the
+        name of one of `INDICATORS`, or any function taking the prices and
+        `params`.
+        """
+        if isinstance(indicator, str):
+            if indicator not in INDICATORS:
+                message = f"Unknown indicator `{indicator}`."
+                error_log.error(message)
+                raise ValueError(message)
+            fun = INDICATORS[indicator]
+        else:
+            fun = indicator
+        values = x.price if isinstance(x, Asset) else x
+        key = self.key(indicator, x, params)
+
+        if key in self.__entries:
+            self.__entries.move_to_end(key)
+            self.hits += 1
+            return self.__entries[key]
+
+        output = None
+        if self.path is not None:
+            try:
+                output = np.load(self.__file(key), mmap_mode="r")
+                self.hits += 1
+            except (OSError, ValueError):
+                output = None
+        if output is None:
+            output = np.asarray(fun(values, **params))
+            output.flags.writeable = False
+            self.misses += 1
+            if self.path is not None:
+                write_atomic(self.__file(key), output)
+        self.__insert(key, output)
+        return output
+
+    def __file(self, key):
+        return os.path.join(self.path, f"{key}.npy")
+
+    def __insert(self, key, array):
+        if array.nbytes > self.max_bytes:
+            return
+        self.__entries[key] = array
+        self.nbytes += array.nbytes
+        while self.nbytes > self.max_bytes:
+            _, evicted = self.__entries.popitem(last=False)
+            self.nbytes -= evicted.nbytes
+
+    def clear(self):
+        "Drop the series in memory, the on-disk cache is kept."
+        self.__entries.clear()
+        self.nbytes = 0
+        return self
@@ -0,0 +1,338 @@
+import numpy as np
+
+try:
+    from numba import njit
+
+    HAS_NUMBA = True
+except ImportError:
+    HAS_NUMBA = False
+
+NO_EXPIRATION = np.iinfo(np.int64).max
+
+
+def _update_orders_numpy(
+    prices,
+    timestamp,
+    slot,
+    sign,
+    strike_price,
+    size,
+    lot_units,
+    spread,
+    leverage,
+    stop_loss,
+    take_profit,
+    trailing_stop_loss,
+    expiration_date,
+    pips,
+    profit,
+    margin,
+    max_adverse_excursion,
+    max_favorable_excursion,
+    closed,
+):
+    "NumPy implementation of `update_orders`."
+    price = prices[slot]
+    valid = ~np.isnan(price)
+    new_pips = sign * (price - strike_price)
+    np.copyto(pips, new_pips, where=valid)
+    np.copyto(profit, (new_pips * lot_units - spread) * size, where=valid)
+    np.copyto(margin, price * size * lot_units / leverage, where=valid)
+    np.fmax(
+        max_favorable_excursion,
+        np.where(valid, new_pips, np.nan),
+        out=max_favorable_excursion,
+    )
+    np.fmax(
+        max_adverse_excursion,
+        np.where(valid, -new_pips, np.nan),
+        out=max_adverse_excursion,
+    )
+
+    expired = valid & (expiration_date <= timestamp)
+    hit = valid & ~expired & ((pips >= take_profit) | (pips <= -stop_loss))
+    trail = valid & ~expired & ~np.isnan(trailing_stop_loss)
+    np.copyto(stop_loss, trailing_stop_loss - pips, where=trail)
+    np.logical_or(expired, hit, out=closed)
+    return closed
+
+
+def _update_orders_loop(
+    prices,
+    timestamp,
+    slot,
+    sign,
+    strike_price,
+    size,
+    lot_units,
+    spread,
+    leverage,
+    stop_loss,
+    take_profit,
+    trailing_stop_loss,
+    expiration_date,
+    pips,
+    profit,
+    margin,
+    max_adverse_excursion,
+    max_favorable_excursion,
+    closed,
+):
+    "Loop implementation of `update_orders`, compiled with numba."
+    for k in range(slot.shape[0]):
+        price = prices[slot[k]]
+        closed[k] = False
+        if np.isnan(price):
+            continue
+        p = sign[k] * (price - strike_price[k])
+        pips[k] = p
+        profit[k] = (p * lot_units[k] - spread[k]) * size[k]
+        margin[k] = price * size[k] * lot_units[k] / leverage[k]
+        if p > max_favorable_excursion[k]:
+            max_favorable_excursion[k] = p
+        elif -p > max_adverse_excursion[k]:
+            max_adverse_excursion[k] = -p
+        if expiration_date[k] <= timestamp:
+            closed[k] = True
+            continue
+        if p >= take_profit[k] or p <= -stop_loss[k]:
+            closed[k] = True
+        if not np.isnan(trailing_stop_loss[k]):
+            stop_loss[k] = trailing_stop_loss[k] - p
+    return closed
+
+
+if HAS_NUMBA:
+    update_orders = njit(cache=True, nogil=True)(_update_orders_loop)
+else:
+    update_orders = _update_orders_numpy
+
+update_orders.__doc__ = """
+Update pips, profit and margin of all open orders, apply trailing stop
+losses, and flag the orders to close due to expiration, take profit or stop
+loss, following `Order.update`. Arrays are updated in place.
+
+Parameters
+----------
+prices : ndarray of float
+    Latest price of each asset slot, NaN if the asset did not tick.
+timestamp : int
+    Current timestamp, in nanoseconds since epoch.
+slot : ndarray of int
+    Asset slot of each order.
+sign : ndarray of float
+    1 for long and -1 for short orders.
+stop_loss, take_profit, trailing_stop_loss : ndarray of float
+    Levels in price units, NaN if not set.
+expiration_date : ndarray of int
+    Expiration timestamps, `NO_EXPIRATION` if not set.
+max_adverse_excursion, max_favorable_excursion : ndarray of float
+    Largest loss and gain seen so far, in price units.
+closed : ndarray of bool
+    Output, True for the orders to close.
+"""
+
+
+class OrderBook:
+    """
+    Struct-of-arrays mirror of the open market orders of an account, to
+    update them all at once with `update_orders`. Rows are removed by
+    moving the last row in their place.
+
+    Parameters
+    ----------
+    capacity : int
+        Initial number of rows to allocate, grows by doubling.
+    """
+
+    float_columns = (
+        "sign",
+        "strike_price",
+        "size",
+        "lot_units",
+        "spread",
+        "leverage",
+        "stop_loss",
+        "take_profit",
+        "trailing_stop_loss",
+        "pips",
+        "profit",
+        "margin",
+        "max_adverse_excursion",
+        "max_favorable_excursion",
+    )
+    int_columns = ("asset_slot", "strategy_slot", "expiration_date")
+
+    def __init__(self, capacity=64):
+        self.n = 0
+        self.keys = []
+        self.index = {}
+        self.slots = {}
+        self.strategy_slots = {}
+        self.prices = np.full(0, np.nan)
+        self.capacity = 0
+        self.__allocate(capacity)
+
+    def __allocate(self, capacity):
+        for columns, dtype in (
+            (self.float_columns, float),
+            (self.int_columns, np.int64),
+        ):
+            for column in columns:
+                array = np.zeros(capacity, dtype=dtype)
+                if self.capacity > 0:
+                    array[: self.n] = getattr(self, column)[: self.n]
+                setattr(self, column, array)
+        self.closed = np.zeros(capacity, dtype=bool)
+        self.capacity = capacity
+
+    def __len__(self):
+        return self.n
+
+    def __contains__(self, key):
+        return key in self.index
+
+    def slot_of(self, asset_id):
+        "Integer slot of an asset, assigned on first sight."
+        if asset_id not in self.slots:
+            self.slots[asset_id] = len(self.slots)
+            self.prices = np.append(self.prices, np.nan)
+        return self.slots[asset_id]
+
+    def rows_of(self, strategy_id):
+        "Rows of the orders of a strategy."
+        slot = self.strategy_slots.get(strategy_id)
+        if slot is None:
+            return np.empty(0, dtype=np.int64)
+        return np.flatnonzero(self.strategy_slot[: self.n] == slot)
+
+    def add(self, key, order):
+        if self.n == self.capacity:
+            self.__allocate(2 * self.capacity)
+        k = self.n
+        nan = np.nan
+        self.asset_slot[k] = self.slot_of(order.asset_id)
+        self.strategy_slot[k] = self.strategy_slots.setdefault(
+            order.strategy_id, len(self.strategy_slots)
+        )
+        self.sign[k] = 1 if order.position == "long" else -1
+        self.strike_price[k] = order.strike_price
+        self.size[k] = order.size
+        self.lot_units[k] = order.asset_features["lot_units"]
+        self.spread[k] = order.spread
+        self.leverage[k] = order.leverage
+        self.stop_loss[k] = nan if order.stop_loss is None else order.stop_loss
+        self.take_profit[k] = (
+            nan if order.take_profit is None else order.take_profit
+        )
+        self.trailing_stop_loss[k] = (
+            nan
+            if order.trailing_stop_loss is None
+            else order.trailing_stop_loss
+        )
+        self.expiration_date[k] = (
+            NO_EXPIRATION
+            if order.expiration_date is None
+            else order.expiration_date
+        )
+        self.pips[k] = order.pips
+        self.profit[k] = order.profit
+        self.margin[k] = order.margin
+        self.max_adverse_excursion[k] = order.max_adverse_excursion
+        self.max_favorable_excursion[k] = order.max_favorable_excursion
+        self.keys.append(key)
+        self.index[key] = k
+        self.n += 1
+        return self
+
+    def sync(self, key, order):
+        "Write the state of a row back to its `Order()`."
+        k = self.index[key]
+        order.pips = float(self.pips[k])
+        order.profit = float(self.profit[k])
+        order.margin = float(self.margin[k])
+        order.max_adverse_excursion = float(self.max_adverse_excursion[k])
+        order.max_favorable_excursion = float(self.max_favorable_excursion[k])
+        if order.trailing_stop_loss is not None:
+            order.stop_loss = float(self.stop_loss[k])
+        return order
+
+    def modify(self, key, order):
+        "Write the stops of an `Order()`, changed by a strategy, to its row."
+        k = self.index[key]
+        self.stop_loss[k] = (
+            np.nan if order.stop_loss is None else order.stop_loss
+        )
+        self.take_profit[k] = (
+            np.nan if order.take_profit is None else order.take_profit
+        )
+        self.trailing_stop_loss[k] = (
+            np.nan
+            if order.trailing_stop_loss is None
+            else order.trailing_stop_loss
+        )
+        return self
+
+    def remove(self, key):
+        k = self.index.pop(key)
+        last = self.n - 1
+        if k != last:
+            for column in self.float_columns + self.int_columns:
+                array = getattr(self, column)
+                array[k] = array[last]
+            self.keys[k] = self.keys[last]
+            self.index[self.keys[k]] = k
+        self.keys.pop()
+        self.n -= 1
+        return self
+
+    def update(self, tickers):
+        "Run `update_orders` on the latest tickers, return keys to close."
+        prices = self.prices
+        prices[:] = np.nan
+        for ticker in tickers:
+            slot = self.slots.get(ticker.aid)
+            if slot is not None:
+                prices[slot] = ticker.price
+        n = self.n
+        closed = update_orders(
+            prices,
+            tickers[0].timestamp,
+            self.asset_slot[:n],
+            self.sign[:n],
+            self.strike_price[:n],
+            self.size[:n],
+            self.lot_units[:n],
+            self.spread[:n],
+            self.leverage[:n],
+            self.stop_loss[:n],
+            self.take_profit[:n],
+            self.trailing_stop_loss[:n],
+            self.expiration_date[:n],
+            self.pips[:n],
+            self.profit[:n],
+            self.margin[:n],
+            self.max_adverse_excursion[:n],
+            self.max_favorable_excursion[:n],
+            self.closed[:n],
+        )
+        return [self.keys[k] for k in np.flatnonzero(closed)]
+
+
+def _ewm_loop(x, alpha, start, out):
+    "Loop implementation of `ewm`, compiled with numba."
+    for i in range(start + 1, x.shape[0]):
+        out[i] = out[i - 1] + alpha * (x[i] - out[i - 1])
+    return out
+
+
+if HAS_NUMBA:
+    ewm = njit(cache=True, nogil=True)(_ewm_loop)
+else:
+    ewm = _ewm_loop
+
+ewm.__doc__ = """
+Exponentially weighted recursion `out[i] = out[i - 1] + alpha * (x[i] -
+out[i - 1])` for the rows after `start`, `out[start]` being the seed. `out`
+is updated in place.
+"""
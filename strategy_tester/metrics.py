@@ -0,0 +1,212 @@
+from abc import ABC, abstractmethod
+import numpy as np
+
+
+class Metric(ABC):
+    """
+    Online performance metric for `BackTest(track=...)`.
+
+    A metric is reset by `start` when a run begins, then updated in O(1)
+    per event: `update` at each tick, closed trades through
+    `Account.subscribe`, or the new rows of the account histories when its
+    value is requested. Calling it returns its current value. History
+    metrics start over on each new account, so they can be used anywhere a
+    plain `fun(Account)` is expected, others follow the account given to
+    `start`.
+    """
+
+    def start(self, Account):
+        "Reset the state at the beginning of a run."
+        return self
+
+    def update(self, tickers, Account):
+        "Runs at each tick."
+        pass
+
+    def skip(self, n, Account):
+        """
+        Runs instead of `update` for `n` ticks skipped by fast-forward,
+        during which the account does not change.
+        """
+        pass
+
+    @abstractmethod
+    def value(self, Account):
+        "Current value of the metric."
+
+    def __call__(self, Account):
+        return self.value(Account)
+
+
+class HistoryMetric(Metric):
+    """
+    Metric of an account history (`balance`, `equity`, `equity_curve`...),
+    consuming only the rows appended since the last call. Called on another
+    account, or a reset one, it starts over from its first row.
+
+    Parameters
+    ----------
+    on : str
+        Name of the history, see `Account.history`.
+    """
+
+    _account_id = None
+
+    def __init__(self, on="balance"):
+        self.on = on
+        self.n_seen = 0
+
+    def start(self, Account):
+        self._account_id = Account.id
+        self.n_seen = 0
+        return self
+
+    @abstractmethod
+    def consume(self, value):
+        "Update the state with a new row of the history."
+
+    def catch_up(self, Account):
+        if self._account_id != Account.id:
+            self.start(Account)
+        values = Account.history(self.on).values
+        for value in values[self.n_seen :].tolist():
+            self.consume(value)
+        self.n_seen = values.shape[0]
+        return self
+
+    def __call__(self, Account):
+        return self.catch_up(Account).value(Account)
+
+
+class ReturnOnInvestment(Metric):
+    "Same as `utils.ROI`."
+
+    def value(self, Account):
+        return (
+            Account.balance - Account.initial_balance
+        ) / Account.initial_balance
+
+
+class SharpeRatio(HistoryMetric):
+    """
+    Same as `utils.sharpe_ratio`, ROI in excess of the risk free rate over
+    the standard deviation of the balance history, kept with Welford's
+    algorithm.
+    """
+
+    def __init__(self, risk_free_rate=0.05, on="balance"):
+        super().__init__(on)
+        self.risk_free_rate = risk_free_rate
+
+    def start(self, Account):
+        self.count, self.mean, self.m2 = 0, 0.0, 0.0
+        return super().start(Account)
+
+    def consume(self, value):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+
+    def value(self, Account):
+        if self.count < 2:
+            return np.nan
+        sigma = np.sqrt(max(self.m2, 0.0) / (self.count - 1))
+        if sigma == 0:
+            return np.nan
+        return (
+            ReturnOnInvestment().value(Account) - self.risk_free_rate
+        ) / sigma
+
+
+class SortinoRatio(HistoryMetric):
+    """
+    ROI in excess of the risk free rate over the downside deviation of the
+    returns between consecutive rows of the history.
+    """
+
+    def __init__(self, risk_free_rate=0.05, on="balance"):
+        super().__init__(on)
+        self.risk_free_rate = risk_free_rate
+
+    def start(self, Account):
+        self.last = Account.initial_balance
+        self.count, self.downside = 0, 0.0
+        return super().start(Account)
+
+    def consume(self, value):
+        if self.last != 0:
+            r = value / self.last - 1
+            self.count += 1
+            if r < 0:
+                self.downside += r * r
+        self.last = value
+
+    def value(self, Account):
+        if self.count == 0 or self.downside == 0:
+            return np.nan
+        return (
+            ReturnOnInvestment().value(Account) - self.risk_free_rate
+        ) / np.sqrt(self.downside / self.count)
+
+
+class MaxDrawdown(HistoryMetric):
+    "Largest relative decline from a running peak of the history."
+
+    def start(self, Account):
+        self.peak = Account.initial_balance
+        self.max_drawdown = 0.0
+        return super().start(Account)
+
+    def consume(self, value):
+        if value > self.peak:
+            self.peak = value
+        elif self.peak > 0:
+            drawdown = 1 - value / self.peak
+            if drawdown > self.max_drawdown:
+                self.max_drawdown = drawdown
+
+    def value(self, Account):
+        return self.max_drawdown
+
+
+class Exposure(Metric):
+    "Ratio of the ticks with at least one open order."
+
+    def start(self, Account):
+        self.n_ticks, self.n_exposed = 0, 0
+        return self
+
+    def update(self, tickers, Account):
+        self.n_ticks += 1
+        if Account.n_active_orders > 0:
+            self.n_exposed += 1
+
+    def skip(self, n, Account):
+        self.n_ticks += n
+        if Account.n_active_orders > 0:
+            self.n_exposed += n
+
+    def value(self, Account):
+        return self.n_exposed / self.n_ticks if self.n_ticks > 0 else np.nan
+
+
+class WinRate(Metric):
+    "Ratio of the closed orders with a positive profit."
+
+    _account_id = None
+
+    def start(self, Account):
+        self.n_trades, self.n_wins = 0, 0
+        if self._account_id != Account.id:
+            self._account_id = Account.id
+            Account.subscribe(self.on_trade_close)
+        return self
+
+    def on_trade_close(self, order, Account):
+        self.n_trades += 1
+        if order.profit > 0:
+            self.n_wins += 1
+
+    def value(self, Account):
+        return self.n_wins / self.n_trades if self.n_trades > 0 else np.nan
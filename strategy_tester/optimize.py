@@ -1,13 +1,136 @@
+import copy
+import os
+from concurrent.futures import ProcessPoolExecutor
 import numpy as np
-from strategy_tester.utils import dict_product
+import pandas as pd
+from strategy_tester.utils import (
+    dict_product,
+    dict_product_item,
+    dict_product_size,
+    error_logger,
+    sample_without_replacement,
+    to_timestamp,
+)
+from strategy_tester.shared import SharedAssets, is_asset, release, resolve
 from strategy_tester.simulate import BackTest
 
+error_log = error_logger()
+
+
+def _register(strategy, assets):
+    """
+    Register the assets on a fresh strategy, unless it chose its own. The
+    registration is made on a copy of each asset, the assets of the caller
+    are shared by all the jobs and left as they are.
+    """
+    if len(strategy.on) == 0 and is_asset(assets):
+        assets = assets if isinstance(assets, (list, tuple)) else [assets]
+        for asset in assets:
+            asset = copy.copy(asset)
+            asset.registered = list(asset.registered)
+            asset.register(strategy)
+    return strategy
+
+
+def _run_config(job):
+    "Run a backtest for one set of hyperparameters, in a worker or not."
+    account, strategy, sid, params, args, kwargs = job
+    # close the blocks the previous jobs of this worker do not view anymore
+    release()
+    try:
+        args = [resolve(arg) for arg in args]
+        kwargs = {key: resolve(value) for key, value in kwargs.items()}
+        strategy = strategy(id=sid, name=f"strategy_{sid}", **params)
+        assets = kwargs.get("assets", args[0] if len(args) > 0 else None)
+        _register(strategy, assets)
+        return BackTest(account, strategy).run(*args, **kwargs)
+    except Exception as e:
+        message = f"Backtest failed for params {params}: {e!r}"
+        error_log.error(message)
+        raise RuntimeError(message) from e
+
+
+def _resume(job):
+    "Continue a backtest over the timestamps [start, stop) of the assets."
+    backtest, params, assets, exog, start, stop, tear_down = job
+    release()
+    try:
+        assets = resolve(assets)
+        assets = assets if isinstance(assets, (list, tuple)) else [assets]
+        windows = []
+        for asset in assets:
+            i, j = np.searchsorted(asset.timestamp, [start, stop])
+            if j > i:
+                windows.append(asset.window(i, j))
+        if len(windows) > 0:
+            backtest.run(windows, exog=exog, tear_down=tear_down)
+        return backtest
+    except Exception as e:
+        message = f"Backtest failed for params {params}: {e!r}"
+        error_log.error(message)
+        raise RuntimeError(message) from e
+
+
+def _union_timestamp(assets):
+    "Union of the timestamps of the assets, the time axis of `BackTest`."
+    assets = assets if isinstance(assets, (list, tuple)) else [assets]
+    return np.unique(np.concatenate([asset.timestamp for asset in assets]))
+
+
+def _bounds(timestamp, a, b):
+    "Timestamps [start, stop) of the rows [a, b) of the time axis."
+    n = timestamp.shape[0]
+    return timestamp[a], timestamp[b] if b < n else timestamp[-1] + 1
+
+
+def _score(backtest, metric):
+    "Score of a backtest, mark-to-market equity if `metric` is None."
+    if metric is None:
+        return backtest.Account.mark_to_market()
+    return metric(backtest.Account)
+
+
+def _rank(scores):
+    "Indices of the scores from best to worst, NaN last."
+    return np.argsort(-np.nan_to_num(scores, nan=-np.inf), kind="stable")
+
 
 class ParamSearch:
-    def __init__(self, account, strategy, paramset):
+    """
+    Backtest a strategy for several sets of hyperparameters.
+
+    Parameters
+    ----------
+    account : Account
+        Template account, each set of hyperparameters is run on a fresh
+        copy of it.
+    strategy : class
+        Strategy class, instantiated with each set of hyperparameters.
+    paramset : dict of list
+        Values of each hyperparameter.
+    n_jobs : int
+        Number of worker processes, 1 to run in the calling process, -1 to
+        use all CPUs.
+    chunksize : int
+        Number of parameter sets sent to a worker at once. Assets given to
+        `run` are published once in shared memory (see `SharedAssets`),
+        workers attach to them instead of receiving a copy.
+
+    Attributes
+    ----------
+    params : list of dict
+        Sets of hyperparameters of the last run, in order.
+    output : list of BackTest
+        Results of the backtests, in the order of `params`.
+    """
+
+    def __init__(self, account, strategy, paramset, n_jobs=1, chunksize=1):
         self.account = account
         self._strategy = strategy
         self._paramset = paramset
+        self.n_jobs = n_jobs
+        self.chunksize = chunksize
+        self.params = []
         self.output = []
         self._sid = 0
 
@@ -19,44 +142,394 @@ class ParamSearch:
     def paramset(self):
         return self._paramset
 
+    def _n_workers(self, n_tasks):
+        "Number of worker processes for `n_tasks`, 1 to run in-process."
+        n_jobs = os.cpu_count() if self.n_jobs == -1 else self.n_jobs
+        return 1 if n_jobs is None or n_tasks <= 1 else max(n_jobs, 1)
+
+    @staticmethod
+    def _share(shared, args, kwargs):
+        "Replace the assets in the arguments by shared memory handles."
+
+        def share(x):
+            if not is_asset(x):
+                return x
+            if isinstance(x, (list, tuple)):
+                return [shared.share(asset) for asset in x]
+            return shared.share(x)
+
+        return [share(arg) for arg in args], {
+            key: share(value) for key, value in kwargs.items()
+        }
+
+    def _map(self, fun, jobs):
+        "Apply `fun` to the jobs in order, in a process pool if `n_jobs` > 1."
+        n_workers = self._n_workers(len(jobs))
+        if n_workers == 1:
+            return list(map(fun, jobs))
+        with ProcessPoolExecutor(max_workers=n_workers) as executor:
+            return list(executor.map(fun, jobs, chunksize=self.chunksize))
+
     def _run(self, params, *args, **kwargs):
-        "Run for one set of hyperparameters."
-        self.account.reset()
-        sname = f"strategy_{self._sid}"
-        strategy = self._strategy(id=self._sid, name=sname, **params)
-        result = BackTest(self.account, strategy).run(*args, **kwargs)
-        self.output.append(result)
-        self._sid += 1
+        "Run for the given sets of hyperparameters, keeping their order."
+        with SharedAssets([]) as shared:
+            if self._n_workers(len(params)) > 1:
+                args, kwargs = self._share(shared, args, kwargs)
+            jobs = []
+            for p in params:
+                jobs.append(
+                    (
+                        copy.deepcopy(self.account),
+                        self._strategy,
+                        self._sid,
+                        p,
+                        args,
+                        kwargs,
+                    )
+                )
+                self._sid += 1
+            results = self._map(_run_config, jobs)
+        self.params.extend(params)
+        self.output.extend(results)
+        return self
 
 
 class Grid(ParamSearch):
     def run(self, *args, **kwargs):
-        params = dict_product(self._paramset)
-        list(map(lambda s: self._run(s, *args, **kwargs), params))
-        return self
+        params = list(dict_product(self._paramset))
+        return self._run(params, *args, **kwargs)
 
 
-# TODO: check whether we should create the variable params at the initialization
-# TODO: simplify the code
 class Random(ParamSearch):
-    def __init__(self, q, *args, **kwargs):
+    """
+    Backtest a random fraction `q` of the grid of hyperparameters, see
+    `ParamSearch` for the other parameters.
+
+    Distinct indices of the grid are drawn without replacement and decoded
+    into sets of hyperparameters one by one, so the grid is never
+    materialized.
+
+    Parameters
+    ----------
+    q : float in (0,1)
+        Fraction of the grid to sample.
+    seed : int
+        Seed of the random generator.
+    """
+
+    def __init__(self, q, *args, seed=None, **kwargs):
         super().__init__(*args, **kwargs)
         if not 0 < q < 1:
             raise ValueError("q must be in (0,1)")
         self.q = q
+        self.rng = np.random.default_rng(seed)
 
     def run(self, *args, **kwargs):
-        params = list(dict_product(self._paramset))
-        size = len(params)
+        paramset = {
+            key: list(values) for key, values in self._paramset.items()
+        }
+        size = dict_product_size(paramset)
         self.n = int(size * self.q)
 
-        idxs = np.random.randint(0, size, self.n, dtype=int)
-        params = [params[i] for i in idxs]
+        idxs = sample_without_replacement(self.rng, size, self.n)
+        params = [dict_product_item(paramset, i) for i in idxs]
+
+        return self._run(params, *args, **kwargs)
+
 
-        list(map(lambda s: self._run(s, *args, **kwargs), params))
+class SuccessiveHalving(ParamSearch):
+    """
+    Successive halving over the grid of hyperparameters, see `ParamSearch`
+    for the other parameters.
+
+    All candidates are run on the first `min_fraction` of the history and
+    ranked by `metric`, the best `1 / eta` of them continue on a history
+    `eta` times longer, and so on until the survivors reach the end. Every
+    rung resumes the backtests where the previous one stopped, open orders
+    included, so no tick is simulated twice.
+
+    Parameters
+    ----------
+    eta : int
+        Reduction factor of the candidates, and growth factor of the
+        history, from one rung to the next.
+    min_fraction : float in (0,1]
+        Fraction of the history of the first rung, `eta ** -(n_rungs - 1)`
+        if None, `n_rungs` being the number of times the candidates can be
+        divided by `eta`, plus one.
+    metric : callable
+        Score of an account, the higher the better. Mark-to-market equity
+        if None.
+
+    Attributes
+    ----------
+    params : list of dict
+        All candidate sets of hyperparameters.
+    output : list of BackTest
+        Backtest of each candidate, as of its last rung.
+    rungs : list of dict
+        For each rung, the fraction of the history reached, the indices of
+        the candidates that ran it and their scores.
+    survivors : list of int
+        Indices of the candidates that ran the whole history, best first.
+    n_ticks : int
+        Total number of simulated ticks, over all candidates.
+    """
+
+    def __init__(self, *args, eta=3, min_fraction=None, metric=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if eta < 2:
+            raise ValueError("eta must be at least 2")
+        if min_fraction is not None and not 0 < min_fraction <= 1:
+            raise ValueError("min_fraction must be in (0,1]")
+        self.eta = eta
+        self.min_fraction = min_fraction
+        self.metric = metric
+
+    def fractions(self, n_candidates):
+        "Fraction of the history reached at each rung."
+        if self.min_fraction is None:
+            n_rungs = 1
+            while n_candidates >= self.eta**n_rungs:
+                n_rungs += 1
+            return [self.eta ** (k - n_rungs + 1) for k in range(n_rungs)]
+        output = [self.min_fraction]
+        while output[-1] < 1:
+            output.append(min(output[-1] * self.eta, 1))
+        return output
+
+    def score(self, backtest):
+        return _score(backtest, self.metric)
+
+    def run(self, assets, exog=None):
+        params = list(dict_product(self._paramset))
+        self.params = params
+        self.output = []
+        for p in params:
+            strategy = self._strategy(
+                id=self._sid, name=f"strategy_{self._sid}", **p
+            )
+            _register(strategy, assets)
+            self.output.append(BackTest(copy.deepcopy(self.account), strategy))
+            self._sid += 1
+
+        timestamp = _union_timestamp(assets)
+        n = timestamp.shape[0]
+
+        self.rungs = []
+        self.n_ticks = 0
+        candidates = list(range(len(params)))
+        a = 0
+        fractions = self.fractions(len(candidates))
+        with SharedAssets([]) as shared:
+            if self._n_workers(len(candidates)) > 1:
+                (assets,), _ = self._share(shared, [assets], {})
+            for k, fraction in enumerate(fractions):
+                b = n
+                if k < len(fractions) - 1:
+                    b = min(max(int(np.ceil(fraction * n)), a + 1), n)
+                last = b == n
+                start, stop = _bounds(timestamp, a, b)
+                jobs = [
+                    (
+                        self.output[i],
+                        params[i],
+                        assets,
+                        None if exog is None else exog[a:b],
+                        start,
+                        stop,
+                        last,
+                    )
+                    for i in candidates
+                ]
+                for i, backtest in zip(candidates, self._map(_resume, jobs)):
+                    self.output[i] = backtest
+                self.n_ticks += (b - a) * len(candidates)
+
+                scores = [self.score(self.output[i]) for i in candidates]
+                self.rungs.append(
+                    {
+                        "fraction": b / n,
+                        "candidates": candidates,
+                        "scores": scores,
+                    }
+                )
+                ranked = [candidates[j] for j in _rank(scores)]
+                if last:
+                    break
+                candidates = ranked[: max(len(candidates) // self.eta, 1)]
+                a = b
+        self.survivors = ranked
         return self
 
 
+class WalkForward(ParamSearch):
+    """
+    Walk-forward optimization over the grid of hyperparameters, see
+    `ParamSearch` for the other parameters.
+
+    The time axis is cut into consecutive out-of-sample windows of `test`
+    ticks. The grid is backtested on the in-sample window before each of
+    them, the best set of hyperparameters according to `metric` is then
+    backtested on the out-of-sample window. Windows are views of the
+    assets, and all the backtests of a stage run in the same process pool,
+    in-sample windows being independent of each other.
+
+    Parameters
+    ----------
+    train : int
+        Number of ticks of the in-sample windows, or of the first one if
+        `anchored`.
+    test : int
+        Number of ticks of the out-of-sample windows.
+    step : int
+        Number of ticks between the starts of two windows, `test` if None.
+        At least `test`, so that out-of-sample windows do not overlap.
+    anchored : bool
+        If True, in-sample windows all start at the first tick and grow,
+        otherwise they roll.
+    metric : callable
+        Score of an account, the higher the better. Mark-to-market equity
+        if None.
+
+    Attributes
+    ----------
+    params : list of dict
+        Sets of hyperparameters of the grid.
+    windows : list of tuple of int
+        Rows of the start of the in-sample window, and of the start and end
+        of the out-of-sample window, on the union of the timestamps.
+    scores : ndarray of shape (n_windows, n_params)
+        In-sample score of each set of hyperparameters.
+    best : list of int
+        Index of the set of hyperparameters chosen for each window.
+    output : list of BackTest
+        Out-of-sample backtest of each window.
+    equity_curve : DataFrame
+        Balance history of the out-of-sample backtests, stitched by
+        compounding the return of each window.
+    """
+
+    def __init__(
+        self,
+        *args,
+        train,
+        test,
+        step=None,
+        anchored=False,
+        metric=None,
+        **kwargs,
+    ):
+        super().__init__(*args, **kwargs)
+        if train < 1 or test < 1 or (step is not None and step < 1):
+            raise ValueError("train, test and step must be positive")
+        if step is not None and step < test:
+            raise ValueError("step must be at least test")
+        self.train = train
+        self.test = test
+        self.step = test if step is None else step
+        self.anchored = anchored
+        self.metric = metric
+
+    def split(self, n):
+        "In-sample start, out-of-sample start and end rows of each window."
+        output = []
+        for start in range(self.train, n, self.step):
+            a = 0 if self.anchored else start - self.train
+            output.append((a, start, min(start + self.test, n)))
+        return output
+
+    def __backtest(self, params, assets):
+        strategy = self._strategy(
+            id=self._sid, name=f"strategy_{self._sid}", **params
+        )
+        _register(strategy, assets)
+        self._sid += 1
+        return BackTest(copy.deepcopy(self.account), strategy)
+
+    def run(self, assets, exog=None):
+        """
+        Run all windows. `exog` is aligned with the union of the timestamps
+        of the assets, as in `BackTest.run`, or is a callable returning it
+        for a set of hyperparameters, e.g. indicators of the strategy. It is
+        then computed once per set of hyperparameters over the whole history
+        and sliced for each window.
+        """
+        params = list(dict_product(self._paramset))
+        self.params = params
+        timestamp = _union_timestamp(assets)
+        self.windows = self.split(timestamp.shape[0])
+
+        if callable(exog):
+            features = [exog(p) for p in params]
+        else:
+            features = [exog] * len(params)
+
+        def window(x, a, b):
+            return None if x is None else x[a:b]
+
+        with SharedAssets([]) as shared:
+            n_jobs = len(self.windows) * len(params)
+            handles = assets
+            if self._n_workers(n_jobs) > 1:
+                (handles,), _ = self._share(shared, [assets], {})
+
+            jobs = []
+            for a, b, _ in self.windows:
+                for i, p in enumerate(params):
+                    jobs.append(
+                        (
+                            self.__backtest(p, assets),
+                            p,
+                            handles,
+                            window(features[i], a, b),
+                            *_bounds(timestamp, a, b),
+                            True,
+                        )
+                    )
+            in_sample = self._map(_resume, jobs)
+            self.scores = np.array(
+                [_score(backtest, self.metric) for backtest in in_sample],
+                dtype=float,
+            ).reshape(len(self.windows), len(params))
+            self.best = [int(_rank(scores)[0]) for scores in self.scores]
+
+            jobs = [
+                (
+                    self.__backtest(params[i], assets),
+                    params[i],
+                    handles,
+                    window(features[i], b, c),
+                    *_bounds(timestamp, b, c),
+                    True,
+                )
+                for i, (_, b, c) in zip(self.best, self.windows)
+            ]
+            self.output = self._map(_resume, jobs)
+
+        self.equity_curve = self.stitch(self.output)
+        return self
+
+    def stitch(self, backtests):
+        "Chain the balance histories of consecutive backtests."
+        initial_balance = self.account.initial_balance
+        level = initial_balance
+        timestamps, balances = [], []
+        for backtest in backtests:
+            history = backtest.Account.history("balance")
+            timestamps.append(history.timestamp)
+            balances.append(history.values * (level / initial_balance))
+            level *= backtest.Account.balance / initial_balance
+        return pd.DataFrame(
+            {
+                "timestamp": to_timestamp(
+                    np.concatenate(timestamps or [np.empty(0, np.int64)])
+                ),
+                "balance": np.concatenate(balances or [np.empty(0)]),
+            }
+        )
+
+
 if __name__ == "__main__":
     from strategy_tester.utils import generate_data, dict_product
     from strategy_tester.account import Account
@@ -73,4 +546,4 @@ if __name__ == "__main__":
         ]
     }
     sim = Random(0.7, account, Strategy, paramset).run(data.values)
-    print(sim.output)
\ No newline at end of file
+    print(sim.output)
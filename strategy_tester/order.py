@@ -1,11 +1,128 @@
 from datetime import datetime as dt
 from uuid import uuid4
-from strategy_tester.utils import error_logger, transaction_logger
+import numpy as np
+from strategy_tester.utils import error_logger, transaction_logger, to_ns
 
 error_log = error_logger()
 transaction_log = transaction_logger()
 
 
+class OrderHistory:
+    """
+    History of the pips, profit and margin of an order, kept in typed arrays
+    that grow by doubling.
+
+    Parameters
+    ----------
+    policy : str
+        `full` keeps every update, `every_n` one update out of `n`, `ring`
+        the last `n` updates, and `none` nothing.
+    n : int
+        Step of `every_n`, or size of `ring`.
+
+    Attributes
+    ----------
+    timestamp : ndarray of int64
+        Timestamps of the kept updates, in chronological order.
+    pips, profit, margin : ndarray of float
+        Kept values, in chronological order.
+    n_seen : int
+        Number of updates received, kept or not.
+    """
+
+    policies = ("none", "every_n", "ring", "full")
+
+    def __init__(self, policy="full", n=None):
+        if policy not in self.policies:
+            message = f"Argument `policy` must be one of {self.policies}."
+            error_log.error(message)
+            raise ValueError(message)
+        if policy in ("every_n", "ring") and (n is None or n < 1):
+            message = f"Argument `n` must be a positive integer for {policy}."
+            error_log.error(message)
+            raise ValueError(message)
+        self.policy = policy
+        self.n = n
+        self.n_seen = 0
+        self.size = 0
+        capacity = {"none": 0, "ring": n}.get(policy, 16)
+        self.__timestamp = np.empty(capacity, dtype=np.int64)
+        self.__values = np.empty((capacity, 3))
+
+    def __len__(self):
+        return min(self.size, self.__timestamp.shape[0])
+
+    def append(self, timestamp, pips, profit, margin):
+        k = self.n_seen
+        self.n_seen += 1
+        if self.policy == "none" or (self.policy == "every_n" and k % self.n):
+            return self
+        capacity = self.__timestamp.shape[0]
+        if self.policy == "ring":
+            i = self.size % capacity
+        else:
+            i = self.size
+            if i == capacity:
+                self.__timestamp = np.resize(self.__timestamp, 2 * capacity)
+                self.__values = np.resize(self.__values, (2 * capacity, 3))
+        self.__timestamp[i] = timestamp
+        self.__values[i] = pips, profit, margin
+        self.size += 1
+        return self
+
+    def extend(self, timestamp, pips, profit, margin):
+        "Vectorized `append` of several updates, given as arrays."
+        m = timestamp.shape[0]
+        k = np.arange(self.n_seen, self.n_seen + m)
+        self.n_seen += m
+        if self.policy == "none" or m == 0:
+            return self
+        values = np.column_stack([pips, profit, margin])
+        if self.policy == "every_n":
+            keep = k % self.n == 0
+            timestamp, values = timestamp[keep], values[keep]
+            m = timestamp.shape[0]
+        capacity = self.__timestamp.shape[0]
+        if self.policy == "ring":
+            # only the last `capacity` updates survive
+            i = (self.size + np.arange(m))[-capacity:] % capacity
+            self.__timestamp[i] = timestamp[-capacity:]
+            self.__values[i] = values[-capacity:]
+        else:
+            while self.size + m > capacity:
+                capacity *= 2
+            if capacity > self.__timestamp.shape[0]:
+                self.__timestamp = np.resize(self.__timestamp, capacity)
+                self.__values = np.resize(self.__values, (capacity, 3))
+            self.__timestamp[self.size : self.size + m] = timestamp
+            self.__values[self.size : self.size + m] = values
+        self.size += m
+        return self
+
+    def __chronological(self, array):
+        n = len(self)
+        if self.policy == "ring" and self.size > n:
+            i = self.size % n
+            return np.concatenate([array[i:], array[:i]])
+        return array[:n].copy()
+
+    @property
+    def timestamp(self):
+        return self.__chronological(self.__timestamp)
+
+    @property
+    def pips(self):
+        return self.__chronological(self.__values[:, 0])
+
+    @property
+    def profit(self):
+        return self.__chronological(self.__values[:, 1])
+
+    @property
+    def margin(self):
+        return self.__chronological(self.__values[:, 2])
+
+
 class Order:
     """Keep track of an order, set TP, SL levels and store history. One can
     use this class to act on it."""
@@ -30,6 +147,8 @@ class Order:
         round_digits=2,
         expiration_date=None,
         slippage=0,
+        history="full",
+        history_n=None,
     ):
         if type.lower() not in ["market", "pending"]:
             message = "Argument `type` must be either `market` or `pending`."
@@ -50,20 +169,24 @@ class Order:
         self.strategy_id = strategy_id
         self.strategy_name = strategy_name
         self.round_digits = round_digits
-        self.expiration_date = expiration_date
+        self.expiration_date = (
+            to_ns(expiration_date) if expiration_date is not None else None
+        )
 
         self.asset_features = asset_features
 
         self.is_active = True
         self.is_open = self.type != "pending"
         self.profit = -spread * size
-        self.profits = [self.profit]
         self.margin = (
             strike_price * size * self.asset_features["lot_units"]
         ) / leverage
-        self.margins = [self.margin]
         self.pips = 0
-        self.pipss = [self.pips]
+        self.max_adverse_excursion = 0
+        self.max_favorable_excursion = 0
+        self.history = OrderHistory(history, history_n).append(
+            timestamp, self.pips, self.profit, self.margin
+        )
         self.id = uuid4()
 
         t = dt.utcnow()
@@ -123,29 +246,47 @@ class Order:
                     )
         return self
 
-    def __append_history(self, pips, profit, margin):
-        self.pipss.append(pips)
-        self.profits.append(profit)
-        self.margins.append(margin)
-        return self
+    @property
+    def pipss(self):
+        return self.history.pips
+
+    @property
+    def profits(self):
+        return self.history.profit
+
+    @property
+    def margins(self):
+        return self.history.margin
 
     def __update_basics(self, ticker):
+        """
+        Pips, profit net of the spread and leveraged margin at the price of
+        `ticker`, the same as `VectorBackTest` and `kernels.update_orders`.
+        """
         pips = (
             ticker.price - self.strike_price
             if self.position == "long"
             else self.strike_price - ticker.price
         )
-        profit = self.pips * self.size * self.asset_features["lot_units"]
+        profit = (
+            pips * self.asset_features["lot_units"] - self.spread
+        ) * self.size
         margin = (
             ticker.price * self.size * self.asset_features["lot_units"]
-        )  # <------------- TODO: convert to USD
+        ) / self.leverage  # <------------- TODO: convert to USD
         return pips, profit, margin
 
     def update(self, ticker):
         "Runs at each tick. Processes just one tick."
         if self.is_active and self.is_open:
             self.pips, self.profit, self.margin = self.__update_basics(ticker)
-            self.__append_history(self.pips, self.profit, self.margin)
+            if self.pips > self.max_favorable_excursion:
+                self.max_favorable_excursion = self.pips
+            elif -self.pips > self.max_adverse_excursion:
+                self.max_adverse_excursion = -self.pips
+            self.history.append(
+                ticker.timestamp, self.pips, self.profit, self.margin
+            )
             self.check_close(ticker)
             return True
         elif self.is_active and not self.is_open:
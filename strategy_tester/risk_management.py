@@ -1,4 +1,6 @@
+from itertools import islice
 import numpy as np
+from strategy_tester.utils import RollingWindow
 
 # TODO: change the name to a more appropriate one (e.g. order sizing, lot optimization, etc.?)
 
@@ -6,6 +8,8 @@ import numpy as np
 class RiskManagement:
     "Apply risk management and order sizing methods."
 
+    _account_id = None
+
     def __init__(self, size_min=0.01, size_max=50, digits=2):
         self.size_min = size_min
         self.size_max = size_max
@@ -14,6 +18,25 @@ class RiskManagement:
     def _order_size(self, Account, exog=None):
         return np.random.uniform(0, Account.balance / 1000, 1)[0]
 
+    def watch(self, Account):
+        """
+        Subscribe once to the closed trades of `Account`, a reset or another
+        account triggers `reset_stats` and a new subscription.
+        """
+        if self._account_id != Account.id:
+            self._account_id = Account.id
+            self.reset_stats(Account)
+            Account.subscribe(self.on_trade_close)
+        return self
+
+    def reset_stats(self, Account):
+        "Initialize the trade statistics, from the history of `Account`."
+        pass
+
+    def on_trade_close(self, order, Account):
+        "Update the trade statistics with a closed order."
+        pass
+
     def postprocess(self, size):
         if size > self.size_max:
             size = self.size_max
@@ -25,6 +48,16 @@ class RiskManagement:
         size = self._order_size(Account=Account, exog=exog, *args, **kwargs)
         return self.postprocess(size)
 
+    def _order_sizes(self, Account, n, exog=None):
+        return np.array([self._order_size(Account, exog) for _ in range(n)])
+
+    def order_sizes(self, Account, n, exog=None):
+        "Vectorized `order_size`, sizes of `n` orders placed at once."
+        size = np.asarray(self._order_sizes(Account, n, exog), dtype=float)
+        return np.round(
+            np.clip(size, self.size_min, self.size_max), self.digits
+        )
+
 
 class KellyCriterion(RiskManagement):
     def __init__(self, n=10, default_lots=0.01, *args, **kwargs):
@@ -32,19 +65,27 @@ class KellyCriterion(RiskManagement):
         self.n = n
         self.default_lots = default_lots
 
+    def reset_stats(self, Account):
+        self.profits = RollingWindow(self.n)
+        self.sizes = RollingWindow(self.n)
+        last_n_orders = islice(
+            reversed(Account.inactive_orders.values()), self.n
+        )
+        for order in reversed(list(last_n_orders)):
+            self.on_trade_close(order, Account)
+
+    def on_trade_close(self, order, Account):
+        self.profits.append(order.profit)
+        self.sizes.append(order.size)
+
     def _order_size(self, Account, exog=None):
-        if Account.n_inactive_orders < self.n:
+        self.watch(Account)
+        if not self.profits.is_full:
             return self.default_lots
         else:
-            last_n_orders = list(Account.inactive_orders.values())[-self.n :]
-            stats = np.array(
-                [[order.profit, order.size] for order in last_n_orders]
-            )
-            p_lose = np.sum(stats[:, 0] < 0) / self.n
+            p_lose = self.profits.n_negative / self.n
             p_win = 1 - p_lose
-            ave_size = np.mean(stats[:, 1])
-            ave_profit = np.mean(stats[:, 0])
-            return p_win - (p_lose / (ave_profit - ave_size))
+            return p_win - (p_lose / (self.profits.mean - self.sizes.mean))
 
 
 class ConstantLots(RiskManagement):
@@ -55,6 +96,9 @@ class ConstantLots(RiskManagement):
     def _order_size(self, Account, exog=None):
         return self.lots
 
+    def _order_sizes(self, Account, n, exog=None):
+        return np.full(n, self.lots)
+
 
 class ConstantRate(RiskManagement):
     def __init__(self, rate=0.1, on="balance", *args, **kwargs):
@@ -65,12 +109,17 @@ class ConstantRate(RiskManagement):
     def _order_size(self, Account, exog=None):
         return self.rate * getattr(Account, self.on)
 
+    def _order_sizes(self, Account, n, exog=None):
+        return np.full(n, self._order_size(Account, exog))
+
 
 class AccountVarianceBased(RiskManagement):
+    "Size orders inversely to the variance of an account value over trades."
+
     def __init__(
         self,
         n=20,
-        on="balances",
+        on="balance",
         default_lots=0.01,
         multiplier=1,
         *args,
@@ -78,16 +127,40 @@ class AccountVarianceBased(RiskManagement):
     ):
         super().__init__(*args, **kwargs)
         self.n = n
-        self.on = on
+        # plural names of the account histories are accepted as well
+        self.on = {
+            "balances": "balance",
+            "free_margins": "free_margin",
+            "equities": "equity",
+            "navs": "nav",
+        }.get(on, on)
         self.default_lots = default_lots
         self.multiplier = multiplier
 
+    def reset_stats(self, Account):
+        # one value per closed trade, walking back from the current value
+        # by the profits of the last `n` trades
+        self.window = RollingWindow(self.n)
+        value = getattr(Account, self.on)
+        values = []
+        for order in islice(
+            reversed(Account.inactive_orders.values()), self.n
+        ):
+            values.append(value)
+            value -= order.profit
+        for value in reversed(values):
+            self.window.append(value)
+
+    def on_trade_close(self, order, Account):
+        self.window.append(getattr(Account, self.on))
+
     def _order_size(self, Account, exog=None):
-        if Account.n_inactive_orders < self.n:
+        self.watch(Account)
+        if not self.window.is_full:
             return self.default_lots
         else:
-            var = np.var(getattr(Account, self.on)[-self.n :])
-            return self.multiplier / var
+            var = self.window.var()
+            return self.multiplier / var if var > 0 else self.size_max
 
 
 class VolatilityBased(RiskManagement):
@@ -105,4 +178,4 @@ class EqualWeight(RiskManagement):
         if Account.n_active_orders == 0:
             self.investable_capital = Account.balance
 
-        return np.floor(self.investable_capital / (n * price)).astype(int)
\ No newline at end of file
+        return np.floor(self.investable_capital / (n * price)).astype(int)
@@ -0,0 +1,203 @@
+from multiprocessing import shared_memory
+import numpy as np
+from strategy_tester.asset import Asset
+
+# blocks published by `SharedAssets` in this process, resolved in place
+_owned = {}
+# other blocks mapped by this process, until `release` closes them
+_attached = {}
+
+
+def _open(name):
+    "Attach to an existing block, without tracking it in this process."
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # Python < 3.13 always tracks, which is harmless in the workers of a
+        # multiprocessing pool as they share the tracker of the owner
+        return shared_memory.SharedMemory(name=name)
+
+
+def _block(name):
+    "Block of a name, attached once per process unless published by it."
+    if name in _owned:
+        return _owned[name]
+    if name not in _attached:
+        _attached[name] = _open(name)
+    return _attached[name]
+
+
+def release():
+    """
+    Close the blocks attached by this process that no array views anymore,
+    the others stay open until `release` is called again.
+    """
+    for name in list(_attached):
+        try:
+            _attached[name].close()
+        except BufferError:
+            continue
+        del _attached[name]
+
+
+class SharedArray:
+    """
+    Picklable handle of a NumPy array published in shared memory.
+
+    Parameters
+    ----------
+    name : str
+        Name of the shared memory block.
+    shape : tuple of int
+    dtype : str
+    """
+
+    def __init__(self, name, shape, dtype):
+        self.name = name
+        self.shape = shape
+        self.dtype = dtype
+
+    def attach(self):
+        "Read-only view of the array, the block is opened once per process."
+        # frombuffer holds the buffer, a viewed block cannot be unmapped
+        output = np.frombuffer(
+            _block(self.name).buf,
+            dtype=self.dtype,
+            count=int(np.prod(self.shape)),
+        ).reshape(self.shape)
+        output.flags.writeable = False
+        return output
+
+
+class AssetHandle:
+    """
+    Lightweight, picklable description of an `Asset` whose arrays live in
+    shared memory. Pickling it costs a few hundred bytes whatever the length
+    of the series.
+
+    Parameters
+    ----------
+    cls : class
+        Class of the asset.
+    state : dict
+        Attributes of the asset, arrays being replaced by `SharedArray`.
+    """
+
+    def __init__(self, cls, state):
+        self.cls = cls
+        self.state = state
+
+    def asset(self):
+        "Rebuild the asset on read-only views of the shared arrays."
+        output = object.__new__(self.cls)
+        output.__dict__.update(
+            {
+                key: (
+                    value.attach() if isinstance(value, SharedArray) else value
+                )
+                for key, value in self.state.items()
+            }
+        )
+        return output
+
+
+class SharedAssets:
+    """
+    Publish the arrays of assets into shared memory once, so that worker
+    processes attach to them instead of receiving a pickled copy.
+
+    The blocks belong to this object: they are released by `close()`, or
+    on exit when used as a context manager, after which the handles must
+    not be used anymore.
+
+    Parameters
+    ----------
+    assets : Asset or list of Asset
+        In-memory assets to publish.
+
+    Attributes
+    ----------
+    handles : list of AssetHandle
+        Handles of the assets, in order.
+
+    Examples
+    --------
+    >>> with SharedAssets(stocks) as shared:
+    ...     Grid(Account(), Strategy, paramset, n_jobs=8).run(shared.handles)
+    """
+
+    def __init__(self, assets):
+        assets = assets if isinstance(assets, (list, tuple)) else [assets]
+        self.blocks = []
+        self.__published = {}
+        self.handles = [self.share(asset) for asset in assets]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __publish(self, array):
+        # arrays shared by several attributes or assets are published once
+        if id(array) in self.__published:
+            return self.__published[id(array)][1]
+        source = array
+        array = np.ascontiguousarray(array)
+        block = shared_memory.SharedMemory(
+            create=True, size=max(array.nbytes, 1)
+        )
+        np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[...] = (
+            array
+        )
+        self.blocks.append(block)
+        _owned[block.name] = block
+        handle = SharedArray(block.name, array.shape, array.dtype.str)
+        self.__published[id(source)] = (source, handle)
+        return handle
+
+    def share(self, asset):
+        "Publish the arrays of an asset and return its handle."
+        if asset.source is not None:
+            raise ValueError("Streamed assets cannot be shared.")
+        state = {
+            key: (
+                self.__publish(value)
+                if isinstance(value, np.ndarray) and value.ndim > 0
+                else value
+            )
+            for key, value in vars(asset).items()
+        }
+        return AssetHandle(type(asset), state)
+
+    def close(self):
+        for block in self.blocks:
+            _owned.pop(block.name, None)
+            try:
+                block.close()
+            except BufferError:
+                # still viewed by assets resolved in this process
+                _attached[block.name] = block
+            block.unlink()
+        self.blocks = []
+        self.__published = {}
+        release()
+        return self
+
+
+def resolve(x):
+    "Rebuild the assets of handles, in a list or not, anything else as is."
+    if isinstance(x, AssetHandle):
+        return x.asset()
+    if isinstance(x, (list, tuple)) and any(
+        isinstance(item, AssetHandle) for item in x
+    ):
+        return [resolve(item) for item in x]
+    return x
+
+
+def is_asset(x):
+    "True for an asset, or a non-empty list of them."
+    if isinstance(x, (list, tuple)):
+        return len(x) > 0 and all(isinstance(item, Asset) for item in x)
+    return isinstance(x, Asset)
@@ -1,9 +1,24 @@
 from datetime import datetime as dt
+from itertools import islice, repeat
 import logging
+import os
+import pickle
+import struct
+import zlib
 import numpy as np
-from progressbar import ProgressBar
+import pandas as pd
+from progressbar import Counter, ProgressBar, Timer, UnknownLength
+from strategy_tester.asset import TickerSet, panels
+from strategy_tester.metrics import Metric
+from strategy_tester.kernels import NO_EXPIRATION
 from strategy_tester.order import Order
-from strategy_tester.utils import error_logger, transaction_logger
+from strategy_tester.strategy import Batch, Strategy
+from strategy_tester.utils import (
+    error_logger,
+    transaction_logger,
+    to_ns,
+    to_timestamp,
+)
 
 # TODO: implement dynamic slippage and spread (Slippage modeling and market impact models)
 # TODO: Make also time-driven
@@ -13,12 +28,29 @@ from strategy_tester.utils import error_logger, transaction_logger
 error_log = error_logger()
 transaction_log = transaction_logger()
 
+CHECKPOINT_MAGIC = b"PBTCKPT1"
+CHECKPOINT_VERSION = 1
+
+# end of the exogenous rows
+_END = object()
+
 
 def ensure_type_strategy(x):
     if isinstance(x, (list, tuple)) and len(x) > 0:
-        return {strategy.id: strategy for strategy in x}
+        output = {strategy.id: strategy for strategy in x}
     else:
-        return {x.id: x}
+        output = {x.id: x}
+    for strategy in output.values():
+        if strategy.batched and (
+            type(strategy).decide_batch is Strategy.decide_batch
+        ):
+            message = (
+                f"Strategy {strategy.name} is batched but does not implement "
+                "`decide_batch`."
+            )
+            error_log.error(message)
+            raise ValueError(message)
+    return output
 
 
 class BackTest:
@@ -36,7 +68,42 @@ class BackTest:
     track : tuple of callable
         A series of functions to calculate performance metrics. If None,
         nothing is calculated. All functions specified to this parameter
-        must take `Account` as an argument and return a value.
+        must take `Account` as an argument and return a value. Online
+        `metrics.Metric` objects are updated at each event and only read
+        every `track_freq` ticks, plain functions are called every
+        `track_freq` ticks.
+    history : str
+        Per-tick history policy of the orders, `full`, `every_n`, `ring` or
+        `none`, see `OrderHistory`. Maximum adverse and favorable excursions
+        are kept whatever the policy.
+    history_n : int
+        Step of `every_n`, or size of `ring`.
+    fast_forward : bool
+        If True, while every strategy declares with `Strategy.idle_until`
+        that it makes no decision, the ticks before the next stop loss, take
+        profit or expiration of an open order are skipped, and their effect
+        on the orders is computed with NumPy. Results are the same, ticks
+        are only skipped within panels of assets sharing their timestamps,
+        while all open orders are market orders without trailing stop
+        loss, and not past a tick where `track`, `Account.equity_freq` or
+        `checkpoint_freq` records a value.
+
+    Attributes
+    ----------
+    n_ticks : int
+        Number of ticks simulated so far, over all resumed runs.
+    first_timestamp, last_timestamp : int
+        First and last simulated timestamps, in nanoseconds since epoch.
+    is_resumable : bool
+        True between ticks and after a run without tear down, when the next
+        run continues after `last_timestamp` instead of starting over.
+
+    Examples
+    --------
+    A daily update simulates only the new ticks:
+
+    >>> BackTest(account, strategy).run(history, checkpoint="state.ckpt")
+    >>> backtest = BackTest.resume("state.ckpt", new_history)
     """
 
     def __init__(
@@ -47,6 +114,9 @@ class BackTest:
         slippage=0,
         track=None,
         track_freq=100,
+        history="full",
+        history_n=None,
+        fast_forward=False,
     ):
         #        if isinstance(Strategy, (list, tuple)) and len(Strategy) > 0:
         #            self.__Strategies = {
@@ -73,14 +143,27 @@ class BackTest:
         self.spread = spread
         self.track = track
         self.track_freq = track_freq
+        self.history = history
+        self.history_n = history_n
+        self.fast_forward = fast_forward
         self.tracked_results = []
+        self.metrics = [
+            fun for fun in (track or ()) if isinstance(fun, Metric)
+        ]
+        self.n_ticks = 0
+        self.first_timestamp = None
+        self.last_timestamp = None
+        self.is_resumable = False
         error_log.info("Simulation is initialized.")
 
-    def __check_long_open(self, tickers, Strategy, exog=None):
+    def __check_long_open(
+        self, tickers, Strategy, exog=None, preprocessed=False
+    ):
         args = Strategy.long_open(
             tickers=tickers,
             Account=self.Account,
             exog=exog,
+            preprocessed=preprocessed,
         )
         timestamp = tickers[0].timestamp
 
@@ -93,8 +176,11 @@ class BackTest:
                         asset_id=asset_id,
                         position="long",
                         timestamp=timestamp,
+                        spread=self.spread,
                         asset_features=self.asset_features[asset_id],
                         leverage=self.Account.leverage,
+                        history=self.history,
+                        history_n=self.history_n,
                         **arg,
                     )
                 )
@@ -102,11 +188,14 @@ class BackTest:
             error_log.info("Placed long orders.")
         return self
 
-    def __check_short_open(self, tickers, Strategy, exog=None):
+    def __check_short_open(
+        self, tickers, Strategy, exog=None, preprocessed=False
+    ):
         args = Strategy.short_open(
             tickers=tickers,
             Account=self.Account,
             exog=exog,
+            preprocessed=preprocessed,
         )
         timestamp = tickers[0].timestamp
 
@@ -122,6 +211,8 @@ class BackTest:
                         spread=self.spread,
                         asset_features=self.asset_features[asset_id],
                         leverage=self.Account.leverage,
+                        history=self.history,
+                        history_n=self.history_n,
                         **arg,
                     )
                 )
@@ -134,13 +225,16 @@ class BackTest:
             *args, **kwargs
         )
 
-    def check_order_close(self, order, tickers, Strategy, exog=None):
+    def check_order_close(
+        self, order, tickers, Strategy, exog=None, preprocessed=False
+    ):
         if order.position == "long":
             output = Strategy.long_close(
                 order=order,
                 tickers=tickers,
                 Account=self.Account,
                 exog=exog,
+                preprocessed=preprocessed,
             )
             error_log.info("Checked long order close conditions.")
             return output
@@ -150,6 +244,7 @@ class BackTest:
                 tickers=tickers,
                 Account=self.Account,
                 exog=exog,
+                preprocessed=preprocessed,
             )
             error_log.info("Checked short order close conditions.")
             return output
@@ -169,20 +264,14 @@ class BackTest:
         return output
 
     def initial_checks(self, assets):
-        lengths = []
         for asset in assets:
-            lengths.append(asset.data.shape[0])
-            if not isinstance(asset.data[0, 1], (int, float)):
-                message = f"Second column of data must be price series, error received on {asset.id}"
+            if asset.source is None and not np.issubdtype(
+                asset.price.dtype, np.number
+            ):
+                message = f"Price series must be numeric, error received on {asset.id}"
                 error_log.error(message)
                 raise ValueError(message)
 
-        lengths = np.array(lengths)
-        if np.any(lengths[0] != lengths):
-            message = "Time series data lengths must match."
-            error_log.error(message)
-            raise ValueError(message)
-
         for s in self.__Strategies.values():
             s.check_registered_assets()
 
@@ -190,31 +279,94 @@ class BackTest:
         self.assets_keymap = {
             key: val for val, key in enumerate(map(lambda x: x.id, assets))
         }
+        self.index_subscriptions()
         error_log.info("Initial checks are completed.")
 
+    def index_subscriptions(self):
+        """
+        Index the strategies subscribed to each asset id, so that `route`
+        gives each strategy only the tickers of its assets. Strategies
+        without any registered asset receive all tickers.
+        """
+        self.subscribers = {}
+        self.unsubscribed = []
+        for sid, strategy in self.__Strategies.items():
+            if len(strategy.on) == 0:
+                self.unsubscribed.append(sid)
+            for aid in strategy.subscriptions:
+                self.subscribers.setdefault(aid, []).append(sid)
+        self.__routed = (None, None)
+        return self
+
+    def route(self, tickers):
+        """
+        Tickers of each strategy, keyed by strategy id. Strategies without
+        any of their assets in `tickers` are left out. Panels yield the same
+        tuple of flyweight tickers as long as all their assets tick, its
+        routing is then reused.
+        """
+        last, routed = self.__routed
+        if tickers is last:
+            return routed
+        routed = {}
+        for ticker in tickers:
+            for sid in self.subscribers.get(ticker.aid, ()):
+                routed.setdefault(sid, []).append(ticker)
+        routed = {sid: tuple(routed[sid]) for sid in routed}
+        for sid in self.unsubscribed:
+            routed[sid] = tickers
+        self.__routed = (tickers, routed)
+        return routed
+
     def process_ticker(self, tickers, x):
         self.Account.update(tickers=tickers)
 
+        # strategies only see the tickers of their assets, and are not
+        # called at all when none of them ticked
+        routed = self.route(tickers)
+
+        # preprocessed once per strategy, shared by all its decision hooks
+        features = {
+            sid: strategy.prepare(routed[sid], self.Account, x)
+            for sid, strategy in self.__Strategies.items()
+            if sid in routed
+        }
+
+        # orders of batched strategies are left to `decide_batch`
+        per_order = any(not s.batched for s in self.__Strategies.values())
         order_ids = self.Account.active_orders.keys()
-        if self.Account.n_active_orders > 0:
+        book = self.Account.order_book
+        if self.Account.n_active_orders > 0 and per_order:
             order_close_ids = []
             for oid in order_ids:
                 tmp_order = self.Account.active_orders[oid]
-                tmp_strategy = self.__Strategies[tmp_order.strategy_id]
+                sid = tmp_order.strategy_id
+                tmp_strategy = self.__Strategies[sid]
+                if tmp_strategy.batched or sid not in routed:
+                    continue
 
-                self.Account.active_orders[oid] = self.order_modify(
+                # the hooks see the state kept in the order book, and the
+                # stops they change are written back to it
+                in_book = book is not None and oid in book
+                if in_book:
+                    book.sync(oid, tmp_order)
+                tmp_order = self.order_modify(
                     order=tmp_order,
                     Strategy=tmp_strategy,
-                    tickers=tickers,
+                    tickers=routed[sid],
                     Account=self.Account,
                     exog=x,
                 )
+                self.Account.active_orders[oid] = tmp_order
+                if in_book:
+                    book.modify(oid, tmp_order)
 
                 if self.check_order_close(
                     order=tmp_order,
-                    tickers=tickers,
+                    tickers=routed[sid],
                     Strategy=tmp_strategy,
-                    exog=x,
+                    exog=features[tmp_order.strategy_id],
+                    preprocessed=tmp_strategy.preprocess_once,
                 ):
                     order_close_ids.append(oid)
 
@@ -223,14 +375,308 @@ class BackTest:
                     ids=order_close_ids, timestamp=tickers[0].timestamp
                 )
 
-        for Strategy in self.__Strategies.values():
+        for sid, Strategy in self.__Strategies.items():
+            if sid not in routed:
+                continue
+            if Strategy.batched:
+                self.process_batch(routed[sid], Strategy, features[sid])
+                continue
             self.check_order_open(
                 Strategy=Strategy,
-                tickers=tickers,
-                exog=x,
+                tickers=routed[sid],
+                exog=features[sid],
+                preprocessed=Strategy.preprocess_once,
+            )
+        return self
+
+    def batch(self, tickers, Strategy):
+        "Arrays of the routed tickers and open orders of a strategy."
+        aids = [ticker.aid for ticker in tickers]
+        price = [ticker.price for ticker in tickers]
+        position = {aid: k for k, aid in enumerate(aids)}
+
+        orders = self.Account.orders_by_strategy.get(Strategy.id, {})
+        book = self.Account.order_book
+        rows = None if book is None else book.rows_of(Strategy.id)
+        if rows is not None and rows.shape[0] == len(orders):
+            # all orders are in the order book, no loop over them
+            slots = np.full(len(book.slots), -1, dtype=np.int64)
+            for aid, k in position.items():
+                if aid in book.slots:
+                    slots[book.slots[aid]] = k
+            return Batch(
+                timestamp=tickers[0].timestamp,
+                aids=aids,
+                price=np.array(price, dtype=float),
+                keys=[book.keys[r] for r in rows.tolist()],
+                asset=slots[book.asset_slot[rows]],
+                sign=book.sign[rows],
+                strike_price=book.strike_price[rows],
+                size=book.size[rows],
+                pips=book.pips[rows],
+                profit=book.profit[rows],
+            )
+
+        n = len(orders)
+        values = orders.values()
+        return Batch(
+            timestamp=tickers[0].timestamp,
+            aids=aids,
+            price=np.array(price, dtype=float),
+            keys=list(orders),
+            asset=np.fromiter(
+                (position.get(o.asset_id, -1) for o in values), np.int64, n
+            ),
+            sign=np.fromiter(
+                (1 if o.position == "long" else -1 for o in values), float, n
+            ),
+            strike_price=np.fromiter(
+                (o.strike_price for o in values), float, n
+            ),
+            size=np.fromiter((o.size for o in values), float, n),
+            pips=np.fromiter((o.pips for o in values), float, n),
+            profit=np.fromiter((o.profit for o in values), float, n),
+        )
+
+    def process_batch(self, tickers, Strategy, exog=None):
+        "Apply the `Decision` of a batched strategy, closing orders first."
+        batch = self.batch(tickers, Strategy)
+        decision = Strategy.decide_batch(batch, self.Account, exog)
+        if decision is None:
+            return self
+        timestamp = batch.timestamp
+
+        if decision.close is not None:
+            ids = [batch.keys[k] for k in np.flatnonzero(decision.close)]
+            if len(ids) > 0:
+                self.Account.close_all_orders(ids=ids, timestamp=timestamp)
+
+        if decision.open is None:
+            return self
+        idx = np.flatnonzero(decision.open)
+        if idx.size == 0:
+            return self
+        n = batch.n_assets
+        size = (
+            Strategy.RiskManagement.order_sizes(self.Account, n, exog=exog)
+            if decision.size is None
+            else np.broadcast_to(np.asarray(decision.size, dtype=float), n)
+        )
+        stop_loss, take_profit = (
+            np.broadcast_to(
+                np.asarray(np.nan if x is None else x, dtype=float), n
+            )
+            for x in (decision.stop_loss, decision.take_profit)
+        )
+        orders = []
+        for k in idx.tolist():
+            aid = batch.aids[k]
+            orders.append(
+                Order(
+                    asset_id=aid,
+                    position="long" if decision.open[k] > 0 else "short",
+                    type="market",
+                    size=float(size[k]),
+                    strike_price=float(batch.price[k]),
+                    timestamp=timestamp,
+                    spread=self.spread,
+                    asset_features=self.asset_features[aid],
+                    leverage=self.Account.leverage,
+                    stop_loss=(
+                        None if np.isnan(stop_loss[k]) else float(stop_loss[k])
+                    ),
+                    take_profit=(
+                        None
+                        if np.isnan(take_profit[k])
+                        else float(take_profit[k])
+                    ),
+                    strategy_id=Strategy.id,
+                    strategy_name=Strategy.name,
+                    history=self.history,
+                    history_n=self.history_n,
+                )
             )
+        self.Account.place_order(orders=orders, timestamp=timestamp)
+        error_log.info("Placed batched orders.")
         return self
 
+    def __next_record(self, i, count, freq, offset=0):
+        "Bound of the rows to skip, before the next multiple of `freq`."
+        if freq is None:
+            return np.inf
+        c = -(-(count + offset) // freq) * freq
+        return i + 1 + c - count - offset
+
+    def fast_forward_ticks(self, panel, i, exog=None, checkpoint_freq=None):
+        """
+        Skip the ticks after the `i`th row of a panel, up to the first one
+        where a strategy may decide, a value is recorded, or an open order
+        hits its stop loss, take profit or expiration. The open orders are
+        updated as if the skipped ticks had been processed. Returns the
+        number of skipped ticks.
+        """
+        n = len(panel)
+        account = self.Account
+        if not isinstance(panel, TickerSet) or i + 1 >= n:
+            return 0
+        if account.is_blown or account.balance <= 0:
+            return 0
+        if (
+            account.n_active_orders > 0
+            and account.equity
+            <= account.margin_call_level * account.initial_balance
+        ):
+            return 0
+
+        stop = n
+        routed = self.route(panel.tickers)
+        for sid, strategy in self.__Strategies.items():
+            if sid not in routed:
+                continue
+            until = strategy.idle_until(routed[sid], account, exog)
+            if until is None:
+                return 0
+            stop = min(stop, np.searchsorted(panel.timestamp, to_ns(until)))
+        stop = int(
+            min(
+                stop,
+                self.__next_record(
+                    i,
+                    self.n_ticks,
+                    None if self.track is None else self.track_freq,
+                ),
+                self.__next_record(
+                    i, account.n_processed_tickers, account.equity_freq
+                ),
+                self.__next_record(i, self.n_ticks, checkpoint_freq, 1),
+            )
+        )
+        if stop <= i + 1:
+            return 0
+
+        book = account.order_book
+        columns = {aid: k for k, aid in enumerate(panel.aids)}
+        orders, rows = [], []
+        for key, order in account.active_orders.items():
+            if (
+                not order.is_open
+                or order.trailing_stop_loss is not None
+                or order.asset_id not in columns
+            ):
+                return 0
+            orders.append(order)
+            rows.append(
+                book.index[key] if book is not None and key in book else -1
+            )
+
+        if len(orders) > 0:
+            stop = self.__skip_orders(
+                panel, i + 1, stop, columns, orders, rows
+            )
+        n_skipped = stop - i - 1
+        account.n_processed_tickers += n_skipped
+        return n_skipped
+
+    def __skip_orders(self, panel, start, stop, columns, orders, rows):
+        """
+        Update the open orders over the rows [start, stop) of a panel, up to
+        the first row where one of them must close. Returns that row.
+        """
+        book = self.Account.order_book
+        rows = np.array(rows, dtype=np.int64)
+        in_book = rows >= 0
+        col = np.array([columns[o.asset_id] for o in orders])
+        sign = np.array(
+            [1.0 if o.position == "long" else -1.0 for o in orders]
+        )
+        strike_price = np.array([o.strike_price for o in orders])
+        size = np.array([o.size for o in orders])
+        lot_units = np.array([o.asset_features["lot_units"] for o in orders])
+        spread = np.array([o.spread for o in orders])
+        leverage = np.array([o.leverage for o in orders])
+        stop_loss = np.array(
+            [np.nan if o.stop_loss is None else o.stop_loss for o in orders]
+        )
+        take_profit = np.array(
+            [
+                np.nan if o.take_profit is None else o.take_profit
+                for o in orders
+            ]
+        )
+        expiration_date = np.array(
+            [
+                (
+                    NO_EXPIRATION
+                    if o.expiration_date is None
+                    else o.expiration_date
+                )
+                for o in orders
+            ],
+            dtype=np.int64,
+        )
+        mae = np.array([o.max_adverse_excursion for o in orders], dtype=float)
+        mfe = np.array(
+            [o.max_favorable_excursion for o in orders], dtype=float
+        )
+        if book is not None:
+            mae[in_book] = book.max_adverse_excursion[rows[in_book]]
+            mfe[in_book] = book.max_favorable_excursion[rows[in_book]]
+        recorded = [
+            k
+            for k, o in enumerate(orders)
+            if not in_book[k] and o.history.policy != "none"
+        ]
+
+        # first crossing, searched in windows of growing size
+        a, width, last = start, 64, None
+        while a < stop:
+            b = min(a + width, stop)
+            price = panel.price[a:b][:, col]
+            pips = sign * (price - strike_price)
+            hit = (
+                (pips >= take_profit)
+                | (pips <= -stop_loss)
+                | (panel.timestamp[a:b, None] >= expiration_date)
+                | np.isnan(price)
+            )
+            first = np.flatnonzero(hit.any(axis=1))
+            if first.shape[0] > 0:
+                b = a + first[0]
+                price, pips = price[: first[0]], pips[: first[0]]
+            if b > a:
+                profit = (pips * lot_units - spread) * size
+                margin = price * size * lot_units / leverage
+                np.maximum(mfe, pips.max(axis=0), out=mfe)
+                np.maximum(mae, (-pips).max(axis=0), out=mae)
+                timestamp = panel.timestamp[a:b]
+                for k in recorded:
+                    orders[k].history.extend(
+                        timestamp, pips[:, k], profit[:, k], margin[:, k]
+                    )
+                last = pips[-1], profit[-1], margin[-1]
+            if first.shape[0] > 0:
+                stop = b
+                break
+            a, width = b, 2 * width
+
+        if last is not None:
+            pips, profit, margin = last
+            if book is not None:
+                r = rows[in_book]
+                book.pips[r] = pips[in_book]
+                book.profit[r] = profit[in_book]
+                book.margin[r] = margin[in_book]
+                book.max_adverse_excursion[r] = mae[in_book]
+                book.max_favorable_excursion[r] = mfe[in_book]
+            for k in np.flatnonzero(~in_book).tolist():
+                order = orders[k]
+                order.pips = float(pips[k])
+                order.profit = float(profit[k])
+                order.margin = float(margin[k])
+                order.max_adverse_excursion = float(mae[k])
+                order.max_favorable_excursion = float(mfe[k])
+        return stop
+
     def track_values(self, t):
         output = [t]
         output.extend([fun(self.Account) for fun in self.track])
@@ -240,7 +686,70 @@ class BackTest:
         )
         return True
 
-    def run(self, assets, exog=None):
+    def checkpoint(self, path):
+        """
+        Save the state of the simulation, account, open orders, strategies,
+        metrics and loop position, to a compressed and versioned snapshot.
+        The file is replaced only once it is complete.
+        """
+        payload = zlib.compress(
+            pickle.dumps(self, protocol=pickle.HIGHEST_PROTOCOL)
+        )
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(CHECKPOINT_MAGIC)
+            f.write(struct.pack("<I", CHECKPOINT_VERSION))
+            f.write(payload)
+        os.replace(tmp, path)
+        error_log.info(f"Checkpoint saved to {path}.")
+        return self
+
+    @classmethod
+    def load(cls, path):
+        "Load a snapshot written by `checkpoint`."
+        with open(path, "rb") as f:
+            buffer = f.read()
+        n = len(CHECKPOINT_MAGIC)
+        if buffer[:n] != CHECKPOINT_MAGIC:
+            message = f"{path} is not a backtest checkpoint."
+            error_log.error(message)
+            raise ValueError(message)
+        (version,) = struct.unpack_from("<I", buffer, n)
+        if version != CHECKPOINT_VERSION:
+            message = f"Unsupported checkpoint version {version}."
+            error_log.error(message)
+            raise ValueError(message)
+        return pickle.loads(zlib.decompress(buffer[n + 4 :]))
+
+    @classmethod
+    def resume(cls, path, assets, exog=None, **kwargs):
+        """
+        Load a snapshot and continue the simulation on the ticks of the
+        assets after its last timestamp, see `run`.
+        """
+        return cls.load(path).run(assets, exog=exog, **kwargs)
+
+    def run(
+        self,
+        assets,
+        exog=None,
+        tear_down=True,
+        checkpoint=None,
+        checkpoint_freq=None,
+    ):
+        """
+        Simulate the strategies on the assets. If `tear_down` is False, the
+        open orders are kept, so that a later call on the following data
+        resumes the simulation.
+
+        When resuming, ticks up to `last_timestamp` are skipped, so the
+        assets may hold the whole history or only the new data; `exog` is
+        aligned with all the ticks of the given assets.
+
+        If `checkpoint` is a path, the state is saved there every
+        `checkpoint_freq` ticks if given, and at the end of the data before
+        tear down, see `checkpoint` and `resume`.
+        """
         error_log.info("Simulation run is started.")
         run_start_timestamp = dt.utcnow()
 
@@ -250,36 +759,104 @@ class BackTest:
         # self.initial_checks(assets)
         error_log.info("Initial checks are passed.")
         self.asset_features = {asset.id: asset.features() for asset in assets}
+        self.index_subscriptions()
 
-        data = zip(*[asset.data() for asset in assets])
-        size = len(assets[0].data())
-        exog = np.repeat(None, size) if exog is None else exog
+        # panels are merged on the union of the timestamps of all assets,
+        # `exog` must be aligned with it
+        merged = panels(assets)
+        if any(asset.source is not None for asset in assets):
+            bar = ProgressBar(
+                maxval=UnknownLength, widgets=[Counter(), " ", Timer()]
+            )
+        else:
+            merged = list(merged)
+            bar = ProgressBar(maxval=sum(len(panel) for panel in merged))
+        exog = iter(repeat(None) if exog is None else exog)
+
+        resumed = self.is_resumable
+        if not resumed:
+            self.n_ticks = 0
+            self.first_timestamp = None
+            for metric in self.metrics:
+                metric.start(self.Account)
+        self.is_resumable = True
 
         error_log.info("Starting main loop of simulation.")
 
-        bar = ProgressBar(maxval=size).start()
-        for _i, (tickers, X) in enumerate(zip(data, exog)):
-            t = tickers[0].timestamp
+        bar.start()
+        _i = 0
+        t = None
+        for panel in merged:
+            skip = 0
+            if resumed:
+                skip = np.searchsorted(
+                    panel.timestamp, self.last_timestamp, side="right"
+                )
+                # skipped ticks consume their exogenous rows
+                next(islice(exog, skip, skip), None)
+            i = skip - 1
+            while i + 1 < len(panel):
+                i += 1
+                tickers = panel.seek(i)
+                X = next(exog, _END)
+                if X is _END:
+                    break
+                t = tickers[0].timestamp
+
+                if self.Account.is_blown:
+                    break
+
+                if self.first_timestamp is None:
+                    self.first_timestamp = t
+                self.process_ticker(tickers, X)
+                for metric in self.metrics:
+                    metric.update(tickers, self.Account)
+                if self.n_ticks % self.track_freq == 0:
+                    if self.track is not None:
+                        self.track_values(t)
+
+                self.last_timestamp = t
+                self.n_ticks += 1
+                if (
+                    checkpoint is not None
+                    and checkpoint_freq is not None
+                    and self.n_ticks % checkpoint_freq == 0
+                ):
+                    self.checkpoint(checkpoint)
+                bar.update(_i)
+                _i += 1
+
+                if self.fast_forward:
+                    n_skipped = self.fast_forward_ticks(
+                        panel,
+                        i,
+                        X,
+                        None if checkpoint is None else checkpoint_freq,
+                    )
+                    if n_skipped > 0:
+                        next(islice(exog, n_skipped, n_skipped), None)
+                        for metric in self.metrics:
+                            metric.skip(n_skipped, self.Account)
+                        i += n_skipped
+                        t = self.last_timestamp = int(panel.timestamp[i])
+                        self.n_ticks += n_skipped
+                        _i += n_skipped
 
             if self.Account.is_blown:
                 transaction_log.critical("No remaining balance.")
                 break
 
-            self.process_ticker(tickers, X)
-            if _i % self.track_freq == 0:
-                if self.track is not None:
-                    self.track_values(t)
-
-            bar.update(_i)
-
-        # TODO: find an efficient way
-        self.Account.tear_down(
-            first_timestamp=assets[0].data()[0].timestamp,
-            last_timestamp=assets[0].data()[-1].timestamp,
-            run_start=run_start_timestamp,
-        )
-        error_log.info("Tear down performed for Account.")
-        if self.track is not None:
+        if checkpoint is not None:
+            self.checkpoint(checkpoint)
+        if tear_down and self.first_timestamp is not None:
+            self.Account.tear_down(
+                first_timestamp=self.first_timestamp,
+                last_timestamp=self.last_timestamp,
+                run_start=run_start_timestamp,
+            )
+            self.is_resumable = False
+            error_log.info("Tear down performed for Account.")
+        if self.track is not None and t is not None:
             self.track_values(t)
         bar.finish()
         return self
@@ -293,6 +870,310 @@ class BackTest:
         return self
 
 
+TRADE_DTYPE = np.dtype(
+    [
+        ("param", "i8"),
+        ("opened", "i8"),
+        ("closed", "i8"),
+        ("strike_price", "f8"),
+        ("size", "f8"),
+        ("pips", "f8"),
+        ("profit", "f8"),
+        ("margin", "f8"),
+        ("max_adverse_excursion", "f8"),
+        ("max_favorable_excursion", "f8"),
+    ]
+)
+
+
+def as_param_array(x, n_params):
+    "Broadcast a scalar or per-parameter value, None becomes NaN."
+    x = np.nan if x is None else x
+    return np.broadcast_to(np.asarray(x, dtype=float), (n_params,))
+
+
+class VectorBackTest:
+    """
+    Simulate signal-driven trading on one asset with NumPy arrays, for a
+    batch of parameter sets at once.
+
+    Each parameter set holds at most one position at a time. At every tick,
+    the open position is first stopped out on margin call, then updated and
+    closed on stop loss or take profit, then closed on an exit signal;
+    afterwards a position is opened on an entry signal if the account is
+    flat. This mirrors `BackTest` running a `SignalStrategy` with
+    `ConstantLots` sizing, so both produce the same balances and orders.
+
+    Parameters
+    ----------
+    Account : an instance of Account Class
+        Template account, only its settings are used, it is not modified.
+    position : str
+        Direction of the orders, either `long` or `short`.
+    size : float or array of shape (n_params,)
+        Order size in lots.
+    stop_loss : None, float or array of shape (n_params,)
+        Stop loss level in price units, None or NaN to disable.
+    take_profit : None, float or array of shape (n_params,)
+        Take profit level in price units, None or NaN to disable.
+    spread : float
+        Spread applied to each order, as in `BackTest`.
+    slippage : float
+        Slippage applied to the strike price of each order.
+
+    Attributes
+    ----------
+    n_params : int
+        Number of simulated parameter sets.
+    balance : ndarray of shape (n_params,)
+        Final balance of each parameter set.
+    trades : structured ndarray
+        Closed orders of all parameter sets in closing order, described by
+        `TRADE_DTYPE`. `opened` and `closed` are tick indices.
+    balances : list of DataFrame
+        Balance history of each parameter set, as `Account.balances`.
+    inactive_orders : list of dict of `Order()`
+        Closed orders of each parameter set, as `Account.inactive_orders`.
+        Per-tick histories of the orders are not recorded, their maximum
+        adverse and favorable excursions are.
+
+    Notes
+    -----
+    Signals are given as boolean arrays of shape (n_ticks,) or
+    (n_params, n_ticks), e.g. one row per moving average period pair. The
+    loop runs over time only, every step is vectorized over parameter sets.
+    """
+
+    def __init__(
+        self,
+        Account,
+        position="long",
+        size=0.1,
+        stop_loss=None,
+        take_profit=None,
+        spread=0.0002,
+        slippage=0,
+    ):
+        if position not in ("long", "short"):
+            message = "Argument `position` must be either `long` or `short`."
+            error_log.error(message)
+            raise ValueError(message)
+        self.Account = Account
+        self.position = position
+        self.size = size
+        self.stop_loss = stop_loss
+        self.take_profit = take_profit
+        self.spread = spread
+        self.slippage = slippage
+
+    def run(self, asset, entries, exits):
+        entries = np.asarray(entries, dtype=bool)
+        exits = np.asarray(exits, dtype=bool)
+        n_ticks = asset.price.shape[0]
+        if entries.shape[-1] != n_ticks or exits.shape[-1] != n_ticks:
+            message = "Signal arrays must match the length of asset data."
+            error_log.error(message)
+            raise ValueError(message)
+        shape = np.broadcast_shapes(
+            entries.shape[:-1],
+            exits.shape[:-1],
+            np.shape(self.size),
+            np.shape(self.stop_loss),
+            np.shape(self.take_profit),
+        )
+        if len(shape) > 1:
+            message = "Parameters must be scalars or one dimensional."
+            error_log.error(message)
+            raise ValueError(message)
+        n_params = shape[0] if shape else 1
+
+        # time-major views, no copy
+        entries = np.broadcast_to(entries, (n_params, n_ticks)).T
+        exits = np.broadcast_to(exits, (n_params, n_ticks)).T
+        size = as_param_array(self.size, n_params)
+        stop_loss = as_param_array(self.stop_loss, n_params)
+        take_profit = as_param_array(self.take_profit, n_params)
+
+        price = asset.price
+        sign = 1 if self.position == "long" else -1
+        lot_units = asset.lot_units
+        leverage = self.Account.leverage
+        initial_balance = self.Account.initial_balance
+        stop_out = self.Account.margin_call_level * initial_balance
+        max_allowed_risk = self.Account.max_allowed_risk
+
+        is_open = np.zeros(n_params, dtype=bool)
+        opened = np.zeros(n_params, dtype=np.int64)
+        strike_price = np.zeros(n_params)
+        pips = np.zeros(n_params)
+        profit = np.zeros(n_params)
+        margin = np.zeros(n_params)
+        max_adverse_excursion = np.zeros(n_params)
+        max_favorable_excursion = np.zeros(n_params)
+        balance = np.full(n_params, float(initial_balance))
+        equity = balance.copy()
+        free_margin = balance.copy()
+        running = np.ones(n_params, dtype=bool)
+        records = []
+
+        def close(mask, i):
+            idx = np.flatnonzero(mask)
+            if idx.size > 0:
+                records.append(
+                    (
+                        idx,
+                        opened[idx],
+                        np.full(idx.size, i),
+                        strike_price[idx],
+                        size[idx],
+                        pips[idx],
+                        profit[idx],
+                        margin[idx],
+                        max_adverse_excursion[idx],
+                        max_favorable_excursion[idx],
+                    )
+                )
+                equity[idx] += profit[idx]
+                balance[idx] += profit[idx]
+                free_margin[idx] += margin[idx]
+                is_open[idx] = False
+
+        error_log.info("Starting main loop of vectorized simulation.")
+        for i in range(n_ticks):
+            p = price[i]
+            # as in `BackTest`, a blown account skips updates for one more
+            # tick and then stops
+            is_blown = balance <= 0
+            if is_open.any():
+                live = is_open & running & ~is_blown
+                close(live & (equity <= stop_out), i)
+
+                idx = np.flatnonzero(live & is_open)
+                pips[idx] = sign * (p - strike_price[idx])
+                profit[idx] = (pips[idx] * lot_units - self.spread) * size[idx]
+                margin[idx] = p * size[idx] * lot_units / leverage
+                max_favorable_excursion[idx] = np.maximum(
+                    max_favorable_excursion[idx], pips[idx]
+                )
+                max_adverse_excursion[idx] = np.maximum(
+                    max_adverse_excursion[idx], -pips[idx]
+                )
+                close(
+                    live
+                    & is_open
+                    & ((pips >= take_profit) | (pips <= -stop_loss)),
+                    i,
+                )
+                close(is_open & running & exits[i], i)
+
+            candidates = entries[i] & ~is_open & running
+            if candidates.any():
+                initial_margin = p * size * lot_units / leverage
+                candidates &= free_margin >= initial_margin
+                if max_allowed_risk is not None:
+                    candidates &= ~(
+                        balance - free_margin < balance * max_allowed_risk
+                    )
+                idx = np.flatnonzero(candidates)
+                is_open[idx] = True
+                opened[idx] = i
+                strike_price[idx] = p - self.slippage
+                pips[idx] = 0
+                profit[idx] = -self.spread * size[idx]
+                margin[idx] = initial_margin[idx]
+                max_adverse_excursion[idx] = 0
+                max_favorable_excursion[idx] = 0
+                equity[idx] += profit[idx]
+                free_margin[idx] -= margin[idx]
+
+            running &= ~is_blown
+            if not running.any():
+                break
+
+        # tear down, closed orders are recorded in one balance entry
+        self.open_at_end = is_open.copy()
+        close(is_open, n_ticks - 1)
+        error_log.info("Vectorized simulation is completed.")
+
+        self.trades = np.empty(sum(r[0].size for r in records), TRADE_DTYPE)
+        for name, column in zip(TRADE_DTYPE.names, zip(*records)):
+            self.trades[name] = np.concatenate(column)
+        self.n_params = n_params
+        self.balance = balance
+        self.asset_id = asset.id
+        self.asset_features = asset.features()
+        self.price = price
+        self.timestamp = asset.timestamp
+        return self
+
+    def __split_trades(self):
+        "Group trades by parameter set, keeping the closing order."
+        trades = self.trades[np.argsort(self.trades["param"], kind="stable")]
+        bounds = np.searchsorted(trades["param"], np.arange(self.n_params + 1))
+        return [trades[a:b] for a, b in zip(bounds[:-1], bounds[1:])]
+
+    @property
+    def balances(self):
+        output = []
+        for p, trades in enumerate(self.__split_trades()):
+            balance = np.cumsum(
+                np.concatenate(
+                    [[self.Account.initial_balance], trades["profit"]]
+                )
+            )[1:]
+            timestamp = self.timestamp[trades["closed"]]
+            if not self.open_at_end[p]:
+                balance = np.append(balance, self.balance[p])
+                timestamp = np.append(timestamp, self.timestamp[-1])
+            output.append(
+                pd.DataFrame(
+                    {
+                        "timestamp": to_timestamp(timestamp),
+                        "balance": balance,
+                    }
+                )
+            )
+        return output
+
+    @property
+    def inactive_orders(self):
+        stop_loss = as_param_array(self.stop_loss, self.n_params)
+        take_profit = as_param_array(self.take_profit, self.n_params)
+        output = []
+        for p, trades in enumerate(self.__split_trades()):
+            orders = {}
+            for k, trade in enumerate(trades):
+                order = Order(
+                    asset_id=self.asset_id,
+                    position=self.position,
+                    type="market",
+                    size=trade["size"],
+                    strike_price=self.price[trade["opened"]],
+                    timestamp=int(self.timestamp[trade["opened"]]),
+                    asset_features=self.asset_features,
+                    spread=self.spread,
+                    leverage=self.Account.leverage,
+                    stop_loss=None if np.isnan(stop_loss[p]) else stop_loss[p],
+                    take_profit=(
+                        None if np.isnan(take_profit[p]) else take_profit[p]
+                    ),
+                    slippage=self.slippage,
+                    history="none",
+                )
+                order.pips = trade["pips"]
+                order.profit = trade["profit"]
+                order.margin = trade["margin"]
+                order.max_adverse_excursion = trade["max_adverse_excursion"]
+                order.max_favorable_excursion = trade[
+                    "max_favorable_excursion"
+                ]
+                orders[f"order_{k}"] = order.close(
+                    int(self.timestamp[trade["closed"]])
+                )
+            output.append(orders)
+        return output
+
+
 class ForwardTest:
     def __init__(self):
-        pass
\ No newline at end of file
+        pass
@@ -1,6 +1,8 @@
 import numpy as np
 from uuid import uuid4
 import pickle
+from strategy_tester.utils import to_ns
+
 
 # TODO: create several built-in strategies
 # TODO: use a decorator to simplify methods?
@@ -12,14 +14,47 @@ class Strategy:
     Open, modify, and close orders. By modification, we could keep a
     number of variables, in order to track its performance and make decisions.
 
+    Attributes
+    ----------
+    on : list of str
+        Ids of the registered assets, see `Asset.register`. `BackTest` only
+        gives the hooks the tickers of these assets, and skips the strategy
+        at the ticks where none of them ticked. A strategy without any
+        registered asset receives all tickers.
+    preprocess_once : bool
+        If True, `BackTest` runs `preprocess` once per tick, after updating
+        the account and before closing and opening orders, and passes the
+        result to all decision hooks. Set it to False if preprocessing
+        depends on the order or on the state of the account at each call,
+        it then runs in every hook.
+    batched : bool
+        If True, `BackTest` makes all the decisions of a tick in one call
+        to `decide_batch`, on arrays describing the assets that ticked and
+        the open orders of the strategy, instead of calling the open,
+        modify and close hooks for each asset and order. With a compiled
+        account, the arrays are read from its order book without looping
+        over the orders.
     """
 
+    preprocess_once = True
+    batched = False
+    _subscriptions = frozenset()
+    _n_on = 0
+
     def __init__(self, RiskManagement, id=None, name=None):
         self.RiskManagement = RiskManagement
         self.id = uuid4()
         self.name = name
         self.on = []
 
+    @property
+    def subscriptions(self):
+        "Set of the asset ids in `on`, rebuilt when an asset is registered."
+        if self._n_on != len(self.on):
+            self._subscriptions = frozenset(self.on)
+            self._n_on = len(self.on)
+        return self._subscriptions
+
     def check_registered_assets(self):
         if len(self.on) == 0:
             raise AttributeError(
@@ -41,14 +76,21 @@ class Strategy:
         "Preprocess exogenous variables."
         return exog
 
+    def prepare(self, tickers, Account, exog):
+        "Input of the decision hooks of a tick, see `preprocess_once`."
+        if self.preprocess_once:
+            return self.preprocess(tickers, Account, self.RiskManagement, exog)
+        return exog
+
     def postprocess(self, args):
         "Last checks and corrections."
         if args is not None:
             args = self.include_identifiers(args)
         return args
 
-    def long_open(self, tickers, Account, exog=None):
-        exog = self.preprocess(tickers, Account, self.RiskManagement, exog)
+    def long_open(self, tickers, Account, exog=None, preprocessed=False):
+        if not preprocessed:
+            exog = self.preprocess(tickers, Account, self.RiskManagement, exog)
         args = self.decide_long_open(
             tickers=tickers,
             Account=Account,
@@ -56,8 +98,9 @@ class Strategy:
         )
         return self.postprocess(args)
 
-    def short_open(self, tickers, Account, exog=None):
-        exog = self.preprocess(tickers, Account, self.RiskManagement, exog)
+    def short_open(self, tickers, Account, exog=None, preprocessed=False):
+        if not preprocessed:
+            exog = self.preprocess(tickers, Account, self.RiskManagement, exog)
         args = self.decide_short_open(
             tickers=tickers,
             Account=Account,
@@ -72,12 +115,15 @@ class Strategy:
     def short_modify(self, order, tickers, Account, exog=None):
         return order
 
-    def long_close(self, order, tickers, Account, exog=None):
+    def long_close(
+        self, order, tickers, Account, exog=None, preprocessed=False
+    ):
         if order.position != "long":
             AttributeError(
                 f"Position is expected to be long, got {order.position}"
             )
-        exog = self.preprocess(tickers, Account, self.RiskManagement, exog)
+        if not preprocessed:
+            exog = self.preprocess(tickers, Account, self.RiskManagement, exog)
         return self.decide_long_close(
             order=order,
             tickers=tickers,
@@ -85,12 +131,15 @@ class Strategy:
             exog=exog,
         )
 
-    def short_close(self, order, tickers, Account, exog=None):
+    def short_close(
+        self, order, tickers, Account, exog=None, preprocessed=False
+    ):
         if order.position != "short":
             AttributeError(
                 f"Position is expected to be short, got {order.position}"
             )
-        exog = self.preprocess(tickers, Account, self.RiskManagement, exog)
+        if not preprocessed:
+            exog = self.preprocess(tickers, Account, self.RiskManagement, exog)
         return self.decide_short_close(
             order=order,
             tickers=tickers,
@@ -101,7 +150,7 @@ class Strategy:
     def decide_long_open(self, tickers, Account, exog):
         output = {}
         for ticker in tickers:
-            if ticker.aid in self.on:
+            if ticker.aid in self.subscriptions:
                 if self.random_decision():
                     arg = {
                         "type": "market",
@@ -116,7 +165,7 @@ class Strategy:
     def decide_short_open(self, tickers, Account, exog):
         output = {}
         for ticker in tickers:
-            if ticker.aid in self.on:
+            if ticker.aid in self.subscriptions:
                 if self.random_decision():
                     arg = {
                         "type": "market",
@@ -134,6 +183,24 @@ class Strategy:
     def decide_short_close(self, order, tickers, Account, exog):
         return False
 
+    def idle_until(self, tickers, Account, exog):
+        """
+        Timestamp before which the strategy makes no decision (open, modify
+        or close) whatever the prices, or None if it may decide at the next
+        tick. Lets `BackTest(fast_forward=True)` skip the ticks in between.
+        Any timestamp `utils.to_ns` converts is accepted.
+        """
+        return None
+
+    def decide_batch(self, batch, Account, exog):
+        """
+        Return the `Decision` of a tick. Strategies with `batched` True must
+        override it, `BackTest` rejects them otherwise.
+        """
+        raise NotImplementedError(
+            f"{type(self).__name__} does not implement `decide_batch`."
+        )
+
     def save(self, filename):
         if not filename.endswith(".strt"):
             filename = f"{filename}.strt"
@@ -146,6 +213,179 @@ class Strategy:
             return pickle.load(f)
 
 
+class Batch:
+    """
+    Input of `Strategy.decide_batch`: the tickers routed to a strategy, see
+    `Strategy.on`, and its open orders.
+
+    Attributes
+    ----------
+    timestamp : int
+        Current timestamp, in nanoseconds since epoch.
+    aids : list of str
+        Ids of the assets.
+    price : ndarray of shape (n_assets,)
+        Current price of each asset.
+    keys : list of str
+        Keys of the open orders in `Account.active_orders`.
+    asset : ndarray of int, of shape (n_orders,)
+        Index in `aids` of the asset of each order, -1 if it did not tick.
+    sign : ndarray of shape (n_orders,)
+        1 for long and -1 for short orders.
+    strike_price, size, pips, profit : ndarray of shape (n_orders,)
+        State of each order.
+    """
+
+    def __init__(self, timestamp, aids, price, keys, asset, sign, **orders):
+        self.timestamp = timestamp
+        self.aids = aids
+        self.price = price
+        self.keys = keys
+        self.asset = asset
+        self.sign = sign
+        self.strike_price = orders["strike_price"]
+        self.size = orders["size"]
+        self.pips = orders["pips"]
+        self.profit = orders["profit"]
+
+    @property
+    def n_assets(self):
+        return len(self.aids)
+
+    @property
+    def n_orders(self):
+        return len(self.keys)
+
+
+class Decision:
+    """
+    Output of `Strategy.decide_batch`. Orders are closed first, then market
+    orders are opened at the current prices.
+
+    Parameters
+    ----------
+    open : ndarray of int, of shape (n_assets,)
+        1 to open a long order on an asset, -1 a short one, 0 nothing. None
+        to open nothing.
+    size : float or ndarray of shape (n_assets,)
+        Size of the new orders in lots, `RiskManagement.order_sizes` if
+        None.
+    close : ndarray of bool, of shape (n_orders,)
+        True for the orders to close, None to close nothing.
+    stop_loss, take_profit : float or ndarray of shape (n_assets,)
+        Levels of the new orders in price units, None or NaN to disable.
+    """
+
+    def __init__(
+        self,
+        open=None,
+        size=None,
+        close=None,
+        stop_loss=None,
+        take_profit=None,
+    ):
+        self.open = open
+        self.size = size
+        self.close = close
+        self.stop_loss = stop_loss
+        self.take_profit = take_profit
+
+
+class SignalStrategy(Strategy):
+    """
+    Trade precomputed signals, keeping at most one open position per asset.
+
+    At each tick, `exog` is expected as (entry, exit) flags. This is the
+    event-driven counterpart of `VectorBackTest`, useful to cross-check it.
+    With `batched` True, the same decisions are made by `decide_batch`.
+
+    If `signals`, the timestamps of the rows of `exog` with an entry or
+    exit flag, is given, the strategy declares itself idle until the next
+    one, so that `BackTest(fast_forward=True)` skips the ticks in between.
+    """
+
+    def __init__(
+        self,
+        position="long",
+        stop_loss=None,
+        take_profit=None,
+        batched=False,
+        signals=None,
+        *args,
+        **kwargs,
+    ):
+        super().__init__(*args, **kwargs)
+        if position not in ("long", "short"):
+            raise ValueError("Argument `position` must be `long` or `short`.")
+        self.position = position
+        self.stop_loss = stop_loss
+        self.take_profit = take_profit
+        self.batched = batched
+        self.signals = None if signals is None else np.sort(to_ns(signals))
+
+    def is_flat(self, asset_id, Account):
+        "True if the strategy has no open order on the asset."
+        # the smaller of the two indices is scanned
+        return (
+            Account.orders_by_asset.get(asset_id, {})
+            .keys()
+            .isdisjoint(Account.orders_by_strategy.get(self.id, {}).keys())
+        )
+
+    def idle_until(self, tickers, Account, exog):
+        "Timestamp of the next signal, past the end after the last one."
+        if self.signals is None:
+            return None
+        k = np.searchsorted(self.signals, tickers[0].timestamp, side="right")
+        if k == self.signals.shape[0]:
+            return np.iinfo(np.int64).max
+        return self.signals[k]
+
+    def decide_open(self, position, tickers, Account, exog):
+        output = {}
+        if position != self.position or not exog[0]:
+            return output
+        for ticker in tickers:
+            if ticker.aid in self.subscriptions and self.is_flat(
+                ticker.aid, Account
+            ):
+                output[ticker.aid] = {
+                    "type": "market",
+                    "size": self.RiskManagement.order_size(Account),
+                    "strike_price": ticker.price,
+                    "stop_loss": self.stop_loss,
+                    "take_profit": self.take_profit,
+                }
+        return output
+
+    def decide_long_open(self, tickers, Account, exog):
+        return self.decide_open("long", tickers, Account, exog)
+
+    def decide_short_open(self, tickers, Account, exog):
+        return self.decide_open("short", tickers, Account, exog)
+
+    def decide_long_close(self, order, tickers, Account, exog):
+        return bool(exog[1])
+
+    def decide_short_close(self, order, tickers, Account, exog):
+        return bool(exog[1])
+
+    def decide_batch(self, batch, Account, exog):
+        close = np.full(batch.n_orders, bool(exog[1]))
+        open = np.zeros(batch.n_assets, dtype=int)
+        if exog[0]:
+            # flat assets once the orders are closed
+            open[:] = 1 if self.position == "long" else -1
+            held = batch.asset[~close]
+            open[held[held >= 0]] = 0
+        return Decision(
+            open=open,
+            close=close,
+            stop_loss=self.stop_loss,
+            take_profit=self.take_profit,
+        )
+
+
 class MACross(Strategy):
     def decide_long_open(self, spot_price, timestamp, Account, exog):
         "Exog[0]: Slow MA, Exog[1]: Fast MA"
@@ -181,4 +421,4 @@ class MACross(Strategy):
         return exog[0] < exog[1]
 
     def decide_short_close(self, order, spot_price, timestamp, Account, exog):
-        return exog[0] > exog[1]
\ No newline at end of file
+        return exog[0] > exog[1]
@@ -7,13 +7,50 @@ import pandas as pd
 # TODO: write a strategy class checker (keep it simple, only for necessary method and attributes)
 
 
+PRICE_DTYPE = np.dtype([("timestamp", "datetime64[ns]"), ("price", "f8")])
+
+
 def generate_data(n, start_date="2020-01-01 00:00:00", freq="1min", digits=5):
     price = np.round(np.exp(np.cumsum(np.random.laplace(0, 0.02, n))), digits)
 
     start = pd.to_datetime(start_date)
     # end = start + (pd.Timedelta(freq) * (price.shape[0] - 1))
     ts = pd.date_range(start, periods=n, freq=freq)
-    return pd.DataFrame({"timestamp": ts, "price": price}).values
+    output = np.empty(n, dtype=PRICE_DTYPE)
+    output["timestamp"] = ts.values
+    output["price"] = price
+    return output
+
+
+def to_ns(x):
+    "Convert timestamp(s) to int64 nanoseconds since epoch."
+    if np.ndim(x) == 0:
+        return pd.Timestamp(x).value
+    x = np.asarray(x)
+    if x.dtype.kind in "iu":
+        return x.astype(np.int64, copy=False)
+    return np.asarray(pd.to_datetime(x), dtype="datetime64[ns]").view(np.int64)
+
+
+def to_timestamp(x):
+    "Box int64 nanoseconds since epoch to pandas timestamp(s)."
+    if np.ndim(x) == 0:
+        return pd.Timestamp(x)
+    return pd.to_datetime(np.asarray(x, dtype=np.int64))
+
+
+def as_columns(price, timestamp=None):
+    """
+    Split price data into an int64 (nanoseconds since epoch) timestamp array
+    and a float64 price array. `price` could be a record array with
+    `timestamp` and `price` fields, a 2D array with (timestamp, price)
+    columns, or a 1D price array given along with `timestamp`.
+    """
+    if timestamp is not None:
+        return to_ns(timestamp), np.asarray(price, dtype=float)
+    if price.dtype.names is not None:
+        return to_ns(price["timestamp"]), price["price"].astype(float)
+    return to_ns(price[:, 0]), price[:, 1].astype(float)
 
 
 def dict_product(dicts):
@@ -27,6 +64,121 @@ def dict_product(dicts):
     return (dict(zip(dicts, x)) for x in itertools.product(*dicts.values()))
 
 
+def dict_product_size(dicts):
+    "Number of items of `dict_product(dicts)`, without generating them."
+    size = 1
+    for values in dicts.values():
+        size *= len(values)
+    return size
+
+
+def dict_product_item(dicts, k):
+    """
+    `k`th item of `dict_product(dicts)`, decoded from `k` in mixed radix,
+    the last key varying the fastest.
+
+    >>> dict_product_item(dict(number=[1,2], character='ab'), 2)
+    {'number': 2, 'character': 'a'}
+    """
+    output = {}
+    for key in reversed(list(dicts)):
+        values = dicts[key]
+        k, i = divmod(k, len(values))
+        output[key] = values[i]
+    return {key: output[key] for key in dicts}
+
+
+def sample_without_replacement(rng, size, n):
+    """
+    `n` distinct integers of [0, size) drawn by `rng` with Floyd's
+    algorithm, in O(n) time and memory whatever `size`.
+
+    >>> sample_without_replacement(np.random.default_rng(0), 10**12, 3)
+    [636961687320, 269786713763, 40973523936]
+    """
+    if not 0 <= n <= size:
+        raise ValueError("n must be in [0, size]")
+    seen = set()
+    output = []
+    for j in range(size - n, size):
+        k = int(rng.integers(0, j + 1))
+        k = j if k in seen else k
+        seen.add(k)
+        output.append(k)
+    return output
+
+
+class RollingWindow:
+    """
+    Statistics of the last `n` values of a stream, updated in O(1) per value.
+
+    Values are kept in a ring buffer, the mean and variance are updated with
+    Welford's algorithm as values enter and leave the window.
+
+    Parameters
+    ----------
+    n : int
+        Size of the window.
+
+    Attributes
+    ----------
+    count : int
+        Number of values in the window, at most `n`.
+    mean : float
+        Mean of the window.
+    n_positive, n_negative : int
+        Number of values above and below zero in the window.
+    """
+
+    def __init__(self, n):
+        if n < 1:
+            raise ValueError("Argument `n` must be a positive integer.")
+        self.n = n
+        self.values = np.zeros(n)
+        self.i = 0
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.n_positive = 0
+        self.n_negative = 0
+
+    @property
+    def is_full(self):
+        return self.count == self.n
+
+    def __count(self, x, k):
+        if x > 0:
+            self.n_positive += k
+        elif x < 0:
+            self.n_negative += k
+
+    def append(self, x):
+        x = float(x)
+        if self.count == self.n:
+            y = float(self.values[self.i])
+            self.__count(y, -1)
+            self.count -= 1
+            if self.count == 0:
+                self.mean, self.m2 = 0.0, 0.0
+            else:
+                delta = y - self.mean
+                self.mean -= delta / self.count
+                self.m2 -= delta * (y - self.mean)
+        self.values[self.i] = x
+        self.i = (self.i + 1) % self.n
+        self.count += 1
+        self.__count(x, 1)
+        delta = x - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (x - self.mean)
+        return self
+
+    def var(self, ddof=0):
+        if self.count <= ddof:
+            return np.nan
+        return max(self.m2, 0.0) / (self.count - ddof)
+
+
 def ROI(Account):
     return (
         Account.balance - Account.initial_balance
@@ -34,7 +186,10 @@ def ROI(Account):
 
 
 def sharpe_ratio(Account, risk_free_rate=0.05):
-    sigma = Account.balances["balance"].std()
+    balances = Account.history("balance").values
+    if balances.shape[0] < 2:
+        return np.nan
+    sigma = balances.std(ddof=1)
     if sigma == 0:
         return np.nan
     else:
@@ -72,4 +227,4 @@ def transaction_logger(level=logging.WARNING):
     transaction_log.setLevel(TRANSACTION)
     transaction_log.addHandler(fh)
 
-    return transaction_log
\ No newline at end of file
+    return transaction_log
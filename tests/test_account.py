@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+from strategy_tester.account import Account
+from strategy_tester.asset import Currency
+from strategy_tester.risk_management import ConstantLots
+from strategy_tester.simulate import BackTest
+from strategy_tester.strategy import SignalStrategy
+from strategy_tester.utils import generate_data
+
+
+@pytest.mark.parametrize("compiled", [False, True])
+def test_simultaneous_exits_close_in_placement_order(compiled):
+    np.random.seed(4)
+    data = generate_data(1500)
+    # same prices, so both orders hit their targets on the same tick, the
+    # panel lists GBPUSD first while EURUSD orders are placed first
+    eurusd = Currency(price=data, base="EUR", quote="USD")
+    gbpusd = Currency(price=data.copy(), base="GBP", quote="USD")
+    first = eurusd.register(
+        SignalStrategy(
+            stop_loss=0.02, take_profit=0.02, RiskManagement=ConstantLots(0.1)
+        )
+    )
+    second = gbpusd.register(
+        SignalStrategy(
+            stop_loss=0.02, take_profit=0.02, RiskManagement=ConstantLots(0.1)
+        )
+    )
+    account = Account(
+        initial_balance=10**5, max_allowed_risk=None, compiled=compiled
+    )
+    closed = []
+    account.subscribe(lambda order, Account: closed.append(order))
+    entries = np.zeros(data.shape[0], dtype=bool)
+    entries[::30] = True
+    BackTest(account, [first, second]).run(
+        [gbpusd, eurusd],
+        exog=np.column_stack([entries, np.zeros_like(entries)]),
+    )
+    keys = {id(order): key for key, order in account.inactive_orders.items()}
+    pairs = [
+        (a, b)
+        for a, b in zip(closed, closed[1:])
+        if a.time_ticker["closed"] == b.time_ticker["closed"]
+    ]
+    assert len(pairs) > 10
+    for a, b in pairs:
+        assert int(keys[id(a)][6:]) < int(keys[id(b)][6:])
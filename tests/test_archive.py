@@ -0,0 +1,96 @@
+import os
+import numpy as np
+import pytest
+from strategy_tester.account import Account
+from strategy_tester.archive import Archive, ArchiveWriter, write_archive
+from strategy_tester.asset import Currency
+from strategy_tester.risk_management import ConstantLots
+from strategy_tester.simulate import BackTest
+from strategy_tester.strategy import SignalStrategy
+from strategy_tester.utils import PRICE_DTYPE
+
+
+def ticks(n, seed):
+    "Irregular ticks with 5 digit prices."
+    rng = np.random.default_rng(seed)
+    output = np.empty(n, dtype=PRICE_DTYPE)
+    gaps = rng.integers(1, 5000, n).cumsum() * 10**6
+    output["timestamp"] = (1554076800 * 10**9 + gaps).view("datetime64[ns]")
+    output["price"] = np.round(1.12 + np.cumsum(rng.normal(0, 1e-4, n)), 5)
+    return output
+
+
+def test_round_trip_and_ranges(tmp_path):
+    data = ticks(1000, seed=1)
+    path = write_archive(str(tmp_path / "a.arch"), data, block_size=128)
+    with Archive(path) as archive:
+        assert len(archive) == 1000
+        assert archive.index.shape[0] == 8
+        output = archive.read()
+        np.testing.assert_array_equal(output["timestamp"], data["timestamp"])
+        np.testing.assert_allclose(output["price"], data["price"], rtol=0)
+
+        start, end = data["timestamp"][300], data["timestamp"][650]
+        assert list(archive.blocks(start, end)) == [2, 3, 4, 5]
+        window = archive.read(start, end)
+        np.testing.assert_array_equal(
+            window["timestamp"], data["timestamp"][300:651]
+        )
+        assert archive.read(end=data["timestamp"][0] - 1).shape[0] == 0
+
+
+def test_prices_must_fit_the_digits(tmp_path):
+    data = ticks(10, seed=2)
+    data["price"][3] += 1e-7
+    with pytest.raises(ValueError):
+        write_archive(str(tmp_path / "a.arch"), data, digits=5)
+    assert os.listdir(tmp_path) == []
+
+
+def test_interrupted_write_keeps_the_previous_archive(tmp_path):
+    path = write_archive(str(tmp_path / "a.arch"), ticks(100, seed=3))
+    with pytest.raises(RuntimeError):
+        with ArchiveWriter(path, block_size=16) as writer:
+            writer.write(ticks(50, seed=4))
+            raise RuntimeError("interrupted")
+    assert os.listdir(tmp_path) == ["a.arch"]
+    with Archive(path) as archive:
+        assert len(archive) == 100
+
+
+def test_closed_archive_cannot_be_read(tmp_path):
+    archive = Archive(write_archive(str(tmp_path / "a.arch"), ticks(20, 5)))
+    archive.close()
+    with pytest.raises(ValueError):
+        archive.decode(0)
+
+
+def test_streamed_archive_matches_in_memory(tmp_path):
+    data = ticks(3000, seed=6)
+    path = write_archive(str(tmp_path / "a.arch"), data, block_size=250)
+    rng = np.random.default_rng(7)
+    exog = np.column_stack([rng.random(3000) < 0.04, rng.random(3000) < 0.02])
+
+    def run(price):
+        eurusd = Currency(price=price, base="EUR", quote="USD")
+        strategy = eurusd.register(
+            SignalStrategy(
+                stop_loss=0.001,
+                take_profit=0.001,
+                RiskManagement=ConstantLots(0.3),
+            )
+        )
+        account = Account(initial_balance=10**5)
+        BackTest(account, strategy).run(eurusd, exog=exog)
+        return account
+
+    archive = Archive(path)
+    streamer = archive.stream(prefetch=False)
+    assert (streamer.column, streamer.chunksize) == ("price", None)
+    streamed, in_memory = run(streamer), run(archive.read())
+    archive.close()
+    assert in_memory.n_inactive_orders > 0
+    assert streamed.balance == in_memory.balance
+    assert [o.profit for o in streamed.inactive_orders.values()] == [
+        o.profit for o in in_memory.inactive_orders.values()
+    ]
@@ -0,0 +1,106 @@
+import numpy as np
+import pandas as pd
+import pytest
+from strategy_tester.asset import (
+    Currency,
+    SparseTickerSet,
+    Stock,
+    TickerSet,
+    panels,
+    ticker_set,
+)
+from strategy_tester.data import Streamer
+from strategy_tester.utils import to_ns
+
+
+def daily(start, periods, freq, seed):
+    rng = np.random.default_rng(seed)
+    timestamp = pd.date_range(start, periods=periods, freq=freq)
+    price = np.round(50 + np.cumsum(rng.normal(0, 1, periods)), 5)
+    return {"price": price, "timestamp": to_ns(timestamp.values)}
+
+
+@pytest.fixture
+def calendars():
+    # business days, every day, and every other day from a later start
+    aapl = Stock(**daily("2020-01-01", 30, "B", 1), base="AAPL")
+    btc = Currency(**daily("2020-01-01", 40, "D", 2), base="BTC", quote="USD")
+    eur = Currency(**daily("2020-01-10", 15, "2D", 3), base="EUR", quote="USD")
+    return [aapl, btc, eur]
+
+
+def naive_merge(assets):
+    "Rows of each timestamp as {aid: price}, built with dicts."
+    rows = {}
+    for asset in assets:
+        for t, p in zip(asset.timestamp.tolist(), asset.price.tolist()):
+            rows.setdefault(t, {})[asset.id] = p
+    return dict(sorted(rows.items()))
+
+
+def test_sparse_panel_yields_only_updated_tickers(calendars):
+    panel = ticker_set(calendars)
+    assert isinstance(panel, SparseTickerSet)
+    expected = naive_merge(calendars)
+    assert panel.timestamp.tolist() == list(expected)
+    for tickers, (t, prices) in zip(panel, expected.items()):
+        assert all(ticker.timestamp == t for ticker in tickers)
+        assert {ticker.aid: ticker.price for ticker in tickers} == prices
+    # weekends only have the every day asset
+    saturday = to_ns(pd.Timestamp("2020-01-04"))
+    i = int(np.searchsorted(panel.timestamp, saturday))
+    assert [ticker.aid for ticker in panel.seek(i)] == [calendars[1].id]
+
+
+def test_shared_calendars_give_a_dense_panel():
+    data = daily("2021-03-01", 20, "h", 4)
+    price, timestamp = data["price"], data["timestamp"]
+    assets = [
+        Stock(price=price, timestamp=timestamp, base="A"),
+        Stock(price=price[::-1].copy(), timestamp=timestamp.copy(), base="B"),
+    ]
+    panel = ticker_set(assets)
+    assert isinstance(panel, TickerSet)
+    tickers = panel.seek(7)
+    assert [t.price for t in tickers] == [price[7], price[::-1][7]]
+    assert panel.seek(8) is tickers
+
+
+def test_timestamps_must_increase(calendars):
+    data = daily("2020-01-01", 5, "D", 5)
+    data["timestamp"][3] = data["timestamp"][2]
+    with pytest.raises(ValueError):
+        SparseTickerSet([calendars[0], Stock(**data, base="X")])
+
+
+def write_histdata(path, asset):
+    timestamp = pd.to_datetime(asset.timestamp)
+    with open(path, "w") as f:
+        for t, p in zip(timestamp.strftime("%Y%m%d %H%M%S"), asset.price):
+            f.write(f"{t};{p};{p};{p};{p};0\n")
+    return path
+
+
+def test_streamed_panels_match_in_memory(tmp_path, calendars):
+    def rows(panel_list):
+        return [
+            [(t.aid, t.timestamp, t.price) for t in tickers]
+            for panel in panel_list
+            for tickers in panel
+        ]
+
+    streamed = [
+        type(asset)(
+            price=Streamer(
+                write_histdata(tmp_path / f"{k}.csv", asset),
+                chunksize=chunksize,
+                prefetch=False,
+            ),
+            base=asset.base,
+            quote=asset.quote,
+        )
+        for k, (asset, chunksize) in enumerate(zip(calendars, [4, 7, 50]))
+    ]
+    output = list(panels(streamed))
+    assert len(output) > 1
+    assert rows(output) == rows([ticker_set(calendars)])
@@ -0,0 +1,114 @@
+import os
+import numpy as np
+import pandas as pd
+import pytest
+from strategy_tester.asset import Currency
+from strategy_tester.catalog import Catalog, default_symbol
+from strategy_tester.utils import to_ns
+
+
+def write_month(root, pair, month, n, seed):
+    "HistData file of `n` minute bars starting on the first of `month`."
+    rng = np.random.default_rng(seed)
+    close = np.round(1.3 + np.cumsum(rng.normal(0, 3e-4, n)), 5)
+    timestamp = pd.date_range(f"{month}-01", periods=n, freq="1min")
+    path = os.path.join(
+        root, f"DAT_ASCII_{pair}_M1_{month.replace('-', '')}.csv"
+    )
+    with open(path, "w") as f:
+        for t, c in zip(timestamp.strftime("%Y%m%d %H%M%S"), close):
+            f.write(f"{t};{c};{c};{c};{c};0\n")
+    return to_ns(timestamp.values), close
+
+
+@pytest.fixture
+def sources(tmp_path):
+    root = tmp_path / "raw"
+    root.mkdir()
+    data = {
+        "EURUSD": [
+            write_month(str(root), "EURUSD", "2019-04", 400, 1),
+            write_month(str(root), "EURUSD", "2019-05", 250, 2),
+        ],
+        "GBPUSD": [write_month(str(root), "GBPUSD", "2019-04", 300, 3)],
+    }
+    return str(root), data
+
+
+def test_default_symbol():
+    assert default_symbol("x/DAT_ASCII_EURUSD_M1_201904.csv") == "EURUSD"
+    assert default_symbol("x/AAPL.csv") == "AAPL"
+
+
+def test_round_trip_and_range_loads(tmp_path, sources):
+    raw, data = sources
+    catalog = Catalog(str(tmp_path / "store")).ingest(raw, n_jobs=1)
+    assert sorted(catalog.symbols) == ["EURUSD", "GBPUSD"]
+    assert catalog.symbols["EURUSD"]["n"] == 650
+    assert len(catalog.symbols["EURUSD"]["sources"]) == 2
+
+    # reopened from disk, monthly files merged in time order
+    catalog = Catalog(str(tmp_path / "store"))
+    (eurusd,) = catalog.load("EURUSD")
+    timestamp = np.concatenate([t for t, _ in data["EURUSD"]])
+    np.testing.assert_array_equal(eurusd.timestamp, timestamp)
+    np.testing.assert_array_equal(
+        eurusd.price, np.concatenate([c for _, c in data["EURUSD"]])
+    )
+
+    t, close = data["GBPUSD"][0]
+    start, end = pd.Timestamp(t[10]), pd.Timestamp(t[99])
+    (gbpusd,) = catalog.load(
+        "GBPUSD",
+        start=start,
+        end=end,
+        asset=lambda base, **kw: Currency(base=base[:3], quote=base[3:], **kw),
+    )
+    assert isinstance(gbpusd, Currency)
+    np.testing.assert_array_equal(gbpusd.price, close[10:100])
+
+    # ranges outside of a symbol are resolved from the index alone
+    assert catalog.load(start="2019-05-01", end="2019-06-01")[0].base == (
+        "EURUSD"
+    )
+    assert catalog.load(["GBPUSD"], start="2020-01-01") == []
+
+
+def test_ingest_rewrites_only_the_new_symbols(tmp_path, sources):
+    raw, data = sources
+    store = str(tmp_path / "store")
+    catalog = Catalog(store).ingest(raw, n_jobs=1)
+    untouched = os.path.join(store, "EURUSD", "close.npy")
+    mtime = os.stat(untouched).st_mtime_ns
+
+    other = tmp_path / "other"
+    other.mkdir()
+    t, close = write_month(str(other), "GBPUSD", "2019-06", 50, 4)
+    write_month(str(other), "USDJPY", "2019-06", 80, 5)
+    catalog.ingest(str(other), n_jobs=1)
+
+    assert os.stat(untouched).st_mtime_ns == mtime
+    assert sorted(catalog.symbols) == ["EURUSD", "GBPUSD", "USDJPY"]
+    (gbpusd,) = Catalog(store).load("GBPUSD")
+    np.testing.assert_array_equal(gbpusd.price, close)
+    np.testing.assert_array_equal(gbpusd.timestamp, t)
+
+
+def test_missing_columns_are_nan(tmp_path, sources):
+    raw, _ = sources
+    yahoo = tmp_path / "AAPL.csv"
+    pd.DataFrame(
+        {
+            "Date": ["2019-04-01", "2019-04-02"],
+            "Close": [190.0, 191.5],
+            "Adj Close": [189.0, 190.5],
+        }
+    ).to_csv(yahoo, index=False)
+    catalog = Catalog(str(tmp_path / "store")).ingest(raw, n_jobs=1)
+    catalog.ingest([str(yahoo)], n_jobs=1)
+    assert "adj_close" in catalog.columns
+    (aapl,) = catalog.load("AAPL", column="adj_close")
+    np.testing.assert_array_equal(aapl.price, [189.0, 190.5])
+    assert np.isnan(catalog.column("EURUSD", "adj_close")).all()
+    with pytest.raises(KeyError):
+        catalog.column("EURUSD", "missing")
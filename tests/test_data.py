@@ -0,0 +1,118 @@
+import os
+import numpy as np
+import pandas as pd
+import pytest
+from strategy_tester.account import Account
+from strategy_tester.asset import Currency
+from strategy_tester.data import MemoryLoader, Streamer
+from strategy_tester.risk_management import ConstantLots
+from strategy_tester.simulate import BackTest
+from strategy_tester.strategy import SignalStrategy
+from strategy_tester.utils import to_ns
+
+
+def write_histdata(path, n, seed):
+    "Minute bars of a random walk, in the HistData format."
+    rng = np.random.default_rng(seed)
+    close = np.round(1.1 + np.cumsum(rng.normal(0, 2e-4, n)), 5)
+    timestamp = pd.date_range("2019-04-01", periods=n, freq="1min")
+    with open(path, "w") as f:
+        for t, c in zip(timestamp.strftime("%Y%m%d %H%M%S"), close):
+            f.write(f"{t};{c};{c};{c};{c};0\n")
+    return path
+
+
+def signals(n, seed):
+    rng = np.random.default_rng(seed)
+    return np.column_stack([rng.random(n) < 0.05, rng.random(n) < 0.03])
+
+
+def backtest(price, exog):
+    eurusd = Currency(price=price, base="EUR", quote="USD")
+    strategy = eurusd.register(
+        SignalStrategy(
+            position="short",
+            stop_loss=0.002,
+            take_profit=0.003,
+            RiskManagement=ConstantLots(0.5),
+        )
+    )
+    account = Account(initial_balance=10**5)
+    BackTest(account, strategy).run(eurusd, exog=exog)
+    return account
+
+
+def same_trades(a, b):
+    assert a.n_inactive_orders > 0
+    assert a.balance == b.balance
+    assert [
+        (o.time_ticker["opened"], o.time_ticker["closed"], o.profit)
+        for o in a.inactive_orders.values()
+    ] == [
+        (o.time_ticker["opened"], o.time_ticker["closed"], o.profit)
+        for o in b.inactive_orders.values()
+    ]
+
+
+@pytest.mark.parametrize("chunksize,prefetch", [(97, True), (1000, False)])
+def test_streamed_run_matches_in_memory(tmp_path, chunksize, prefetch):
+    path = write_histdata(tmp_path / "eurusd.csv", 2500, seed=3)
+    exog = signals(2500, seed=4)
+    in_memory = np.concatenate(list(Streamer(path, chunksize=10**6)))
+    assert in_memory.shape[0] == 2500
+    streamed = Streamer(path, chunksize=chunksize, prefetch=prefetch)
+    same_trades(backtest(in_memory, exog), backtest(streamed, exog))
+
+
+def test_streamer_chunks_cover_the_file(tmp_path):
+    path = write_histdata(tmp_path / "eurusd.csv", 1000, seed=5)
+    chunks = list(Streamer(path, chunksize=300))
+    assert [chunk.shape[0] for chunk in chunks] == [300, 300, 300, 100]
+    timestamp = np.concatenate([c["timestamp"] for c in chunks])
+    assert np.all(np.diff(timestamp.view(np.int64)) == 60 * 10**9)
+
+
+def write_yahoo(path, n, seed):
+    "Daily bars with an adjusted close and a few missing rows."
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, n)))
+    frame = pd.DataFrame(
+        {
+            "Date": pd.date_range("2010-01-04", periods=n, freq="B"),
+            "Open": close,
+            "High": close,
+            "Low": close,
+            "Close": close,
+            "Adj Close": close * 0.9,
+            "Volume": rng.integers(1000, 2000, n),
+        }
+    )
+    frame.loc[[5, 17], "Adj Close"] = np.nan
+    frame.to_csv(path, index=False, date_format="%Y-%m-%d")
+    return frame.dropna()
+
+
+def test_memory_loader_caches_and_rebuilds(tmp_path):
+    path = str(tmp_path / "AAPL.csv")
+    frame = write_yahoo(path, 300, seed=8)
+    loader = MemoryLoader(path)
+    assert loader.n == frame.shape[0]
+    assert "adj_close" in loader.columns
+    np.testing.assert_allclose(loader["adj_close"], frame["Adj Close"])
+    np.testing.assert_array_equal(
+        loader["timestamp"], to_ns(frame["Date"].values)
+    )
+
+    # a second loader maps the cache instead of parsing the CSV
+    cached = MemoryLoader(path)
+    assert isinstance(cached["close"], np.memmap)
+    assert not cached["close"].flags.writeable
+    records = cached.to_records("adj_close")
+    np.testing.assert_array_equal(records["price"], loader["adj_close"])
+
+    # a changed source invalidates the cache
+    write_yahoo(path, 120, seed=9)
+    os.utime(path, ns=(1, 1))
+    assert MemoryLoader(path).n == 118
+    with pytest.raises(KeyError):
+        loader["missing"]
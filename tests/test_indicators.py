@@ -0,0 +1,136 @@
+import numpy as np
+import pandas as pd
+import pytest
+from strategy_tester.asset import Stock
+from strategy_tester.indicators import (
+    IndicatorCache,
+    atr,
+    ema,
+    rolling_std,
+    rsi,
+    sma,
+)
+
+
+@pytest.fixture(scope="module")
+def bars():
+    rng = np.random.default_rng(13)
+    close = 50 + np.cumsum(rng.standard_t(4, 700) * 0.3)
+    spread = np.abs(rng.normal(0, 0.4, 700))
+    return pd.DataFrame(
+        {"close": close, "high": close + spread, "low": close - spread}
+    )
+
+
+def seeded_ewm(values, n, alpha, start=0):
+    "Pandas reference of an average seeded with the mean of `n` values."
+    values = pd.Series(values[start:], dtype=float)
+    head = pd.Series([values[:n].mean()])
+    smoothed = pd.concat([head, values[n:]], ignore_index=True)
+    smoothed = smoothed.ewm(alpha=alpha, adjust=False).mean()
+    return np.concatenate([np.full(start + n - 1, np.nan), smoothed])
+
+
+@pytest.mark.parametrize("n", [1, 5, 30])
+def test_moving_averages_match_pandas(bars, n):
+    close = bars["close"]
+    np.testing.assert_allclose(sma(close, n), close.rolling(n).mean())
+    np.testing.assert_allclose(
+        ema(close.values, n), seeded_ewm(close.values, n, 2 / (n + 1))
+    )
+
+
+@pytest.mark.parametrize("n,ddof", [(2, 0), (20, 0), (20, 1)])
+def test_rolling_std_matches_pandas(bars, n, ddof):
+    close = bars["close"]
+    np.testing.assert_allclose(
+        rolling_std(close, n, ddof=ddof),
+        close.rolling(n).std(ddof=ddof),
+        atol=1e-10,
+    )
+
+
+def test_rolling_std_keeps_small_variances():
+    x = 1e6 + np.random.default_rng(2).normal(0, 1e-4, 200)
+    windows = np.lib.stride_tricks.sliding_window_view(x, 10)
+    np.testing.assert_allclose(
+        rolling_std(x, 10)[9:], windows.std(axis=1), rtol=1e-6
+    )
+
+
+@pytest.mark.parametrize("n", [3, 14])
+def test_wilder_indicators_match_pandas(bars, n):
+    close, high, low = (bars[c].values for c in ("close", "high", "low"))
+    delta = np.diff(close, prepend=np.nan)
+    gain = seeded_ewm(np.maximum(delta, 0), n, 1 / n, start=1)
+    loss = seeded_ewm(np.maximum(-delta, 0), n, 1 / n, start=1)
+    np.testing.assert_allclose(rsi(close, n), 100 - 100 / (1 + gain / loss))
+
+    previous = np.roll(close, 1)
+    true_range = np.maximum(high, previous) - np.minimum(low, previous)
+    np.testing.assert_allclose(
+        atr(close, n, high=high, low=low),
+        seeded_ewm(true_range, n, 1 / n, start=1),
+    )
+
+
+def test_short_and_monotonic_series():
+    assert np.isnan(sma(np.arange(3), 5)).all()
+    assert np.isnan(ema(np.arange(3), 5)).all()
+    output = rsi(np.arange(40.0), 14)
+    assert np.isnan(output[:14]).all() and (output[14:] == 100).all()
+
+
+def test_cache_computes_each_series_once(bars):
+    cache = IndicatorCache()
+    close = bars["close"].values
+    first = cache.get("sma", close, n=10)
+    assert cache.get("sma", close.copy(), n=10) is first
+    assert not first.flags.writeable
+    cache.get("sma", close, n=11)
+    cache.get("ema", close, n=10)
+    assert (cache.hits, cache.misses, len(cache)) == (1, 3, 3)
+    with pytest.raises(ValueError):
+        cache.get("macd", close)
+
+
+def test_cache_evicts_least_recently_used(bars):
+    close = bars["close"].values
+    cache = IndicatorCache(max_bytes=2 * close.nbytes)
+    a = cache.get("sma", close, n=2)
+    cache.get("sma", close, n=3)
+    assert cache.get("sma", close, n=2) is a
+    cache.get("sma", close, n=4)
+    assert len(cache) == 2 and cache.nbytes == 2 * close.nbytes
+    assert cache.get("sma", close, n=2) is a
+    misses = cache.misses
+    cache.get("sma", close, n=3)
+    assert cache.misses == misses + 1
+    # series beyond the budget are returned but not kept
+    small = IndicatorCache(max_bytes=close.nbytes - 1)
+    small.get("sma", close, n=2)
+    assert len(small) == 0 and small.nbytes == 0
+
+
+def test_cache_persists_custom_indicators(bars, tmp_path):
+    calls = []
+
+    def spread(x, k):
+        calls.append(k)
+        return np.asarray(x) * k
+
+    stock = Stock(
+        price=bars["close"].values,
+        timestamp=np.arange(len(bars), dtype=np.int64) * 60 * 10**9,
+        base="XYZ",
+    )
+    first = IndicatorCache(path=str(tmp_path)).get(spread, stock, k=2)
+    second = IndicatorCache(path=str(tmp_path))
+    np.testing.assert_array_equal(second.get(spread, stock, k=2), first)
+    assert calls == [2] and second.hits == 1
+    # another asset with the same prices has another fingerprint
+    shifted = Stock(
+        price=stock.price, timestamp=stock.timestamp + 1, base="XYZ"
+    )
+    second.get(spread, shifted, k=2)
+    assert calls == [2, 2]
@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+from strategy_tester.account import Account
+from strategy_tester.asset import Currency
+from strategy_tester.metrics import (
+    HistoryMetric,
+    MaxDrawdown,
+    Metric,
+    ReturnOnInvestment,
+    SharpeRatio,
+    SortinoRatio,
+)
+from strategy_tester.risk_management import ConstantLots
+from strategy_tester.simulate import BackTest
+from strategy_tester.strategy import SignalStrategy
+from strategy_tester.utils import generate_data
+
+
+def run_account(seed, every):
+    np.random.seed(seed)
+    data = generate_data(2000)
+    entries = np.zeros(data.shape[0], dtype=bool)
+    entries[::every] = True
+    exog = np.column_stack([entries, np.zeros_like(entries)])
+    eurusd = Currency(price=data, base="EUR", quote="USD")
+    strategy = eurusd.register(
+        SignalStrategy(
+            stop_loss=0.02,
+            take_profit=0.02,
+            RiskManagement=ConstantLots(0.1),
+        )
+    )
+    account = Account(initial_balance=1000, leverage=10)
+    BackTest(account, strategy).run(eurusd, exog=exog)
+    return account
+
+
+def test_history_metrics_score_accounts_alternately():
+    accounts = [run_account(1, 20), run_account(2, 35)]
+    assert accounts[0].n_inactive_orders != accounts[1].n_inactive_orders
+    for cls in (SharpeRatio, SortinoRatio, MaxDrawdown):
+        expected = [cls()(account) for account in accounts]
+        metric = cls()
+        for _ in range(3):
+            scores = [metric(account) for account in accounts]
+            np.testing.assert_equal(scores, expected)
+
+
+def test_incomplete_metrics_fail_on_construction():
+    class NoValue(Metric):
+        pass
+
+    class NoConsume(HistoryMetric):
+        def value(self, Account):
+            return 0.0
+
+    with pytest.raises(TypeError):
+        NoValue()
+    with pytest.raises(TypeError):
+        NoConsume()
+    assert ReturnOnInvestment()(run_account(3, 50)) != 0
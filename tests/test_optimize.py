@@ -0,0 +1,107 @@
+import numpy as np
+import pytest
+from strategy_tester.account import Account
+from strategy_tester.asset import Currency
+from strategy_tester.optimize import (
+    Grid,
+    Random,
+    SuccessiveHalving,
+    WalkForward,
+)
+from strategy_tester.risk_management import ConstantLots
+from strategy_tester.strategy import SignalStrategy
+from strategy_tester.utils import generate_data, sample_without_replacement
+
+PARAMSET = {
+    "stop_loss": [0.01, 0.03],
+    "take_profit": [0.01, 0.05],
+    "RiskManagement": [ConstantLots(0.1)],
+}
+
+
+def market(n=1500):
+    np.random.seed(11)
+    data = generate_data(n)
+    entries = np.zeros(n, dtype=bool)
+    entries[::25] = True
+    exog = np.column_stack([entries, np.zeros_like(entries)])
+    return Currency(price=data, base="EUR", quote="USD"), exog
+
+
+@pytest.mark.parametrize("n_jobs", [1, 2])
+def test_grid_strategies_trade(n_jobs):
+    eurusd, exog = market()
+    account = Account(initial_balance=100000, leverage=100)
+    grid = Grid(account, SignalStrategy, PARAMSET, n_jobs=n_jobs)
+    grid.run(eurusd, exog=exog)
+    assert all(bt.Account.n_inactive_orders > 0 for bt in grid.output)
+    assert eurusd.registered == [] and eurusd.n_registered == 0
+    balances = [bt.Account.balance for bt in grid.output]
+    assert len(set(balances)) == len(balances)
+
+
+@pytest.mark.parametrize("size,n", [(10, 10), (1000, 37), (10**15, 500)])
+def test_sampled_indices_are_distinct_and_seeded(size, n):
+    idxs = sample_without_replacement(np.random.default_rng(7), size, n)
+    assert len(idxs) == len(set(idxs)) == n
+    assert all(0 <= i < size for i in idxs)
+    assert idxs == sample_without_replacement(
+        np.random.default_rng(7), size, n
+    )
+    if n < size:
+        assert idxs != sample_without_replacement(
+            np.random.default_rng(8), size, n
+        )
+
+
+def test_random_search_is_reproducible():
+    eurusd, exog = market(300)
+    paramset = dict(PARAMSET, stop_loss=[0.01, 0.02, 0.03, 0.04])
+    account = Account(initial_balance=100000, leverage=100)
+    runs = [
+        Random(0.4, account, SignalStrategy, paramset, seed=3).run(
+            eurusd, exog=exog
+        )
+        for _ in range(2)
+    ]
+    assert len(runs[0].params) == len(runs[0].output) == 3
+    assert runs[0].params == runs[1].params
+    keys = [(p["stop_loss"], p["take_profit"]) for p in runs[0].params]
+    assert len(set(keys)) == 3
+
+
+def test_successive_halving_ranks_trading_candidates():
+    eurusd, exog = market()
+    account = Account(initial_balance=100000, leverage=100)
+    search = SuccessiveHalving(account, SignalStrategy, PARAMSET, eta=2)
+    search.run(eurusd, exog=exog)
+    first = search.rungs[0]
+    assert all(
+        search.output[i].Account.n_inactive_orders > 0
+        for i in first["candidates"]
+    )
+    assert len(set(first["scores"])) == len(first["scores"])
+    assert len(search.rungs) > 1
+    best = search.output[search.survivors[0]]
+    assert eurusd.registered == []
+    assert best.Account.balance != account.initial_balance
+
+
+def test_walk_forward_windows_trade():
+    eurusd, exog = market()
+    account = Account(initial_balance=100000, leverage=100)
+    search = WalkForward(
+        account, SignalStrategy, PARAMSET, train=500, test=250
+    )
+    search.run(eurusd, exog=exog)
+    assert all(len(set(scores)) > 1 for scores in search.scores)
+    assert all(bt.Account.n_inactive_orders > 0 for bt in search.output)
+    timestamp = search.equity_curve["timestamp"].values
+    assert np.all(np.diff(timestamp) >= np.timedelta64(0))
+
+
+def test_walk_forward_rejects_overlapping_windows():
+    with pytest.raises(ValueError):
+        WalkForward(
+            Account(), SignalStrategy, PARAMSET, train=500, test=250, step=100
+        )
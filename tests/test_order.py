@@ -0,0 +1,126 @@
+import numpy as np
+import pytest
+from strategy_tester.account import Account
+from strategy_tester.asset import Currency, Ticker
+from strategy_tester.order import Order, OrderHistory
+from strategy_tester.risk_management import ConstantLots
+from strategy_tester.simulate import BackTest
+from strategy_tester.strategy import SignalStrategy
+from strategy_tester.utils import generate_data
+
+FEATURES = {"lot_units": 100000}
+T0 = 1577836800000000000
+
+
+def tick(price, k=1):
+    return Ticker("EURUSD", T0 + k * 60 * 10**9, price, 0, 0, 0, 1)
+
+
+def order(position, spread=0.0002, leverage=50):
+    return Order(
+        asset_id="EURUSD",
+        position=position,
+        type="market",
+        size=0.5,
+        strike_price=1.1,
+        timestamp=T0,
+        asset_features=FEATURES,
+        spread=spread,
+        leverage=leverage,
+    )
+
+
+def test_profit_is_net_of_spread_at_the_current_tick():
+    long = order("long")
+    assert long.profit == pytest.approx(-0.0001)
+    long.update(tick(1.105))
+    assert long.pips == pytest.approx(0.005)
+    assert long.profit == pytest.approx(249.9999)
+    long.update(tick(1.099, 2))
+    assert long.profit == pytest.approx(-50.0001)
+
+    short = order("short")
+    short.update(tick(1.098))
+    assert short.pips == pytest.approx(0.002)
+    assert short.profit == pytest.approx(99.9999)
+
+
+def test_margin_is_divided_by_leverage():
+    o = order("long", leverage=50)
+    assert o.margin == pytest.approx(1100.0)
+    o.update(tick(1.105))
+    assert o.margin == pytest.approx(1105.0)
+    assert order("long", leverage=100).margin == pytest.approx(550.0)
+
+
+@pytest.mark.parametrize("position", ["long", "short"])
+def test_backtest_spread_applies_to_both_positions(position):
+    np.random.seed(21)
+    data = generate_data(200)
+    eurusd = Currency(price=data, base="EUR", quote="USD")
+    strategy = eurusd.register(
+        SignalStrategy(position=position, RiskManagement=ConstantLots(0.2))
+    )
+    account = Account(initial_balance=10**6, max_allowed_risk=None)
+    entries = np.zeros(data.shape[0], dtype=bool)
+    entries[0] = True
+    exog = np.column_stack([entries, np.zeros_like(entries)])
+    BackTest(account, strategy, spread=0.0005).run(eurusd, exog=exog)
+    (first,) = list(account.inactive_orders.values())[:1]
+    assert first.spread == 0.0005
+    assert first.profits[0] == pytest.approx(-0.0005 * 0.2)
+
+
+def updates(n, seed):
+    rng = np.random.default_rng(seed)
+    timestamp = T0 + np.arange(n, dtype=np.int64) * 10**9
+    return timestamp, rng.normal(size=n), rng.normal(size=n), rng.random(n)
+
+
+@pytest.mark.parametrize(
+    "policy,n,kept",
+    [
+        ("full", None, np.arange(100)),
+        ("every_n", 7, np.arange(0, 100, 7)),
+        ("ring", 16, np.arange(84, 100)),
+        ("none", None, np.arange(0)),
+    ],
+)
+def test_history_policies(policy, n, kept):
+    timestamp, pips, profit, margin = updates(100, seed=len(policy))
+    history = OrderHistory(policy, n)
+    for row in zip(timestamp, pips, profit, margin):
+        history.append(*row)
+    assert history.n_seen == 100
+    assert len(history) == kept.shape[0]
+    np.testing.assert_array_equal(history.timestamp, timestamp[kept])
+    np.testing.assert_array_equal(history.pips, pips[kept])
+    np.testing.assert_array_equal(history.profit, profit[kept])
+    np.testing.assert_array_equal(history.margin, margin[kept])
+
+    # the same updates given in uneven batches
+    batched = OrderHistory(policy, n)
+    for a, b in [(0, 3), (3, 40), (40, 41), (41, 100)]:
+        batched.extend(timestamp[a:b], pips[a:b], profit[a:b], margin[a:b])
+    np.testing.assert_array_equal(batched.timestamp, history.timestamp)
+    np.testing.assert_array_equal(batched.margin, history.margin)
+
+
+@pytest.mark.parametrize("policy,n", [("every_n", 0), ("ring", None)])
+def test_history_policies_need_a_size(policy, n):
+    with pytest.raises(ValueError):
+        OrderHistory(policy, n)
+    with pytest.raises(ValueError):
+        OrderHistory("last")
+
+
+@pytest.mark.parametrize("position,sign", [("long", 1), ("short", -1)])
+def test_excursions(position, sign):
+    prices = [1.1, 1.103, 1.097, 1.101, 1.094, 1.099]
+    o = order(position)
+    for k, price in enumerate(prices):
+        o.update(tick(price, k + 1))
+    pips = sign * (np.array(prices) - 1.1)
+    assert o.max_favorable_excursion == pytest.approx(max(pips.max(), 0))
+    assert o.max_adverse_excursion == pytest.approx(max(-pips.min(), 0))
+    np.testing.assert_allclose(o.pipss[1:], pips)
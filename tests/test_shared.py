@@ -0,0 +1,70 @@
+from multiprocessing import shared_memory
+import numpy as np
+import pytest
+from strategy_tester import shared
+from strategy_tester.asset import Stock
+from strategy_tester.shared import SharedArray, SharedAssets, release, resolve
+
+
+def stocks(n=300, seed=5):
+    rng = np.random.default_rng(seed)
+    timestamp = np.int64(1.6e18) + np.arange(n, dtype=np.int64) * 86400e9
+    return [
+        Stock(
+            price=100 * np.exp(np.cumsum(rng.normal(0, 0.01, n))),
+            timestamp=timestamp.astype(np.int64),
+            base=base,
+        )
+        for base in ["AAPL", "MSFT"]
+    ]
+
+
+def test_handles_resolve_to_read_only_views():
+    assets = stocks()
+    with SharedAssets(assets) as published:
+        resolved = resolve(published.handles)
+        for asset, copy in zip(assets, resolved):
+            assert type(copy) is Stock and copy.base == asset.base
+            np.testing.assert_array_equal(copy.price, asset.price)
+            np.testing.assert_array_equal(copy.timestamp, asset.timestamp)
+            assert not copy.price.flags.writeable
+        # arrays already published are not copied again
+        n_blocks = len(published.blocks)
+        published.share(assets[0])
+        assert len(published.blocks) == n_blocks == 4
+        # the publishing process resolves on its own blocks
+        assert shared._attached == {}
+    assert not any(b.name in shared._owned for b in published.blocks)
+    # views outlive the context, their maps are closed once unused
+    np.testing.assert_array_equal(resolved[1].price, assets[1].price)
+    assert len(shared._attached) == 4
+    del copy, resolved
+    release()
+    assert shared._attached == {}
+
+
+def test_release_keeps_viewed_attachments():
+    array = np.arange(10.0)
+    block = shared_memory.SharedMemory(create=True, size=array.nbytes)
+    try:
+        np.ndarray(array.shape, array.dtype, buffer=block.buf)[:] = array
+        handle = SharedArray(block.name, array.shape, array.dtype.str)
+        view = handle.attach()
+        assert handle.attach().base is not None
+        release()
+        np.testing.assert_array_equal(view, array)
+        assert block.name in shared._attached
+        del view
+        release()
+        assert block.name not in shared._attached
+    finally:
+        block.close()
+        block.unlink()
+
+
+def test_streamed_assets_are_not_shared():
+    asset = stocks()[0]
+    asset.source = object()
+    with SharedAssets([]) as published:
+        with pytest.raises(ValueError):
+            published.share(asset)
@@ -0,0 +1,317 @@
+import numpy as np
+import pytest
+from strategy_tester.account import Account
+from strategy_tester.asset import Currency, Stock
+from strategy_tester.metrics import MaxDrawdown, SharpeRatio, WinRate
+from strategy_tester.risk_management import ConstantLots, ConstantRate
+from strategy_tester.simulate import BackTest
+from strategy_tester.strategy import SignalStrategy, Strategy
+from strategy_tester.utils import PRICE_DTYPE, generate_data, to_ns
+
+
+class TrailingSignal(SignalStrategy):
+    "Lock profits and tighten targets in `long_modify`, close on MAE."
+
+    def long_modify(self, order, tickers, Account, exog=None):
+        if order.pips > 0.02:
+            order.stop_loss = -0.01
+        if order.max_favorable_excursion > 0.03:
+            order.take_profit = 0.04
+        return order
+
+    def decide_long_close(self, order, tickers, Account, exog):
+        return order.max_adverse_excursion > 0.03
+
+
+def run_modifying(compiled):
+    np.random.seed(7)
+    data = generate_data(3000)
+    entries = np.zeros(data.shape[0], dtype=bool)
+    entries[::50] = True
+    exog = np.column_stack([entries, np.zeros_like(entries)])
+    eurusd = Currency(price=data, base="EUR", quote="USD")
+    strategy = eurusd.register(
+        TrailingSignal(
+            stop_loss=0.05,
+            take_profit=0.1,
+            RiskManagement=ConstantLots(0.1),
+        )
+    )
+    account = Account(initial_balance=1000, leverage=10, compiled=compiled)
+    BackTest(account, strategy).run(eurusd, exog=exog)
+    return account
+
+
+def test_compiled_account_follows_modified_orders():
+    plain, compiled = run_modifying(False), run_modifying(True)
+    assert plain.n_inactive_orders > 0
+    assert plain.balance == compiled.balance
+    orders = list(plain.inactive_orders.values())
+    compiled_orders = list(compiled.inactive_orders.values())
+    assert [o.time_ticker for o in orders] == [
+        o.time_ticker for o in compiled_orders
+    ]
+    assert [(o.profit, o.stop_loss, o.take_profit) for o in orders] == [
+        (o.profit, o.stop_loss, o.take_profit) for o in compiled_orders
+    ]
+    # the modifications did change the exits
+    assert any(o.stop_loss == -0.01 for o in orders)
+
+
+class Crash(Exception):
+    pass
+
+
+class CoinFlip(Strategy):
+    "Buy with probability `p` at each tick, from a generator of its own."
+
+    def __init__(self, p, seed, **kwargs):
+        super().__init__(**kwargs)
+        self.p = p
+        self.rng = np.random.default_rng(seed)
+        self.crash_at = None
+
+    def decide_long_open(self, tickers, Account, exog):
+        if self.crash_at is not None and tickers[0].timestamp >= self.crash_at:
+            raise Crash
+        return {
+            ticker.aid: {
+                "type": "market",
+                "size": self.RiskManagement.order_size(Account),
+                "strike_price": ticker.price,
+                "stop_loss": 0.004,
+                "take_profit": 0.006,
+            }
+            for ticker in tickers
+            if self.rng.random() < self.p
+        }
+
+    def decide_short_open(self, tickers, Account, exog):
+        return {}
+
+
+def gbpusd(n, seed=21):
+    rng = np.random.default_rng(seed)
+    data = np.empty(n, dtype=PRICE_DTYPE)
+    data["timestamp"] = np.datetime64("2021-03-01") + np.arange(
+        n
+    ) * np.timedelta64(5, "m")
+    data["price"] = 1.3 * np.exp(np.cumsum(rng.normal(0, 4e-4, n)))
+    return data
+
+
+def coin_flip_backtest():
+    strategy = CoinFlip(0.02, seed=9, RiskManagement=ConstantRate(1e-5))
+    account = Account(initial_balance=10000, leverage=50)
+    metrics = (MaxDrawdown(), SharpeRatio(), WinRate())
+    return BackTest(account, strategy, track=metrics)
+
+
+def summary(backtest):
+    orders = backtest.Account.inactive_orders
+    return (
+        backtest.n_ticks,
+        backtest.Account.balance,
+        [
+            (key, o.time_ticker["closed"], o.profit)
+            for key, o in orders.items()
+        ],
+        [metric(backtest.Account) for metric in backtest.metrics],
+    )
+
+
+def test_resumed_daily_update_matches_full_run(tmp_path):
+    data = gbpusd(4000)
+    path = str(tmp_path / "state.ckpt")
+    full = coin_flip_backtest().run(
+        Currency(price=data, base="GBP", quote="USD")
+    )
+    first = coin_flip_backtest().run(
+        Currency(price=data[:2345], base="GBP", quote="USD"), checkpoint=path
+    )
+    # the checkpoint is written before the tear down of the first run
+    assert first.Account.n_active_orders == 0
+    resumed = BackTest.resume(
+        path, Currency(price=data, base="GBP", quote="USD")
+    )
+    assert len(summary(full)[2]) > 20
+    assert summary(resumed) == summary(full)
+
+
+@pytest.mark.parametrize("freq", [500, 777])
+def test_periodic_checkpoint_recovers_a_crash(tmp_path, freq):
+    data = gbpusd(4000, seed=22)
+    path = str(tmp_path / "state.ckpt")
+    full = coin_flip_backtest().run(
+        Currency(price=data, base="GBP", quote="USD")
+    )
+    backtest = coin_flip_backtest()
+    backtest.Strategy.crash_at = to_ns(data["timestamp"][3100])
+    with pytest.raises(Crash):
+        backtest.run(
+            Currency(price=data, base="GBP", quote="USD"),
+            checkpoint=path,
+            checkpoint_freq=freq,
+        )
+    backtest = BackTest.load(path)
+    assert backtest.n_ticks == 3100 // freq * freq
+    assert backtest.Account.n_active_orders > 0
+    backtest.Strategy.crash_at = None
+    # the new data overlaps the checkpoint, known ticks are skipped
+    resumed = backtest.run(
+        Currency(price=data[2000:], base="GBP", quote="USD")
+    )
+    assert summary(resumed) == summary(full)
+
+
+def test_load_rejects_other_files(tmp_path):
+    path = tmp_path / "state.ckpt"
+    path.write_bytes(b"not a checkpoint")
+    with pytest.raises(ValueError):
+        BackTest.load(str(path))
+
+
+class Recorder(Strategy):
+    "Record the tickers given to the hooks, hold one order per asset."
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.opened = []
+        self.closed = []
+
+    def decide_long_open(self, tickers, Account, exog):
+        self.opened.append((tickers[0].timestamp, [t.aid for t in tickers]))
+        orders = Account.orders_by_strategy.get(self.id, {}).values()
+        held = {order.asset_id for order in orders}
+        return {
+            ticker.aid: {
+                "type": "market",
+                "size": 0.01,
+                "strike_price": ticker.price,
+            }
+            for ticker in tickers
+            if ticker.aid not in held
+        }
+
+    def decide_short_open(self, tickers, Account, exog):
+        return {}
+
+    def decide_long_close(self, order, tickers, Account, exog):
+        self.closed.append((order.asset_id, [t.aid for t in tickers]))
+        return False
+
+
+def staggered_stocks():
+    rng = np.random.default_rng(17)
+    days = np.int64(1.7e18) + np.arange(120, dtype=np.int64) * 86400 * 10**9
+    return {
+        step: Stock(
+            price=30 * step + np.cumsum(rng.normal(0, 0.2, days[::step].size)),
+            timestamp=days[::step].copy(),
+            base=f"S{step}",
+        )
+        for step in (1, 2, 3)
+    }
+
+
+def test_strategies_only_see_their_assets():
+    stocks = staggered_stocks()
+    every_other = stocks[2].register(Recorder(RiskManagement=ConstantLots()))
+    third = stocks[3].register(Recorder(RiskManagement=ConstantLots()))
+    everything = Recorder(RiskManagement=ConstantLots())
+    account = Account(initial_balance=10**6, max_allowed_risk=None)
+    strategies = [every_other, third, everything]
+    BackTest(account, strategies).run(list(stocks.values()), tear_down=False)
+
+    for strategy, stock in [(every_other, stocks[2]), (third, stocks[3])]:
+        # called only at the ticks of its asset, with its ticker only
+        assert [t for t, _ in strategy.opened] == stock.timestamp.tolist()
+        assert all(aids == [stock.id] for _, aids in strategy.opened)
+        assert strategy.closed == [
+            (stock.id, [stock.id]) for _ in stock.timestamp[1:]
+        ]
+    # a strategy without assets gets every ticker of every tick
+    assert [t for t, _ in everything.opened] == stocks[1].timestamp.tolist()
+    for k, (_, aids) in enumerate(everything.opened):
+        assert aids == [
+            stock.id for step, stock in stocks.items() if k % step == 0
+        ]
+    assert account.n_active_orders == 5
+
+
+def antipodeans(n=6000, seed=41):
+    rng = np.random.default_rng(seed)
+    timestamp = np.datetime64("2023-01-02") + np.arange(n) * np.timedelta64(
+        1, "m"
+    )
+    assets = []
+    for base, level in [("AUD", 0.66), ("NZD", 0.61)]:
+        data = np.empty(n, dtype=PRICE_DTYPE)
+        data["timestamp"] = timestamp
+        data["price"] = level * np.exp(np.cumsum(rng.normal(0, 2e-4, n)))
+        assets.append(Currency(price=data, base=base, quote="USD"))
+    entries = np.zeros(n, dtype=bool)
+    entries[np.sort(rng.choice(n, 20, replace=False))] = True
+    exits = np.zeros(n, dtype=bool)
+    exits[np.sort(rng.choice(n, 6, replace=False))] = True
+    return assets, np.column_stack([entries, exits])
+
+
+def fast_forwarded(fast_forward, compiled, position, stop_loss, take_profit):
+    assets, exog = antipodeans()
+    timestamp = assets[0].timestamp
+    strategy = SignalStrategy(
+        position,
+        stop_loss=stop_loss,
+        take_profit=take_profit,
+        signals=timestamp[exog.any(axis=1)],
+        RiskManagement=ConstantLots(0.05),
+    )
+    for asset in assets:
+        asset.register(strategy)
+    account = Account(initial_balance=10**5, leverage=20, compiled=compiled)
+    backtest = BackTest(account, strategy, fast_forward=fast_forward)
+    calls = []
+    process_ticker = backtest.process_ticker
+    backtest.process_ticker = lambda *args: calls.append(process_ticker(*args))
+    backtest.run(assets, exog=exog, tear_down=False)
+    orders = [
+        (key, o.time_ticker, o.profit, o.pips, o.margin)
+        + (o.max_adverse_excursion, o.max_favorable_excursion)
+        for orders in (account.inactive_orders, account.active_orders)
+        for key, o in orders.items()
+    ]
+    return (
+        account.balance,
+        account.n_processed_tickers,
+        backtest.n_ticks,
+        orders,
+    ), len(calls)
+
+
+@pytest.mark.parametrize("compiled", [False, True])
+@pytest.mark.parametrize(
+    "position,stop_loss,take_profit",
+    [
+        ("long", 0.002, 0.003),
+        ("short", 0.0015, None),
+        ("long", None, None),
+    ],
+)
+def test_fast_forward_matches_every_tick(
+    compiled, position, stop_loss, take_profit
+):
+    plain, n_plain = fast_forwarded(
+        False, compiled, position, stop_loss, take_profit
+    )
+    skipped, n_skipped = fast_forwarded(
+        True, compiled, position, stop_loss, take_profit
+    )
+    assert skipped == plain
+    assert n_plain == 6000 and n_skipped < 6000 // 10
+    assets, exog = antipodeans()
+    signals = set(assets[0].timestamp[exog.any(axis=1)].tolist())
+    closed = [o[1]["closed"] for o in plain[3] if o[1]["closed"] is not None]
+    if stop_loss is not None:
+        # stop losses and take profits hit between two signals
+        assert any(t not in signals for t in closed)
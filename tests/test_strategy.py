@@ -0,0 +1,82 @@
+import numpy as np
+import pytest
+from strategy_tester.account import Account
+from strategy_tester.asset import Currency
+from strategy_tester.risk_management import ConstantLots
+from strategy_tester.simulate import BackTest
+from strategy_tester.strategy import SignalStrategy, Strategy
+from strategy_tester.utils import PRICE_DTYPE
+
+
+def crosses(n=2500, seed=31):
+    rng = np.random.default_rng(seed)
+    timestamp = np.datetime64("2022-06-01") + np.arange(n) * np.timedelta64(
+        1, "h"
+    )
+    assets = []
+    for base, level in [("EUR", 1.05), ("GBP", 1.2), ("AUD", 0.68)]:
+        data = np.empty(n, dtype=PRICE_DTYPE)
+        data["timestamp"] = timestamp
+        data["price"] = level * np.exp(np.cumsum(rng.normal(0, 1e-3, n)))
+        assets.append(Currency(price=data, base=base, quote="USD"))
+    exog = np.column_stack([rng.random(n) < 0.05, rng.random(n) < 0.02])
+    return assets, exog
+
+
+def trades(batched, compiled, position):
+    assets, exog = crosses()
+    strategy = SignalStrategy(
+        position=position,
+        stop_loss=0.01,
+        take_profit=0.015,
+        batched=batched,
+        RiskManagement=ConstantLots(0.2),
+    )
+    for asset in assets[:2]:
+        asset.register(strategy)
+    account = Account(initial_balance=50000, leverage=30, compiled=compiled)
+    BackTest(account, strategy).run(assets, exog=exog)
+    orders = sorted(
+        (o.asset_id, o.time_ticker["opened"], o.time_ticker["closed"])
+        + (o.position, round(o.profit, 9))
+        for o in account.inactive_orders.values()
+    )
+    return round(account.balance, 6), orders
+
+
+@pytest.mark.parametrize("compiled", [False, True])
+@pytest.mark.parametrize("position", ["long", "short"])
+def test_batched_decisions_match_per_ticker_hooks(compiled, position):
+    balance, orders = trades(False, compiled, position)
+    assert len(orders) > 50
+    assert {order[3] for order in orders} == {position}
+    assert len({order[0] for order in orders}) == 2
+    assert trades(True, compiled, position) == (balance, orders)
+
+
+def test_positions_are_flat_per_strategy():
+    assets, exog = crosses(800, seed=32)
+    entries = np.column_stack([np.ones(800, dtype=bool), exog[:, 1]])
+    strategies = [
+        assets[0].register(
+            SignalStrategy(position, RiskManagement=ConstantLots(0.1))
+        )
+        for position in ["long", "short"]
+    ]
+    account = Account(initial_balance=10000, leverage=30)
+    BackTest(account, strategies).run(assets[0], exog=entries, tear_down=False)
+    for strategy in strategies:
+        assert not strategy.is_flat(assets[0].id, account)
+        assert strategy.is_flat(assets[1].id, account)
+        assert len(account.orders_by_strategy[strategy.id]) == 1
+
+
+def test_batched_strategy_must_decide_batch():
+    class Hooks(Strategy):
+        batched = True
+
+    strategy = Hooks(RiskManagement=ConstantLots(0.1))
+    with pytest.raises(ValueError):
+        BackTest(Account(), strategy)
+    with pytest.raises(NotImplementedError):
+        strategy.decide_batch(None, None, None)